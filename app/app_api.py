@@ -0,0 +1,330 @@
+"""Versioned JSON API for kiosk and mobile clients.
+
+Read-only endpoints under /api/v1 for doctors, patients, appointments and
+treatments. They share the session login with the HTML pages and apply
+the same role rules. Treatments include archived ones (app_archive), as
+the HTML history pages do. List endpoints page with keyset cursors
+(?per_page, ?after, ?before, ?sort, ?order). Every endpoint takes
+?fields=a,b to trim the payload. Responses carry an ETag and answer
+If-None-Match with 304. orjson is used for encoding when installed.
+"""
+import json
+from datetime import datetime
+from functools import wraps
+from flask import Blueprint, Response, request
+from flask_login import current_user
+from sqlalchemy.orm import joinedload
+from app.app_models import Doctor, Patient, Appointment, Treatment, TreatmentArchive, DoctorPatient
+from app.app_queries import (
+    doctors_with_users, patients_with_users, appointments_with_people,
+    DOCTOR_SORTS, PATIENT_SORTS, APPOINTMENT_SORTS
+)
+from app.app_pagination import keyset_paginate, keyset_paginate_merged, page_args
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+TREATMENT_SORTS = {
+    'id': [Treatment.id],
+    'created': [Treatment.created_at, Treatment.id],
+}
+
+# Same keys over the archive; archived treatments keep their ids, so the two never collide
+TREATMENT_ARCHIVE_SORTS = {
+    'id': [TreatmentArchive.id],
+    'created': [TreatmentArchive.created_at, TreatmentArchive.id],
+}
+
+
+def _date(value):
+    return value.isoformat() if value else None
+
+
+def _time(value):
+    return value.strftime('%H:%M') if value else None
+
+
+# Field name -> getter, per resource; ?fields= picks from these
+DOCTOR_FIELDS = {
+    'id': lambda d: d.id,
+    'name': lambda d: d.display_name,
+    'email': lambda d: d.user.email,
+    'specialization': lambda d: d.specialization,
+    'department': lambda d: d.department.name if d.department else None,
+    'phone': lambda d: d.phone,
+}
+
+PATIENT_FIELDS = {
+    'id': lambda p: p.id,
+    'name': lambda p: p.display_name,
+    'email': lambda p: p.user.email,
+    'age': lambda p: p.age,
+    'gender': lambda p: p.gender,
+    'phone': lambda p: p.phone,
+    'address': lambda p: p.address,
+    'medical_history': lambda p: p.medical_history,
+}
+
+APPOINTMENT_FIELDS = {
+    'id': lambda a: a.id,
+    'date': lambda a: _date(a.date),
+    'time': lambda a: _time(a.time),
+    'status': lambda a: a.status,
+    'reason': lambda a: a.reason,
+    'patient_id': lambda a: a.patient_id,
+    'patient_name': lambda a: a.patient.display_name,
+    'doctor_id': lambda a: a.doctor_id,
+    'doctor_name': lambda a: a.doctor.display_name,
+    'specialization': lambda a: a.doctor.specialization,
+}
+
+TREATMENT_FIELDS = {
+    'id': lambda t: t.id,
+    'appointment_id': lambda t: t.appointment_id,
+    'patient_id': lambda t: t.patient_id,
+    'patient_name': lambda t: t.patient.display_name,
+    'doctor_id': lambda t: t.doctor_id,
+    'doctor_name': lambda t: t.doctor.display_name,
+    'diagnosis': lambda t: t.diagnosis,
+    'prescription': lambda t: t.prescription,
+    'notes': lambda t: t.notes,
+    'created_at': lambda t: t.created_at.isoformat() if t.created_at else None,
+}
+
+# Fields returned when ?fields= is not given (the heavier text fields are opt-in)
+DEFAULT_FIELDS = {
+    'doctors': ['id', 'name', 'specialization', 'department'],
+    'patients': ['id', 'name', 'email', 'age', 'gender'],
+    'appointments': ['id', 'date', 'time', 'status', 'patient_id', 'patient_name', 'doctor_id', 'doctor_name'],
+    'treatments': ['id', 'appointment_id', 'patient_id', 'doctor_id', 'diagnosis', 'prescription', 'created_at'],
+}
+
+
+class ApiError(Exception):
+    """Turned into a JSON error response by the blueprint"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':')).encode()
+
+
+def json_response(payload, status=200):
+    """Compact JSON response with an ETag, or 304 when the client already has it"""
+    response = Response(dumps(payload), status=status, mimetype='application/json')
+    if status == 200:
+        response.add_etag()
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response = response.make_conditional(request)
+    return response
+
+
+@api.errorhandler(ApiError)
+def _api_error(exc):
+    return json_response({'error': exc.message}, exc.status)
+
+
+@api.errorhandler(404)
+def _not_found(exc):
+    return json_response({'error': 'not found'}, 404)
+
+
+def api_login_required(*roles):
+    """Like login_required, but answers 401/403 JSON instead of redirecting"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_user.is_authenticated:
+                raise ApiError(401, 'authentication required')
+            if roles and current_user.role not in roles:
+                raise ApiError(403, 'not allowed for this role')
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def selected_fields(resource, available):
+    """Field list from ?fields=, validated against the resource's fields"""
+    raw = request.args.get('fields')
+    if not raw:
+        return DEFAULT_FIELDS[resource]
+    fields = [f.strip() for f in raw.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in available]
+    if unknown:
+        raise ApiError(400, f"unknown field(s): {', '.join(unknown)}; "
+                            f"available: {', '.join(available)}")
+    return fields
+
+
+def serialize(obj, fields, available):
+    return {name: available[name](obj) for name in fields}
+
+
+def list_response(resource, query, sorts, default_sort, available, archive=None):
+    """One page of query; archive is an optional (query, sorts) pair merged into the same list"""
+    fields = selected_fields(resource, available)
+    args = page_args(request.args, sorts, default_sort)
+    if archive is None:
+        page = keyset_paginate(query, sorts, **args)
+    else:
+        page = keyset_paginate_merged([(query, sorts), archive], **args)
+    return json_response({
+        'data': [serialize(obj, fields, available) for obj in page.items],
+        'next': page.next_cursor,
+        'prev': page.prev_cursor,
+    })
+
+
+def detail_response(resource, obj, available):
+    if obj is None:
+        raise ApiError(404, f'{resource[:-1]} not found')
+    return json_response({'data': serialize(obj, selected_fields(resource, available), available)})
+
+
+def _date_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ApiError(400, f'{name} must be YYYY-MM-DD')
+
+
+def _own_doctor_id():
+    return current_user.doctor_id
+
+
+def _own_patient_id():
+    return current_user.patient_id
+
+
+# ==================== Doctors ====================
+
+
+def _doctors():
+    return doctors_with_users().options(joinedload(Doctor.department))
+
+
+@api.route('/doctors')
+@api_login_required()
+def list_doctors():
+    query = _doctors()
+    if request.args.get('specialization'):
+        query = query.filter(Doctor.specialization.ilike(f"%{request.args['specialization']}%"))
+    return list_response('doctors', query, DOCTOR_SORTS, 'id', DOCTOR_FIELDS)
+
+
+@api.route('/doctors/<int:doctor_id>')
+@api_login_required()
+def get_doctor(doctor_id):
+    return detail_response('doctors', _doctors().filter(Doctor.id == doctor_id).first(), DOCTOR_FIELDS)
+
+
+# ==================== Patients ====================
+
+
+def _patients():
+    """Patients visible to the current user"""
+    query = patients_with_users()
+    if current_user.role == 'doctor':
+        query = query.join(DoctorPatient, DoctorPatient.patient_id == Patient.id) \
+            .filter(DoctorPatient.doctor_id == _own_doctor_id())
+    elif current_user.role == 'patient':
+        query = query.filter(Patient.id == _own_patient_id())
+    return query
+
+
+@api.route('/patients')
+@api_login_required('admin', 'doctor')
+def list_patients():
+    return list_response('patients', _patients(), PATIENT_SORTS, 'id', PATIENT_FIELDS)
+
+
+@api.route('/patients/<int:patient_id>')
+@api_login_required()
+def get_patient(patient_id):
+    return detail_response('patients', _patients().filter(Patient.id == patient_id).first(), PATIENT_FIELDS)
+
+
+# ==================== Appointments ====================
+
+
+def _appointments():
+    """Appointments visible to the current user, filtered by query args"""
+    query = appointments_with_people()
+    if current_user.role == 'doctor':
+        query = query.filter(Appointment.doctor_id == _own_doctor_id())
+    elif current_user.role == 'patient':
+        query = query.filter(Appointment.patient_id == _own_patient_id())
+    return query
+
+
+@api.route('/appointments')
+@api_login_required()
+def list_appointments():
+    query = _appointments()
+    if request.args.get('status'):
+        query = query.filter(Appointment.status == request.args['status'])
+    date_from, date_to = _date_arg('date_from'), _date_arg('date_to')
+    if date_from:
+        query = query.filter(Appointment.date >= date_from)
+    if date_to:
+        query = query.filter(Appointment.date <= date_to)
+    return list_response('appointments', query, APPOINTMENT_SORTS, 'date', APPOINTMENT_FIELDS)
+
+
+@api.route('/appointments/<int:appointment_id>')
+@api_login_required()
+def get_appointment(appointment_id):
+    appointment = _appointments().filter(Appointment.id == appointment_id).first()
+    return detail_response('appointments', appointment, APPOINTMENT_FIELDS)
+
+
+# ==================== Treatments ====================
+
+
+def _treatments(model=Treatment):
+    """Treatments (or archived treatments) visible to the current user"""
+    # Medical records keep naming a soft-deleted doctor or patient
+    query = model.query.options(
+        joinedload(model.patient),
+        joinedload(model.doctor)
+    ).execution_options(include_deleted=True)
+    if current_user.role == 'doctor':
+        query = query.filter(model.doctor_id == _own_doctor_id())
+    elif current_user.role == 'patient':
+        query = query.filter(model.patient_id == _own_patient_id())
+    return query
+
+
+@api.route('/treatments')
+@api_login_required()
+def list_treatments():
+    query, archived = _treatments(), _treatments(TreatmentArchive)
+    patient_id = request.args.get('patient_id', type=int)
+    if patient_id:
+        query = query.filter(Treatment.patient_id == patient_id)
+        archived = archived.filter(TreatmentArchive.patient_id == patient_id)
+    return list_response('treatments', query, TREATMENT_SORTS, 'id', TREATMENT_FIELDS,
+                         archive=(archived, TREATMENT_ARCHIVE_SORTS))
+
+
+@api.route('/treatments/<int:treatment_id>')
+@api_login_required()
+def get_treatment(treatment_id):
+    treatment = _treatments().filter(Treatment.id == treatment_id).first() \
+        or _treatments(TreatmentArchive).filter(TreatmentArchive.id == treatment_id).first()
+    return detail_response('treatments', treatment, TREATMENT_FIELDS)
@@ -0,0 +1,102 @@
+"""Archival of closed appointments.
+
+Completed and cancelled appointments dated more than ARCHIVE_AFTER_MONTHS
+months ago are moved, with their treatments, into appointment_archive and
+treatment_archive. The move runs in chunks of ARCHIVE_CHUNK_SIZE
+appointments, each chunk copied and deleted in its own transaction, so
+the hot appointment/treatment tables (and their indexes) only hold recent
+and upcoming rows. The `archive_appointments` job runs it every
+ARCHIVE_INTERVAL seconds.
+
+Archived rows keep their ids. Treatment history pages read both tables
+through patient_treatments(), and doctor_patient visit counts include
+archived visits. Archived treatments are no longer in the full-text
+search index.
+"""
+from datetime import date
+from sqlalchemy import select, insert, delete
+from sqlalchemy.orm import joinedload
+from app.app_init import db
+from app.app_models import Appointment, Treatment, AppointmentArchive, TreatmentArchive
+
+
+ARCHIVE_STATUSES = ('Completed', 'Cancelled')
+
+APPOINTMENT_COLUMNS = ['id', 'patient_id', 'doctor_id', 'date', 'time', 'reason', 'status', 'created_at']
+TREATMENT_COLUMNS = ['id', 'appointment_id', 'patient_id', 'doctor_id', 'diagnosis',
+                     'prescription', 'notes', 'created_at']
+
+
+def archive_cutoff(months, today=None):
+    """First day that stays in the hot tables: today minus months"""
+    today = today or date.today()
+    month = today.month - months
+    year = today.year + (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    # Clamp e.g. 31 March - 1 month to 28/29 February
+    for day in (today.day, 30, 29, 28):
+        try:
+            return date(year, month, day)
+        except ValueError:
+            continue
+
+
+def _archive_chunk(conn, ids):
+    appointments = Appointment.__table__
+    treatments = Treatment.__table__
+    conn.execute(insert(AppointmentArchive.__table__).from_select(
+        APPOINTMENT_COLUMNS,
+        select(*[appointments.c[name] for name in APPOINTMENT_COLUMNS]).where(appointments.c.id.in_(ids))
+    ))
+    moved = conn.execute(insert(TreatmentArchive.__table__).from_select(
+        TREATMENT_COLUMNS,
+        select(*[treatments.c[name] for name in TREATMENT_COLUMNS]).where(treatments.c.appointment_id.in_(ids))
+    )).rowcount
+    conn.execute(delete(treatments).where(treatments.c.appointment_id.in_(ids)))
+    conn.execute(delete(appointments).where(appointments.c.id.in_(ids)))
+    return moved
+
+
+def archive_appointments(months=12, chunk_size=1000, progress=None):
+    """Move closed appointments older than months into the archive tables"""
+    from app.app_stats import invalidate_dashboard_stats
+    from app.app_http_cache import bump_versions
+
+    cutoff = archive_cutoff(months)
+    candidates = select(Appointment.id, Appointment.patient_id).where(
+        Appointment.status.in_(ARCHIVE_STATUSES),
+        Appointment.date < cutoff
+    ).order_by(Appointment.id).limit(chunk_size)
+    totals = {'appointments': 0, 'treatments': 0, 'cutoff': cutoff.isoformat()}
+    patients = set()
+    while True:
+        with db.engine.begin() as conn:
+            rows = conn.execute(candidates).all()
+            if not rows:
+                break
+            totals['treatments'] += _archive_chunk(conn, [id for id, _ in rows])
+        totals['appointments'] += len(rows)
+        patients.update(patient_id for _, patient_id in rows)
+        if progress:
+            progress(totals)
+
+    if totals['appointments']:
+        # Core statements bypass the session hooks that keep these fresh
+        invalidate_dashboard_stats('total_appointments')
+        bump_versions(*[f'patient:{id}' for id in patients])
+    return totals
+
+
+def patient_treatments(patient_id):
+    """Archived then current treatments of patient_id, with doctor and appointment loaded"""
+    archived = TreatmentArchive.query.options(
+        joinedload(TreatmentArchive.doctor),
+        joinedload(TreatmentArchive.appointment)
+    ).filter(TreatmentArchive.patient_id == patient_id) \
+        .order_by(TreatmentArchive.id).execution_options(include_deleted=True).all()
+    current = Treatment.query.options(
+        joinedload(Treatment.doctor),
+        joinedload(Treatment.appointment)
+    ).filter(Treatment.patient_id == patient_id) \
+        .order_by(Treatment.id).execution_options(include_deleted=True).all()
+    return archived + current
@@ -0,0 +1,233 @@
+"""Doctor availability and the in-memory free-slot index.
+
+A day is split into SLOT_MINUTES slots and stored as two bitmaps per doctor
+and date: `working` (from the weekly DoctorSchedule template and any
+ScheduleException for that date) and `busy` (live appointments). Free slots
+are `working & ~busy`, so answering "free slots over the next N days" is a
+handful of integer operations per day.
+
+Days are loaded lazily per doctor and kept up to date from committed
+Appointment changes in this process. Entries also expire after
+AVAILABILITY_INDEX_TTL seconds so that bookings made by other workers are
+picked up; the unique slot index remains the source of truth for booking.
+"""
+import threading
+import time as _time
+from datetime import datetime, time, timedelta
+from sqlalchemy import event, inspect
+from app.app_init import db
+from app.app_models import Appointment, DoctorSchedule, ScheduleException
+
+
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+DEFAULT_DAY_START = time(9, 0)  # used when a doctor has no weekly template
+DEFAULT_DAY_END = time(17, 0)
+AVAILABILITY_INDEX_TTL = 60
+
+
+def slot_number(value):
+    """Index of the slot containing a time of day"""
+    return (value.hour * 60 + value.minute) // SLOT_MINUTES
+
+
+def slot_time(number):
+    minutes = number * SLOT_MINUTES
+    return time(minutes // 60, minutes % 60)
+
+
+def range_mask(start, end):
+    """Bitmap of the slots starting in [start, end)"""
+    first = slot_number(start)
+    last = (end.hour * 60 + end.minute + SLOT_MINUTES - 1) // SLOT_MINUTES
+    if end == time(0, 0) or last > SLOTS_PER_DAY:
+        last = SLOTS_PER_DAY
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def mask_times(mask):
+    """Slot start times for the set bits of a bitmap, in order"""
+    times = []
+    while mask:
+        low = mask & -mask
+        times.append(slot_time(low.bit_length() - 1))
+        mask ^= low
+    return times
+
+
+class DoctorSlots:
+    """Working and busy bitmaps for one doctor, keyed by date"""
+
+    def __init__(self, doctor_id):
+        self.doctor_id = doctor_id
+        self.working = {}
+        self.busy = {}
+        self.loaded_at = _time.monotonic()
+
+    def load(self, start, end):
+        """Fill in any dates in [start, end] that are not loaded yet"""
+        missing = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        missing = [d for d in missing if d not in self.working]
+        if not missing:
+            return
+        first, last = missing[0], missing[-1]
+
+        weekly = {}
+        templates = DoctorSchedule.query.filter_by(doctor_id=self.doctor_id).all()
+        for row in templates:
+            weekly[row.weekday] = weekly.get(row.weekday, 0) | range_mask(row.start_time, row.end_time)
+        if not templates:
+            default = range_mask(DEFAULT_DAY_START, DEFAULT_DAY_END)
+            weekly = {weekday: default for weekday in range(7)}
+
+        exceptions = {}
+        for row in ScheduleException.query.filter(
+            ScheduleException.doctor_id == self.doctor_id,
+            ScheduleException.date >= first,
+            ScheduleException.date <= last
+        ):
+            exceptions.setdefault(row.date, []).append(row)
+
+        busy = {}
+        for day, slot in db.session.query(Appointment.date, Appointment.time).filter(
+            Appointment.doctor_id == self.doctor_id,
+            Appointment.date >= first,
+            Appointment.date <= last,
+            Appointment.status != 'Cancelled'
+        ):
+            busy[day] = busy.get(day, 0) | (1 << slot_number(slot))
+
+        for day in missing:
+            mask = weekly.get(day.weekday(), 0)
+            for row in exceptions.get(day, []):
+                if row.start_time and row.end_time:
+                    change = range_mask(row.start_time, row.end_time)
+                else:
+                    change = (1 << SLOTS_PER_DAY) - 1
+                mask = mask | change if row.is_available else mask & ~change
+            self.working[day] = mask
+            self.busy[day] = busy.get(day, 0)
+
+    def free_mask(self, day):
+        return self.working.get(day, 0) & ~self.busy.get(day, 0)
+
+    def mark(self, day, slot, busy):
+        if day not in self.busy:
+            return  # not loaded yet; it will be read from the database when needed
+        bit = 1 << slot_number(slot)
+        self.busy[day] = self.busy[day] | bit if busy else self.busy[day] & ~bit
+
+
+class AvailabilityIndex:
+    """Process-wide registry of DoctorSlots"""
+
+    def __init__(self, ttl=AVAILABILITY_INDEX_TTL):
+        self.ttl = ttl
+        self._doctors = {}
+        self._lock = threading.RLock()
+
+    def _slots(self, doctor_id):
+        entry = self._doctors.get(doctor_id)
+        if entry is None or _time.monotonic() - entry.loaded_at > self.ttl:
+            entry = self._doctors[doctor_id] = DoctorSlots(doctor_id)
+        return entry
+
+    def free_slots(self, doctor_id, start=None, days=7, now=None):
+        """{date: [time, ...]} of free slots from start over the next days"""
+        now = now or datetime.now()
+        start = start or now.date()
+        end = start + timedelta(days=days - 1)
+        with self._lock:
+            slots = self._slots(doctor_id)
+            slots.load(start, end)
+            result = {}
+            for offset in range(days):
+                day = start + timedelta(days=offset)
+                mask = slots.free_mask(day)
+                if day < now.date():
+                    mask = 0
+                elif day == now.date():
+                    # drop slots that have already started
+                    mask &= ~((1 << (slot_number(now.time()) + 1)) - 1)
+                result[day] = mask_times(mask)
+            return result
+
+    def is_bookable(self, doctor_id, day, slot):
+        """Whether slot starts on the SLOT_MINUTES grid inside the doctor's working hours on day.
+
+        Busy slots are not checked here: the unique slot index decides those.
+        """
+        if slot.minute % SLOT_MINUTES or slot.second or slot.microsecond:
+            return False
+        with self._lock:
+            slots = self._slots(doctor_id)
+            slots.load(day, day)
+            return bool(slots.working.get(day, 0) & (1 << slot_number(slot)))
+
+    def mark(self, doctor_id, day, slot, busy):
+        with self._lock:
+            entry = self._doctors.get(doctor_id)
+            if entry is not None:
+                entry.mark(day, slot, busy)
+
+    def invalidate(self, doctor_id=None):
+        with self._lock:
+            if doctor_id is None:
+                self._doctors.clear()
+            else:
+                self._doctors.pop(doctor_id, None)
+
+
+availability_index = AvailabilityIndex()
+
+
+def _is_live(status):
+    return status != 'Cancelled'
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_slot_changes(session, flush_context):
+    changes = session.info.setdefault('slot_changes', [])
+    stale = session.info.setdefault('stale_schedules', set())
+    for obj in session.new:
+        if isinstance(obj, Appointment) and _is_live(obj.status):
+            changes.append((obj.doctor_id, obj.date, obj.time, True))
+        elif isinstance(obj, (DoctorSchedule, ScheduleException)):
+            stale.add(obj.doctor_id)
+    for obj in session.deleted:
+        if isinstance(obj, Appointment) and _is_live(obj.status):
+            changes.append((obj.doctor_id, obj.date, obj.time, False))
+        elif isinstance(obj, (DoctorSchedule, ScheduleException)):
+            stale.add(obj.doctor_id)
+    for obj in session.dirty:
+        if isinstance(obj, (DoctorSchedule, ScheduleException)):
+            stale.add(obj.doctor_id)
+        if not isinstance(obj, Appointment):
+            continue
+        state = inspect(obj)
+        old = {}
+        for name in ('doctor_id', 'date', 'time', 'status'):
+            history = state.attrs[name].history
+            old[name] = history.deleted[0] if history.deleted else getattr(obj, name)
+        if old == {n: getattr(obj, n) for n in old}:
+            continue
+        if _is_live(old['status']):
+            changes.append((old['doctor_id'], old['date'], old['time'], False))
+        if _is_live(obj.status):
+            changes.append((obj.doctor_id, obj.date, obj.time, True))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_slot_changes(session):
+    for doctor_id in session.info.pop('stale_schedules', ()):
+        availability_index.invalidate(doctor_id)
+    for doctor_id, day, slot, busy in session.info.pop('slot_changes', ()):
+        availability_index.mark(doctor_id, day, slot, busy)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_slot_changes(session):
+    session.info.pop('slot_changes', None)
+    session.info.pop('stale_schedules', None)
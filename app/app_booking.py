@@ -0,0 +1,72 @@
+"""Appointment booking engine.
+
+A slot must start on the availability grid and fall inside the doctor's
+working hours (weekly schedule plus exceptions, see app_availability);
+anything else is refused with SlotUnavailable before touching the table.
+Slot uniqueness is enforced by the partial unique index
+uq_appointment_doctor_slot, so the insert itself is the availability check:
+two concurrent requests for the same slot cannot both commit. Transient lock
+errors (SQLite "database is locked") are retried with a short backoff.
+"""
+import random
+import time as _time
+from sqlalchemy.exc import IntegrityError, OperationalError
+from app.app_init import db
+from app.app_models import Appointment
+from app.app_availability import availability_index
+
+
+MAX_RETRIES = 5
+
+
+class SlotUnavailable(Exception):
+    """The requested slot is taken or outside the doctor's hours; carries alternative slots"""
+
+    def __init__(self, suggestions, message='This time slot is already booked.'):
+        super().__init__(message)
+        self.suggestions = suggestions
+
+
+def suggest_free_slots(doctor_id, day, after, limit=3, days_ahead=7, taken=True):
+    """Next free (date, time) pairs for a doctor, starting after the given slot"""
+    if taken:
+        # The failed insert means our copy of this day may be stale
+        availability_index.mark(doctor_id, day, after, True)
+    free = availability_index.free_slots(doctor_id, start=day, days=days_ahead + 1)
+    suggestions = []
+    for current in sorted(free):
+        for slot in free[current]:
+            if current == day and slot <= after:
+                continue
+            suggestions.append((current, slot))
+            if len(suggestions) >= limit:
+                return suggestions
+    return suggestions
+
+
+def book_slot(patient_id, doctor_id, day, slot, reason):
+    """Insert a Booked appointment atomically or raise SlotUnavailable"""
+    if not availability_index.is_bookable(doctor_id, day, slot):
+        raise SlotUnavailable(suggest_free_slots(doctor_id, day, slot, taken=False),
+                              'The doctor is not available at this time.')
+    for attempt in range(MAX_RETRIES):
+        appointment = Appointment(
+            patient_id=patient_id,
+            doctor_id=doctor_id,
+            date=day,
+            time=slot,
+            reason=reason,
+            status='Booked'
+        )
+        db.session.add(appointment)
+        try:
+            db.session.commit()
+            return appointment
+        except IntegrityError:
+            db.session.rollback()
+            raise SlotUnavailable(suggest_free_slots(doctor_id, day, slot))
+        except OperationalError:
+            db.session.rollback()
+            if attempt == MAX_RETRIES - 1:
+                raise
+            _time.sleep(0.01 * (2 ** attempt) * (1 + random.random()))
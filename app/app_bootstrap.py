@@ -0,0 +1,156 @@
+"""First-run database setup, kept out of create_app().
+
+bootstrap() creates missing tables, applies pending migrations and seeds
+the default admin and departments. It is idempotent and runs under a
+cross-process lock, so several workers booting at once against a fresh
+database set it up exactly once: a Postgres advisory lock, or an flock on
+instance/bootstrap.lock for SQLite and other same-host databases.
+
+`python scripts/manage_users.py bootstrap` runs it explicitly (e.g. as a
+release step). With AUTO_BOOTSTRAP on (the default) the first app context
+of each process checks the schema version with one query and runs
+bootstrap() only when the database is behind; set AUTO_BOOTSTRAP=0 once
+deploys bootstrap explicitly.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from flask import appcontext_pushed
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from app.app_init import db
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# pg_advisory_lock key ('HMSB')
+LOCK_KEY = 0x484D5342
+
+DEFAULT_DEPARTMENTS = [
+    ('Cardiology', 'Heart and cardiovascular diseases'),
+    ('Neurology', 'Nervous system disorders'),
+    ('Orthopedics', 'Bones and joints'),
+    ('Pediatrics', 'Child healthcare'),
+    ('Dermatology', 'Skin disorders'),
+    ('General Medicine', 'General medical care'),
+    ('Psychiatry', 'Mental health'),
+]
+
+
+def latest_version():
+    from app.app_migrations import MIGRATIONS
+    return MIGRATIONS[-1][0]
+
+
+def schema_is_current():
+    """True when the schema is at the latest migration (one query, no DDL)"""
+    from app.app_migrations import schema_version
+    try:
+        with db.engine.connect() as conn:
+            version = conn.execute(db.select(db.func.max(schema_version.c.version))).scalar()
+    except (OperationalError, ProgrammingError):
+        # No schema_version table yet: a fresh database
+        return False
+    return (version or 0) >= latest_version()
+
+
+@contextmanager
+def bootstrap_lock(engine, instance_path):
+    """Hold a lock shared by every process that bootstraps this database"""
+    if engine.dialect.name == 'postgresql':
+        with engine.connect() as conn:
+            conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': LOCK_KEY})
+                conn.commit()
+        return
+
+    os.makedirs(instance_path, exist_ok=True)
+    with open(os.path.join(instance_path, 'bootstrap.lock'), 'a+') as handle:
+        if fcntl:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        else:
+            handle.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def seed_defaults():
+    """Create the default admin and departments if missing; returns what was created"""
+    from app.app_models import User, Department
+
+    created = []
+    if not User.query.filter_by(role='admin').first():
+        admin = User(name='Admin', email='admin@hospital.com', role='admin')
+        admin.set_password('admin@123')
+        db.session.add(admin)
+        created.append('admin')
+    if not db.session.query(Department.id).first():
+        db.session.add_all([Department(name=name, description=description)
+                            for name, description in DEFAULT_DEPARTMENTS])
+        created.append('departments')
+    if created:
+        db.session.commit()
+    return created
+
+
+def bootstrap(app):
+    """Create tables, migrate and seed under the bootstrap lock; returns a summary"""
+    from app.app_migrations import upgrade
+
+    with bootstrap_lock(db.engine, app.instance_path):
+        db.create_all()
+        applied = upgrade()
+        created = seed_defaults()
+    return {'migrations': applied, 'created': created}
+
+
+def _report(summary):
+    if summary['migrations']:
+        print(f"✓ Applied schema migrations: {', '.join(map(str, summary['migrations']))}")
+    if 'admin' in summary['created']:
+        print("✓ Default admin user created: admin@hospital.com / admin@123")
+    if 'departments' in summary['created']:
+        print("✓ Default departments created")
+
+
+def init_bootstrap(app):
+    """Bootstrap lazily on the first app context of this process when AUTO_BOOTSTRAP is on"""
+    if not app.config['AUTO_BOOTSTRAP']:
+        return
+    state = {'done': False, 'running': False, 'lock': threading.RLock()}
+
+    def _ensure(sender, **extra):
+        if state['done']:
+            return
+        with state['lock']:
+            # 'running' covers app contexts pushed by bootstrap() on this thread
+            if state['done'] or state['running']:
+                return
+            state['running'] = True
+            try:
+                if not schema_is_current():
+                    _report(bootstrap(sender))
+                state['done'] = True
+            finally:
+                state['running'] = False
+
+    appcontext_pushed.connect(_ensure, app, weak=False)
@@ -0,0 +1,364 @@
+"""Streaming bulk import/export of patients, doctors and appointments.
+
+Files are read and written one row at a time (CSV or JSON lines), grouped
+into chunks, and each chunk is written with Core INSERTs in its own
+transaction. Password hashing for a chunk is spread over a process pool.
+Rows that fail validation, or whose email already exists, are skipped and
+reported rather than aborting the run.
+
+Exports never include password hashes, but patient and doctor imports
+require a plain-text password column. To load an export into another
+database, add a password column (e.g. a temporary password handed to
+each user) first; rows without one are reported as skipped.
+"""
+import csv
+import json
+import time
+from functools import partial
+from datetime import date, datetime, time as dt_time
+from itertools import islice
+from werkzeug.security import generate_password_hash
+from app.app_passwords import password_hasher, process_pool
+from app.app_init import db
+from app.app_http_cache import mark_stale
+from app.app_models import User, Doctor, Patient, Appointment, Department, name_columns
+from app.app_doctor_patients import record_visits
+from app.app_reports import count_appointments
+
+
+DEFAULT_CHUNK_SIZE = 1000
+
+EXPORT_FIELDS = {
+    'patients': ['name', 'email', 'age', 'gender', 'phone', 'address', 'medical_history'],
+    'doctors': ['name', 'email', 'specialization', 'department', 'license_number', 'phone'],
+    'appointments': ['patient_email', 'doctor_email', 'date', 'time', 'reason', 'status'],
+}
+
+
+class ImportReport:
+    """Counters and a sample of errors for one import run"""
+
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.skipped = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    def error(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < 20:
+            self.errors.append((line, message))
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self):
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return 'jsonl' if path.endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+SCALARS = (str, int, float, bool, type(None))
+
+
+def _parse_json_row(line):
+    """The JSON object on line, or an error message"""
+    try:
+        row = json.loads(line)
+    except ValueError as exc:
+        return None, f'invalid JSON: {exc}'
+    if not isinstance(row, dict):
+        return None, 'expected a JSON object'
+    nested = [key for key, value in row.items() if not isinstance(value, SCALARS)]
+    if nested:
+        return None, f"fields must be plain values: {', '.join(nested)}"
+    return row, None
+
+
+def read_rows(handle, fmt, report):
+    """Yield (line_number, dict) without loading the whole file; bad lines are reported and skipped"""
+    if fmt == 'jsonl':
+        for number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            report.read += 1
+            row, problem = _parse_json_row(line)
+            if problem:
+                report.error(number, problem)
+                continue
+            yield number, row
+    else:
+        for number, row in enumerate(csv.DictReader(handle), start=2):
+            report.read += 1
+            yield number, row
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _clean(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _hash_all(passwords, pool):
+    hash_one = partial(generate_password_hash, method=password_hasher.method)
+    if pool is None:
+        return [hash_one(p) for p in passwords]
+    return list(pool.map(hash_one, passwords, chunksize=16))
+
+
+def _existing_emails(emails):
+    if not emails:
+        return set()
+    return {e for (e,) in db.session.query(User.email).filter(User.email.in_(emails))}
+
+
+def _insert_users(rows, role, pool, report):
+    """Insert users for rows (dicts with line/name/email/password); returns {email: id}"""
+    existing = _existing_emails([r['email'] for r in rows])
+    fresh, seen = [], set()
+    for row in rows:
+        if row['email'] in existing or row['email'] in seen:
+            report.error(row['line'], f"email {row['email']} already exists")
+            continue
+        seen.add(row['email'])
+        fresh.append(row)
+    if not fresh:
+        return {}
+    hashes = _hash_all([r['password'] for r in fresh], pool)
+    now = datetime.utcnow()
+    db.session.execute(db.insert(User), [
+        {'name': r['name'], 'email': r['email'], 'password': h, 'role': role, 'created_at': now}
+        for r, h in zip(fresh, hashes)
+    ])
+    return dict(db.session.query(User.email, User.id).filter(User.email.in_([r['email'] for r in fresh])))
+
+
+def _person(line, raw, report):
+    name, email, password = _clean(raw.get('name')), _clean(raw.get('email')), _clean(raw.get('password'))
+    if not name or not email or not password:
+        report.error(line, 'name, email and password are required')
+        return None
+    return {'line': line, 'name': name, 'email': email, 'password': password, 'raw': raw}
+
+
+def _import_patients(chunk, pool, report):
+    rows = [r for r in (_person(line, raw, report) for line, raw in chunk) if r]
+    ids = _insert_users(rows, 'patient', pool, report)
+    values = []
+    for row in rows:
+        if row['email'] not in ids:
+            continue
+        raw = row['raw']
+        age = _clean(raw.get('age'))
+        values.append({
+            'user_id': ids[row['email']],
+            **name_columns(row['name']),
+            'age': int(age) if age and age.isdigit() else None,
+            'gender': _clean(raw.get('gender')),
+            'phone': _clean(raw.get('phone')),
+            'address': _clean(raw.get('address')),
+            'medical_history': _clean(raw.get('medical_history')),
+            'created_at': datetime.utcnow(),
+        })
+    if values:
+        db.session.execute(db.insert(Patient), values)
+        mark_stale(db.session, 'patients')
+    return len(values)
+
+
+def _import_doctors(chunk, pool, report, departments):
+    rows = []
+    for line, raw in chunk:
+        row = _person(line, raw, report)
+        if row is None:
+            continue
+        if not _clean(raw.get('specialization')):
+            report.error(line, 'specialization is required')
+            continue
+        rows.append(row)
+    ids = _insert_users(rows, 'doctor', pool, report)
+    values = []
+    for row in rows:
+        if row['email'] not in ids:
+            continue
+        raw = row['raw']
+        department = _clean(raw.get('department'))
+        values.append({
+            'user_id': ids[row['email']],
+            **name_columns(row['name']),
+            'specialization': _clean(raw.get('specialization')),
+            'department_id': departments.get(department.lower()) if department else None,
+            'license_number': _clean(raw.get('license_number')),
+            'phone': _clean(raw.get('phone')),
+            'created_at': datetime.utcnow(),
+        })
+    if values:
+        db.session.execute(db.insert(Doctor), values)
+        mark_stale(db.session, 'doctors')
+    return len(values)
+
+
+def _import_appointments(chunk, report):
+    emails = set()
+    for _, raw in chunk:
+        emails.update(filter(None, (_clean(raw.get('patient_email')), _clean(raw.get('doctor_email')))))
+    patients = dict(db.session.query(User.email, Patient.id).join(Patient.user).filter(User.email.in_(emails)))
+    doctors = dict(db.session.query(User.email, Doctor.id).join(Doctor.user).filter(User.email.in_(emails)))
+    values = []
+    now = datetime.utcnow()
+    for line, raw in chunk:
+        patient_id = patients.get(_clean(raw.get('patient_email')))
+        doctor_id = doctors.get(_clean(raw.get('doctor_email')))
+        if not patient_id or not doctor_id:
+            report.error(line, 'unknown patient_email or doctor_email')
+            continue
+        try:
+            day = datetime.strptime(_clean(raw.get('date')), '%Y-%m-%d').date()
+            slot = datetime.strptime(_clean(raw.get('time'))[:5], '%H:%M').time()
+        except (TypeError, ValueError):
+            report.error(line, 'date must be YYYY-MM-DD and time HH:MM')
+            continue
+        values.append({
+            'line': line, 'patient_id': patient_id, 'doctor_id': doctor_id, 'date': day, 'time': slot,
+            'reason': _clean(raw.get('reason')), 'status': _clean(raw.get('status')) or 'Booked',
+            'created_at': now, 'updated_at': now,
+        })
+
+    # Drop rows that would violate the unique live-slot index instead of failing the chunk
+    live = [v for v in values if v['status'] != 'Cancelled']
+    taken = set()
+    if live:
+        taken = set(db.session.query(Appointment.doctor_id, Appointment.date, Appointment.time).filter(
+            Appointment.doctor_id.in_({v['doctor_id'] for v in live}),
+            Appointment.date.in_({v['date'] for v in live}),
+            Appointment.status != 'Cancelled'
+        ))
+    accepted = []
+    for value in values:
+        key = (value['doctor_id'], value['date'], value['time'])
+        if value['status'] != 'Cancelled':
+            if key in taken:
+                report.error(value['line'], 'doctor already has an appointment in this slot')
+                continue
+            taken.add(key)
+        value.pop('line')
+        accepted.append(value)
+    if accepted:
+        db.session.execute(db.insert(Appointment), accepted)
+        # Core inserts skip the ORM events that maintain doctor_patient and the report rollups
+        record_visits(db.session.connection(),
+                      [(v['doctor_id'], v['patient_id'], v['date']) for v in accepted])
+        count_appointments(db.session.connection(),
+                           [(v['date'], v['doctor_id'], v['status']) for v in accepted])
+        mark_stale(db.session, *{f"patient:{v['patient_id']}" for v in accepted})
+    return len(accepted)
+
+
+def import_file(kind, path, fmt=None, chunk_size=DEFAULT_CHUNK_SIZE, workers=None, progress=None):
+    """Stream rows of kind from path into the database; returns an ImportReport"""
+    from app.app_availability import availability_index
+    from app.app_stats import invalidate_dashboard_stats
+
+    report = ImportReport()
+    fmt = detect_format(path, fmt)
+    departments = {name.lower(): id for id, name in db.session.query(Department.id, Department.name)}
+    pool = process_pool(workers) if kind != 'appointments' and workers != 1 else None
+    try:
+        with open(path, newline='', encoding='utf-8') as handle:
+            for chunk in chunked(read_rows(handle, fmt, report), chunk_size):
+                try:
+                    if kind == 'patients':
+                        inserted = _import_patients(chunk, pool, report)
+                    elif kind == 'doctors':
+                        inserted = _import_doctors(chunk, pool, report, departments)
+                    else:
+                        inserted = _import_appointments(chunk, report)
+                    db.session.commit()
+                except Exception as exc:
+                    db.session.rollback()
+                    report.error(chunk[0][0], f'chunk of {len(chunk)} rows rolled back: {exc}')
+                    inserted = 0
+                report.inserted += inserted
+                if progress:
+                    progress(report)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        # Core inserts bypass the ORM session events that keep these fresh
+        invalidate_dashboard_stats()
+        availability_index.invalidate()
+    return report
+
+
+def _export_query(kind):
+    if kind == 'patients':
+        return db.session.query(
+            User.name, User.email, Patient.age, Patient.gender, Patient.phone,
+            Patient.address, Patient.medical_history
+        ).join(Patient.user).order_by(Patient.id)
+    if kind == 'doctors':
+        return db.session.query(
+            User.name, User.email, Doctor.specialization, Department.name,
+            Doctor.license_number, Doctor.phone
+        ).join(Doctor.user).outerjoin(Department, Department.id == Doctor.department_id).order_by(Doctor.id)
+    patient_user = db.aliased(User)
+    doctor_user = db.aliased(User)
+    return db.session.query(
+        patient_user.email, doctor_user.email, Appointment.date, Appointment.time,
+        Appointment.reason, Appointment.status
+    ).join(Patient, Patient.id == Appointment.patient_id).join(patient_user, patient_user.id == Patient.user_id) \
+     .join(Doctor, Doctor.id == Appointment.doctor_id).join(doctor_user, doctor_user.id == Doctor.user_id) \
+     .order_by(Appointment.id)
+
+
+def format_value(value):
+    """value as written to JSON/CSV exports: times as HH:MM, dates ISO"""
+    if isinstance(value, dt_time):
+        return value.strftime('%H:%M')
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def export_rows(kind, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield export dicts for kind, fetching chunk_size rows at a time"""
+    fields = EXPORT_FIELDS[kind]
+    for row in _export_query(kind).yield_per(chunk_size):
+        yield {field: format_value(value) for field, value in zip(fields, row)}
+
+
+def export_file(kind, path, fmt=None, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """Write every row of kind to path; returns the number of rows written"""
+    fmt = detect_format(path, fmt)
+    written = 0
+    with open(path, 'w', newline='', encoding='utf-8') as handle:
+        writer = None
+        if fmt == 'csv':
+            writer = csv.DictWriter(handle, fieldnames=EXPORT_FIELDS[kind])
+            writer.writeheader()
+        for row in export_rows(kind, chunk_size):
+            if writer:
+                writer.writerow(row)
+            else:
+                handle.write(json.dumps(row) + '\n')
+            written += 1
+            if progress and written % chunk_size == 0:
+                progress(written)
+    return written
@@ -0,0 +1,123 @@
+"""Small key/value cache with pluggable backends.
+
+The default backend is an in-process, size-bounded LRU with per-key TTL.
+Set CACHE_URL=redis://host:port/db to share entries between gunicorn
+workers (requires the optional `redis` package).
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryBackend:
+    """Thread-safe LRU dict whose entries expire after a TTL"""
+
+    # Each process has its own copy
+    shared = False
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisBackend:
+    """Backend storing pickled values in Redis, shared by all workers"""
+
+    shared = True
+
+    def __init__(self, url, prefix='hms:'):
+        import redis
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        raw = self._client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        self._client.set(self.prefix + key, pickle.dumps(value), ex=int(ttl) if ttl else None)
+
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*[self.prefix + k for k in keys])
+
+    def clear(self):
+        for key in self._client.scan_iter(self.prefix + '*'):
+            self._client.delete(key)
+
+
+def backend_from_url(url, max_entries=1024):
+    """Build a backend for a CACHE_URL such as memory:// or redis://..."""
+    if not url or url.startswith('memory://'):
+        return MemoryBackend(max_entries=max_entries)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(url)
+    raise ValueError(f'Unsupported CACHE_URL: {url}')
+
+
+class Cache:
+    """Extension-style wrapper; the backend is chosen in init_app"""
+
+    def __init__(self):
+        self.backend = MemoryBackend()
+
+    def init_app(self, app):
+        self.backend = backend_from_url(
+            app.config.get('CACHE_URL'),
+            max_entries=app.config.get('CACHE_MAX_ENTRIES', 1024)
+        )
+
+    @property
+    def shared(self):
+        """True when every worker process sees the same entries"""
+        return self.backend.shared
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def get_many(self, *keys):
+        return [self.backend.get(key) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        self.backend.set(key, value, ttl)
+
+    def set_many(self, mapping, ttl=None):
+        for key, value in mapping.items():
+            self.backend.set(key, value, ttl)
+
+    def delete(self, *keys):
+        self.backend.delete(*keys)
+
+    def clear(self):
+        self.backend.clear()
@@ -0,0 +1,209 @@
+"""Configuration profiles for create_app().
+
+create_app(config) picks a named profile; APP_PROFILE picks it when no
+name is passed, and `production` is the default. Each setting resolves,
+highest priority first, from:
+
+    keyword overrides   create_app('testing', DATABASE_URL=...)
+    environment         DATABASE_URL, JOB_WORKERS, ... (not for `testing`)
+    the profile         PROFILES below
+    the default         in load_config()
+
+production   the defaults: instance SQLite (or DATABASE_URL), pools for
+             server databases, 1 job thread, outbox file for mail;
+             conditional GETs and the identity cache need CACHE_URL=redis://
+             (or SINGLE_PROCESS=1 for a single worker)
+development  SQL profiling on, fragment cache off so template edits show
+             up, templates reloaded on change, single process
+testing      hermetic (ignores the environment): a private in-memory
+             SQLite database per app, fast password hashing, no job
+             threads or mail, X-Query-Count headers without the JSON
+             request log; tests opt into strict query budgets with
+             SQL_QUERY_BUDGET_STRICT=True. Every create_app()
+             gets its own database, so tests (and pytest-xdist workers)
+             never share state; pass DATABASE_URL for a per-worker file.
+benchmark    SQL profiling on for X-Query-Count, no job threads or mail,
+             login throttling relaxed for the virtual users
+"""
+import itertools
+import os
+from sqlalchemy.pool import SingletonThreadPool
+
+
+class ConfigError(Exception):
+    """Raised for an unknown configuration profile"""
+
+
+_memory_databases = itertools.count(1)
+
+PROFILES = {
+    'production': {},
+    'development': {
+        'SQL_PROFILING': True,
+        'SLOW_QUERY_MS': 50,
+        'FRAGMENT_CACHE_ENABLED': False,
+        'TEMPLATES_AUTO_RELOAD': True,
+        'SINGLE_PROCESS': True,
+    },
+    'testing': {
+        'TESTING': True,
+        'WTF_CSRF_ENABLED': False,
+        'SECRET_KEY': 'testing',
+        'DATABASE_URL': 'memory',
+        'SQLITE_TUNED': False,
+        'SQL_PROFILING': True,
+        'SQL_PROFILE_LOG': False,
+        'SINGLE_PROCESS': True,
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+        'PASSWORD_HASH_WORKERS': 0,
+        'JOB_WORKERS': 0,
+        'MAIL_SINK': 'null://',
+    },
+    'benchmark': {
+        'SQL_PROFILING': True,
+        'SLOW_QUERY_MS': 1000,
+        'JOB_WORKERS': 0,
+        'MAIL_SINK': 'null://',
+        'LOGIN_RATE_PER_IP': 1000000,
+        'LOGIN_FAILURES_PER_ACCOUNT': 1000000,
+    },
+}
+
+# Profiles that ignore environment variables
+HERMETIC = {'testing'}
+
+
+def _flag(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() not in ('0', 'false', 'no', 'off', '')
+
+
+def database_url(instance_path, url=None):
+    """url if set (postgres:// is normalised, 'memory' is a private in-memory SQLite), else the instance SQLite file"""
+    if url == 'memory':
+        # Named shared-cache database: every connection of this app sees the same data
+        return f'sqlite:///file:hms-{os.getpid()}-{next(_memory_databases)}?mode=memory&cache=shared&uri=true'
+    if url:
+        if url.startswith('postgres://'):
+            url = 'postgresql://' + url[len('postgres://'):]
+        return url
+    db_path = os.path.join(instance_path, 'hospital.db').replace('\\', '/')
+    return f"sqlite:///{db_path}"
+
+
+def engine_options(url, settings=None):
+    """Pool settings for server databases; SQLite uses its default pool"""
+    settings = settings or {}
+    if 'mode=memory' in url:
+        # One connection per thread, all on the same in-memory database
+        return {'poolclass': SingletonThreadPool}
+    if url.startswith('sqlite'):
+        return {}
+    return {
+        'pool_size': int(settings.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(settings.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(settings.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(settings.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+    }
+
+
+def profile_name(config=None):
+    name = config or os.environ.get('APP_PROFILE') or 'production'
+    if name not in PROFILES:
+        raise ConfigError(f"unknown profile {name!r}; expected one of {', '.join(PROFILES)}")
+    return name
+
+
+def load_config(app, config=None, **overrides):
+    """Fill app.config from the profile, the environment and overrides"""
+    name = profile_name(config)
+    layers = [overrides] + ([] if name in HERMETIC else [os.environ]) + [PROFILES[name]]
+
+    consumed = set()
+
+    def get(key, default):
+        consumed.add(key)
+        for layer in layers:
+            if key in layer:
+                return layer[key]
+        return default
+
+    c = app.config
+    c['PROFILE'] = name
+    c['SECRET_KEY'] = get('SECRET_KEY', 'your-secret-key-change-in-production')
+
+    # Proxies in front of the app (Render's router) whose X-Forwarded-For is trusted; 0 when exposed directly
+    c['PROXY_FIX_X_FOR'] = int(get('PROXY_FIX_X_FOR', 1))
+
+    # Database: DATABASE_URL (e.g. Postgres on Render) or SQLite in the instance folder
+    os.makedirs(app.instance_path, exist_ok=True)
+    c['SQLALCHEMY_DATABASE_URI'] = database_url(app.instance_path, get('DATABASE_URL', None))
+    c['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(c['SQLALCHEMY_DATABASE_URI'], {
+        key: get(key, default) for key, default in
+        (('DB_POOL_SIZE', 5), ('DB_MAX_OVERFLOW', 10), ('DB_POOL_TIMEOUT', 30), ('DB_POOL_RECYCLE', 1800))
+    })
+    c['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # SQLite tuning: WAL lets readers run alongside the single writer
+    c['SQLITE_TUNED'] = _flag(get('SQLITE_TUNED', True))
+    c['SQLITE_JOURNAL_MODE'] = get('SQLITE_JOURNAL_MODE', 'WAL')
+    c['SQLITE_SYNCHRONOUS'] = get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    c['SQLITE_BUSY_TIMEOUT_MS'] = int(get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    c['SQLITE_MMAP_SIZE'] = int(get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+
+    # Caching: in-process by default, CACHE_URL=redis://... to share across workers
+    c['CACHE_URL'] = get('CACHE_URL', 'memory://')
+    c['STATS_CACHE_TTL'] = int(get('STATS_CACHE_TTL', 60))
+    # Version stamps (app_http_cache) invalidate ETags, fragments and identities; with a
+    # per-process cache they are only trusted when the app runs in a single process
+    c['SINGLE_PROCESS'] = _flag(get('SINGLE_PROCESS', False))
+    c['FRAGMENT_CACHE_ENABLED'] = _flag(get('FRAGMENT_CACHE_ENABLED', True))
+    c['FRAGMENT_CACHE_URL'] = get('FRAGMENT_CACHE_URL', 'memory://')
+    c['FRAGMENT_CACHE_SIZE'] = int(get('FRAGMENT_CACHE_SIZE', 2048))
+    c['IDENTITY_CACHE_ENABLED'] = _flag(get('IDENTITY_CACHE_ENABLED', True))
+    c['IDENTITY_CACHE_URL'] = get('IDENTITY_CACHE_URL', 'memory://')
+    c['IDENTITY_CACHE_SIZE'] = int(get('IDENTITY_CACHE_SIZE', 4096))
+    c['IDENTITY_CACHE_TTL'] = int(get('IDENTITY_CACHE_TTL', 60))
+
+    # Opt-in SQL profiling (Server-Timing headers, JSON logs, query budgets)
+    c['SQL_PROFILING'] = _flag(get('SQL_PROFILING', False))
+    c['SQL_PROFILE_LOG'] = _flag(get('SQL_PROFILE_LOG', True))
+    c['SLOW_QUERY_MS'] = float(get('SLOW_QUERY_MS', 100))
+    budget = get('SQL_QUERY_BUDGET', None)
+    c['SQL_QUERY_BUDGET'] = int(budget) if budget else None
+    c['SQL_QUERY_BUDGET_STRICT'] = _flag(get('SQL_QUERY_BUDGET_STRICT', False))
+
+    # Password hashing runs in its own small process pool; logins are throttled
+    c['PASSWORD_HASH_METHOD'] = get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    c['PASSWORD_HASH_WORKERS'] = int(get('PASSWORD_HASH_WORKERS', 2))
+    c['PASSWORD_HASH_QUEUE'] = int(get('PASSWORD_HASH_QUEUE', 16))
+    c['PASSWORD_HASH_TIMEOUT'] = float(get('PASSWORD_HASH_TIMEOUT', 10))
+    # Failed logins (successes are not counted) per client IP / account per window
+    c['LOGIN_RATE_PER_IP'] = int(get('LOGIN_RATE_PER_IP', 30))
+    c['LOGIN_FAILURES_PER_ACCOUNT'] = int(get('LOGIN_FAILURES_PER_ACCOUNT', 5))
+    c['LOGIN_RATE_WINDOW'] = int(get('LOGIN_RATE_WINDOW', 300))
+
+    # Background jobs (app_jobs) and notification delivery (app_mail)
+    c['JOB_WORKERS'] = int(get('JOB_WORKERS', 1))
+    c['JOB_POLL_SECONDS'] = float(get('JOB_POLL_SECONDS', 1))
+    c['JOB_RETRY_DELAY'] = int(get('JOB_RETRY_DELAY', 30))
+    c['JOB_STALE_SECONDS'] = int(get('JOB_STALE_SECONDS', 600))
+    c['REMINDER_INTERVAL'] = int(get('REMINDER_INTERVAL', 900))
+    c['REMINDER_HOURS_AHEAD'] = int(get('REMINDER_HOURS_AHEAD', 24))
+    c['MAIL_SINK'] = get('MAIL_SINK', 'file://' + os.path.join(app.instance_path, 'outbox.jsonl'))
+    c['MAIL_FROM'] = get('MAIL_FROM', 'no-reply@hospital.local')
+    c['ARCHIVE_AFTER_MONTHS'] = int(get('ARCHIVE_AFTER_MONTHS', 12))
+    c['ARCHIVE_INTERVAL'] = int(get('ARCHIVE_INTERVAL', 24 * 3600))
+    c['ARCHIVE_CHUNK_SIZE'] = int(get('ARCHIVE_CHUNK_SIZE', 1000))
+    c['ROLLUP_REBUILD_INTERVAL'] = int(get('ROLLUP_REBUILD_INTERVAL', 24 * 3600))
+    c['ROLLUP_REBUILD_DAYS'] = int(get('ROLLUP_REBUILD_DAYS', 90))
+
+    # First-run setup on the first app context of a process; 0 when deploys run `bootstrap`
+    c['AUTO_BOOTSTRAP'] = _flag(get('AUTO_BOOTSTRAP', True))
+
+    # Plain Flask/extension settings from the profile or overrides (TESTING, WTF_CSRF_ENABLED, ...)
+    for layer in (PROFILES[name], overrides):
+        c.update({key: value for key, value in layer.items() if key not in consumed})
+    return name
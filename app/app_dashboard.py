@@ -0,0 +1,61 @@
+"""Data behind the doctor dashboard.
+
+Today's and the next seven days' bookings come from one query over that
+date range (patients, users and treatments joined in), split in Python.
+The patient panel is an indexed range read of the maintained
+doctor_patient table, most recent visit first and capped at
+PATIENT_PANEL_LIMIT; the full list lives on the paginated My Patients page.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy.orm import joinedload, contains_eager
+from app.app_init import db
+from app.app_models import Patient, Appointment, DoctorPatient
+
+
+UPCOMING_DAYS = 7
+PATIENT_PANEL_LIMIT = 100
+
+
+class DoctorDashboard:
+    """Panels shown on the doctor dashboard"""
+
+    def __init__(self, today_appointments, upcoming_appointments, patients):
+        self.today_appointments = today_appointments
+        self.upcoming_appointments = upcoming_appointments
+        # (patient, visit_count, last_visit) rows
+        self.patients = patients
+
+
+def upcoming_window(doctor_id, start, end):
+    """Booked appointments of doctor_id between start and end, people preloaded"""
+    # Soft-deleted patients included, like appointments_with_people()
+    return Appointment.query.options(
+        joinedload(Appointment.patient, innerjoin=True),
+        joinedload(Appointment.treatment)
+    ).filter(
+        Appointment.doctor_id == doctor_id,
+        Appointment.date >= start,
+        Appointment.date <= end,
+        Appointment.status == 'Booked'
+    ).order_by(Appointment.date, Appointment.time).execution_options(include_deleted=True).all()
+
+
+def recent_patients(doctor_id, limit=PATIENT_PANEL_LIMIT):
+    """(patient, visit_count, last_visit) for doctor_id, latest visit first"""
+    return db.session.query(Patient, DoctorPatient.visit_count, DoctorPatient.last_visit) \
+        .join(DoctorPatient, DoctorPatient.patient_id == Patient.id) \
+        .join(Patient.user).options(contains_eager(Patient.user)) \
+        .filter(DoctorPatient.doctor_id == doctor_id) \
+        .order_by(DoctorPatient.last_visit.desc(), Patient.id) \
+        .limit(limit).all()
+
+
+def doctor_dashboard_data(doctor_id, today=None):
+    """Everything the doctor dashboard renders, in two queries"""
+    today = today or datetime.now().date()
+    upcoming = upcoming_window(doctor_id, today, today + timedelta(days=UPCOMING_DAYS))
+    return DoctorDashboard(
+        today_appointments=[a for a in upcoming if a.date == today],
+        upcoming_appointments=upcoming,
+        patients=recent_patients(doctor_id),
+    )
@@ -0,0 +1,126 @@
+"""Maintained doctor -> patient relationship table.
+
+doctor_patient has one row per (doctor, patient) pair with at least one
+appointment, holding the first/last visit date and the visit count.
+Inserted appointments bump their pair with an upsert in the same flush;
+deleted or moved appointments recompute only the pairs they touched.
+Core bulk inserts bypass the ORM events and call record_visits()
+themselves; rebuild() recomputes the table from scratch. Visits moved to
+appointment_archive (app_archive) still count.
+"""
+from collections import defaultdict
+from sqlalchemy import event, inspect, case, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from app.app_init import db
+from app.app_models import Appointment, AppointmentArchive, DoctorPatient
+
+
+table = DoctorPatient.__table__
+
+
+def _upsert_statement(dialect, rows):
+    insert = (postgresql if dialect == 'postgresql' else sqlite).insert(table).values(rows)
+    excluded = insert.excluded
+    return insert.on_conflict_do_update(
+        index_elements=[table.c.doctor_id, table.c.patient_id],
+        set_={
+            'first_visit': case((excluded.first_visit < table.c.first_visit, excluded.first_visit),
+                                else_=table.c.first_visit),
+            'last_visit': case((excluded.last_visit > table.c.last_visit, excluded.last_visit),
+                               else_=table.c.last_visit),
+            'visit_count': table.c.visit_count + excluded.visit_count,
+        }
+    )
+
+
+def record_visits(conn, visits):
+    """Add (doctor_id, patient_id, date) visits to their pairs"""
+    pairs = defaultdict(lambda: [None, None, 0])
+    for doctor_id, patient_id, day in visits:
+        pair = pairs[(doctor_id, patient_id)]
+        pair[0] = day if pair[0] is None else min(pair[0], day)
+        pair[1] = day if pair[1] is None else max(pair[1], day)
+        pair[2] += 1
+    if not pairs:
+        return
+    if conn.dialect.name not in ('sqlite', 'postgresql'):
+        refresh_pairs(conn, pairs)
+        return
+    rows = [{'doctor_id': d, 'patient_id': p, 'first_visit': first, 'last_visit': last, 'visit_count': n}
+            for (d, p), (first, last, n) in pairs.items()]
+    for start in range(0, len(rows), 500):
+        conn.execute(_upsert_statement(conn.dialect.name, rows[start:start + 500]))
+
+
+def _visits(conn):
+    """(doctor_id, patient_id, date) of every visit, archived ones included"""
+    visits = select(Appointment.doctor_id, Appointment.patient_id, Appointment.date)
+    # Migration 4 runs this before the archive table exists
+    if inspect(conn).has_table(AppointmentArchive.__tablename__):
+        visits = visits.union_all(
+            select(AppointmentArchive.doctor_id, AppointmentArchive.patient_id, AppointmentArchive.date))
+    return visits.subquery()
+
+
+def refresh_pairs(conn, pairs):
+    """Recompute the given (doctor_id, patient_id) pairs from appointments"""
+    visits = _visits(conn)
+    for doctor_id, patient_id in pairs:
+        first, last, count = conn.execute(
+            select(func.min(visits.c.date), func.max(visits.c.date), func.count())
+            .where(visits.c.doctor_id == doctor_id, visits.c.patient_id == patient_id)
+        ).one()
+        conn.execute(table.delete().where(table.c.doctor_id == doctor_id,
+                                          table.c.patient_id == patient_id))
+        if count:
+            conn.execute(table.insert().values(doctor_id=doctor_id, patient_id=patient_id,
+                                               first_visit=first, last_visit=last, visit_count=count))
+
+
+def rebuild(conn, doctor_ids=None):
+    """Recompute doctor_patient from appointments; returns the number of pairs"""
+    visits = _visits(conn)
+    source = select(
+        visits.c.doctor_id, visits.c.patient_id, func.min(visits.c.date),
+        func.max(visits.c.date), func.count()
+    ).group_by(visits.c.doctor_id, visits.c.patient_id)
+    delete = table.delete()
+    if doctor_ids is not None:
+        source = source.where(visits.c.doctor_id.in_(doctor_ids))
+        delete = delete.where(table.c.doctor_id.in_(doctor_ids))
+    conn.execute(delete)
+    conn.execute(table.insert().from_select(
+        ['doctor_id', 'patient_id', 'first_visit', 'last_visit', 'visit_count'], source))
+    count = select(func.count()).select_from(table)
+    if doctor_ids is not None:
+        count = count.where(table.c.doctor_id.in_(doctor_ids))
+    return conn.execute(count).scalar()
+
+
+@event.listens_for(db.session, 'after_flush')
+def _maintain_doctor_patients(session, flush_context):
+    visits, stale = [], set()
+    for obj in session.new:
+        if isinstance(obj, Appointment):
+            visits.append((obj.doctor_id, obj.patient_id, obj.date))
+    for obj in session.deleted:
+        if isinstance(obj, Appointment):
+            stale.add((obj.doctor_id, obj.patient_id))
+    for obj in session.dirty:
+        if not isinstance(obj, Appointment):
+            continue
+        state = inspect(obj)
+        changed = False
+        old = {}
+        for name in ('doctor_id', 'patient_id', 'date'):
+            history = state.attrs[name].history
+            changed = changed or bool(history.deleted)
+            old[name] = history.deleted[0] if history.deleted else getattr(obj, name)
+        if changed:
+            stale.add((old['doctor_id'], old['patient_id']))
+            stale.add((obj.doctor_id, obj.patient_id))
+    if not visits and not stale:
+        return
+    conn = session.connection()
+    record_visits(conn, [v for v in visits if (v[0], v[1]) not in stale])
+    refresh_pairs(conn, stale)
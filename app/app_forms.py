@@ -150,4 +150,16 @@ class SearchForm(FlaskForm):
         ('name', 'Name'),
         ('specialization', 'Specialization'),
         ('email', 'Email')
+    ])
+
+
+class AdminSearchForm(SearchForm):
+    """Form for admin search across doctors, patients and treatment records"""
+    search_by = SelectField('Search By', validators=[
+        DataRequired(message="Please select a search category")
+    ], choices=[
+        ('doctor_name', 'Doctor Name'),
+        ('specialization', 'Specialization'),
+        ('patient_name', 'Patient Name'),
+        ('treatment', 'Diagnosis / Prescription')
     ])
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""Template fragment cache.
+
+    {% cache 3600, 'landing' %} ... {% endcache %}
+    {% cache 3600, 'departments', cache_version('departments') %} ... {% endcache %}
+
+The first argument is the TTL in seconds and the rest form the key. Keys
+that include cache_version('<scope>') change whenever a commit touches
+that scope (see app_http_cache), so edits show up straight away and the
+old entries simply age out of the LRU. cache_version() is None when the
+stamps are per process and would miss other workers' edits; a key with a
+None part renders without the cache. Cache whole blocks that are costly
+to render, not per-row snippets: a lookup per row costs about as much as
+rendering it. Fragments live in their
+own bounded store (FRAGMENT_CACHE_URL, in-process LRU by default,
+redis:// to share between workers). stats() reports hits, misses and
+the render time the hits saved.
+"""
+import hashlib
+import threading
+import time
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from app.app_cache import backend_from_url, MemoryBackend
+
+
+class FragmentCache:
+    """Bounded store for rendered fragments plus hit/miss accounting"""
+
+    def __init__(self):
+        self.backend = MemoryBackend()
+        self.enabled = True
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('FRAGMENT_CACHE_ENABLED', True)
+        self.backend = backend_from_url(
+            app.config.get('FRAGMENT_CACHE_URL'),
+            max_entries=app.config.get('FRAGMENT_CACHE_SIZE', 2048)
+        )
+        app.jinja_env.add_extension(FragmentCacheExtension)
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.saved_seconds = 0.0
+            self.render_seconds = 0.0
+
+    def render(self, ttl, parts, caller):
+        """Cached output of caller() for the key parts, rendering on a miss"""
+        if not self.enabled or None in parts:
+            return caller()
+        key = 'fragment:' + hashlib.sha1(repr(parts).encode()).hexdigest()
+        entry = self.backend.get(key)
+        if entry is not None:
+            html, cost = entry
+            with self._lock:
+                self.hits += 1
+                self.saved_seconds += cost
+            return Markup(html)
+
+        started = time.perf_counter()
+        html = caller()
+        cost = time.perf_counter() - started
+        self.backend.set(key, (str(html), cost), ttl or None)
+        with self._lock:
+            self.misses += 1
+            self.render_seconds += cost
+        return html
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'render_ms': round(self.render_seconds * 1000, 2),
+                'render_ms_saved': round(self.saved_seconds * 1000, 2),
+            }
+
+
+fragment_cache = FragmentCache()
+
+
+class FragmentCacheExtension(Extension):
+    """{% cache ttl, key, ... %} body {% endcache %}"""
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        call = self.call_method('_render', [args[0], nodes.List(args[1:])])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, ttl, parts, caller):
+        return fragment_cache.render(ttl, parts, caller)
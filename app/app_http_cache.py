@@ -0,0 +1,152 @@
+"""HTTP caching: fingerprinted static assets and conditional GETs.
+
+asset_url('css/base.css') links a static file with a content hash in the
+query string, so those responses can be cached for a year and a deploy
+that changes the file changes its URL.
+
+@conditional_get(scopes) gives a view a weak ETag built from version
+stamps rather than from the rendered body. Each scope ('doctors',
+'patient:<id>', ...) has a random stamp in the shared cache that is
+replaced whenever a commit touches rows in that scope; while the client's
+If-None-Match still matches, the view is skipped and 304 is returned.
+
+A stamp bumped in one worker's in-process cache is invisible to the
+others, so conditional GETs are only served when the cache is shared
+(CACHE_URL=redis://...) or the app runs in one process (SINGLE_PROCESS).
+Writes that bypass the ORM flush (Core bulk inserts) name the scopes they
+touch with mark_stale().
+"""
+import hashlib
+import os
+import uuid
+from functools import wraps
+from flask import request, session, url_for, current_app, make_response
+from flask_login import current_user
+from sqlalchemy import event
+from app.app_init import db, cache
+from app.app_models import User, Doctor, Patient, Appointment, Treatment, Department
+
+
+ASSET_MAX_AGE = 365 * 24 * 3600
+STAMP_TTL = 7 * 24 * 3600
+
+_asset_hashes = {}
+
+
+def asset_url(filename):
+    """url_for('static') plus a content fingerprint (?v=...)"""
+    path = os.path.join(current_app.static_folder, filename)
+    mtime = os.path.getmtime(path)
+    cached = _asset_hashes.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'rb') as handle:
+            digest = hashlib.md5(handle.read()).hexdigest()[:12]
+        cached = _asset_hashes[path] = (mtime, digest)
+    return url_for('static', filename=filename, v=cached[1])
+
+
+def _stamp_key(scope):
+    return f'version:{scope}'
+
+
+def version_stamps(*scopes):
+    """Current stamp per scope; scopes without one get a fresh stamp"""
+    keys = [_stamp_key(s) for s in scopes]
+    stamps = cache.get_many(*keys)
+    missing = {key: uuid.uuid4().hex[:12] for key, stamp in zip(keys, stamps) if stamp is None}
+    if missing:
+        cache.set_many(missing, ttl=STAMP_TTL)
+    return [stamp or missing[key] for key, stamp in zip(keys, stamps)]
+
+
+def bump_versions(*scopes):
+    """Give each scope a new stamp, invalidating ETags derived from it"""
+    if scopes:
+        cache.set_many({_stamp_key(s): uuid.uuid4().hex[:12] for s in scopes}, ttl=STAMP_TTL)
+
+
+def stamps_reliable(app=None):
+    """Whether every worker sees the same stamps (shared cache or a single process)"""
+    app = app or current_app
+    return cache.shared or app.config.get('SINGLE_PROCESS', False)
+
+
+def mark_stale(session, *scopes):
+    """Bump scopes when session commits, for Core writes the flush hook cannot see"""
+    session.info.setdefault('stale_http_scopes', set()).update(scopes)
+
+
+def conditional_get(scopes_for_request):
+    """Serve 304 when nothing in the view's scopes changed since the client's copy.
+
+    scopes_for_request(**view_args) returns the version scopes the page
+    depends on, or None to always render.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Pending flash messages are part of the page, so render them
+            scopes = scopes_for_request(**kwargs) if request.method == 'GET' else None
+            if not scopes or session.get('_flashes') or not stamps_reliable():
+                return view(*args, **kwargs)
+
+            # The navbar shows the current user, so ETags are per user
+            parts = [request.path, str(current_user.get_id())] + version_stamps(*scopes)
+            etag = hashlib.sha1('|'.join(parts).encode()).hexdigest()[:20]
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Cookie')
+            return response
+        return wrapper
+    return decorator
+
+
+def init_http_cache(app):
+    """Register asset_url/cache_version in templates and long-lived headers for fingerprinted assets"""
+    app.jinja_env.globals['asset_url'] = asset_url
+    # None (fragment not cached) when another worker's edit could not bump this worker's stamp
+    app.jinja_env.globals['cache_version'] = lambda scope: version_stamps(scope)[0] if stamps_reliable() else None
+
+    @app.after_request
+    def _cache_static(response):
+        if request.endpoint == 'static' and request.args.get('v') and response.status_code == 200:
+            response.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE}, immutable'
+        return response
+
+
+def _scopes_for(obj):
+    # 'user:<id>' also keys the cached login identity (app_identity)
+    if isinstance(obj, (Treatment, Appointment)):
+        return {f'patient:{obj.patient_id}'}
+    if isinstance(obj, Patient):
+        return {f'patient:{obj.id}', f'user:{obj.user_id}'}
+    if isinstance(obj, Doctor):
+        return {'doctors', f'user:{obj.user_id}'}
+    if isinstance(obj, Department):
+        return {'departments'}
+    if isinstance(obj, User):
+        return {'doctors' if obj.role == 'doctor' else 'patients', f'user:{obj.id}'}
+    return set()
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_stale_scopes(session, flush_context):
+    stale = session.info.setdefault('stale_http_scopes', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        stale.update(_scopes_for(obj))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _bump_stale_scopes(session):
+    bump_versions(*session.info.pop('stale_http_scopes', ()))
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_stale_scopes(session):
+    session.info.pop('stale_http_scopes', None)
@@ -0,0 +1,99 @@
+"""Cached identity for Flask-Login's user loader.
+
+Instead of loading the User row (and then its doctor/patient row) on
+every request, load_identity() returns a small Identity holding the id,
+name, email, role and doctor/patient id. It is read with one joined query
+and kept in its own bounded, short-TTL store (IDENTITY_CACHE_URL,
+IDENTITY_CACHE_SIZE, IDENTITY_CACHE_TTL). Entries are keyed by user id
+plus the 'user:<id>' version stamp, which a commit touching that user or
+their doctor/patient row replaces (see app_http_cache), so edits and
+deletions take effect on the next request. That only holds when every
+worker sees the same stamps, so the cache switches itself off unless
+CACHE_URL is shared or the app runs in a single process; each request
+then reads the identity (and a soft-deleted user is rejected) directly.
+Views that change the user load the row explicitly with current_user.load().
+"""
+from flask_login import UserMixin
+from app.app_init import db
+from app.app_cache import backend_from_url, MemoryBackend
+from app.app_http_cache import version_stamps, stamps_reliable
+from app.app_models import User, Doctor, Patient
+
+
+class Identity(UserMixin):
+    """What the request needs to know about the logged-in user"""
+
+    def __init__(self, id, name, email, role, doctor_id=None, patient_id=None):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.role = role
+        self.doctor_id = doctor_id
+        self.patient_id = patient_id
+
+    def load(self):
+        """The User row, for views that modify it"""
+        return db.session.get(User, self.id)
+
+    @property
+    def doctor(self):
+        return db.session.get(Doctor, self.doctor_id) if self.doctor_id else None
+
+    @property
+    def patient(self):
+        return db.session.get(Patient, self.patient_id) if self.patient_id else None
+
+    def __repr__(self):
+        return f'<Identity {self.name} ({self.role})>'
+
+
+class IdentityCache:
+    """Bounded user-id -> Identity store"""
+
+    def __init__(self):
+        self.backend = MemoryBackend()
+        self.enabled = True
+        self.ttl = 60
+
+    def init_app(self, app):
+        # A rename, role change or soft delete in one worker must not linger in the others
+        self.enabled = app.config.get('IDENTITY_CACHE_ENABLED', True) and stamps_reliable(app)
+        self.ttl = app.config.get('IDENTITY_CACHE_TTL', 60)
+        self.backend = backend_from_url(
+            app.config.get('IDENTITY_CACHE_URL'),
+            max_entries=app.config.get('IDENTITY_CACHE_SIZE', 4096)
+        )
+
+    def get(self, user_id):
+        if not self.enabled:
+            return fetch_identity(user_id)
+        key = f'identity:{user_id}:{version_stamps(f"user:{user_id}")[0]}'
+        identity = self.backend.get(key)
+        if identity is None:
+            identity = fetch_identity(user_id)
+            if identity is not None:
+                self.backend.set(key, identity, self.ttl)
+        return identity
+
+    def clear(self):
+        self.backend.clear()
+
+
+identity_cache = IdentityCache()
+
+
+def fetch_identity(user_id):
+    """Identity for user_id from the database, or None if the user is gone"""
+    row = db.session.query(User.id, User.name, User.email, User.role, Doctor.id, Patient.id) \
+        .outerjoin(Doctor, Doctor.user_id == User.id) \
+        .outerjoin(Patient, Patient.user_id == User.id) \
+        .filter(User.id == user_id).first()
+    return Identity(*row) if row else None
+
+
+def load_identity(user_id):
+    """Flask-Login user loader"""
+    try:
+        return identity_cache.get(int(user_id))
+    except ValueError:
+        return None
@@ -1,27 +1,67 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
-import os
+from werkzeug.middleware.proxy_fix import ProxyFix
+from sqlalchemy import event
+from app.app_cache import Cache
 
 db = SQLAlchemy()
 login_manager = LoginManager()
+cache = Cache()
 
 
-def create_app():
-    """Create and configure Flask application"""
+def apply_sqlite_pragmas(dbapi_connection, settings):
+    """Run the tuning PRAGMAs on a fresh SQLite connection"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {int(settings['SQLITE_BUSY_TIMEOUT_MS'])}")
+    cursor.execute(f"PRAGMA journal_mode = {settings['SQLITE_JOURNAL_MODE']}")
+    cursor.execute(f"PRAGMA synchronous = {settings['SQLITE_SYNCHRONOUS']}")
+    cursor.execute(f"PRAGMA mmap_size = {int(settings['SQLITE_MMAP_SIZE'])}")
+    cursor.close()
+
+
+def configure_sqlite(engine, settings):
+    """Apply the tuning PRAGMAs to every new connection of engine"""
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, settings)
+
+
+def create_app(config=None, **overrides):
+    """Create and configure Flask application
+
+    config names a profile from app_config.PROFILES (production,
+    development, testing, benchmark; default APP_PROFILE or production);
+    keyword arguments override individual settings.
+    """
     app = Flask(__name__)
     
-    # Configuration
-    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
-
-    # Ensure instance folder exists and store DB inside it to avoid confusion
-    os.makedirs(app.instance_path, exist_ok=True)
-    db_path = os.path.join(app.instance_path, 'hospital.db').replace('\\', '/')
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Configuration: profile, then environment, then overrides (see app_config)
+    from app.app_config import load_config
+    load_config(app, config, **overrides)
+    
+    # Behind a proxy every request comes from its address; take the client's from X-Forwarded-For
+    if app.config['PROXY_FIX_X_FOR']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
     
     # Initialize extensions
     db.init_app(app)
+    if app.config['SQLITE_TUNED'] and app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        with app.app_context():
+            configure_sqlite(db.engine, app.config)
+    cache.init_app(app)
+    from app.app_passwords import password_hasher, login_throttle
+    password_hasher.init_app(app)
+    login_throttle.init_app(app)
+    from app.app_http_cache import init_http_cache
+    init_http_cache(app)
+    from app.app_fragments import fragment_cache
+    fragment_cache.init_app(app)
+    from app.app_identity import identity_cache
+    identity_cache.init_app(app)
+    with app.app_context():
+        from app.app_profiling import init_profiling
+        init_profiling(app, db.engine)
     login_manager.init_app(app)
     login_manager.login_view = 'main.login'
     login_manager.login_message = 'Please log in to access this page.'
@@ -30,40 +70,24 @@ def create_app():
     # Register blueprints
     from app.app_routes import main
     app.register_blueprint(main)
+    from app.app_api import api
+    app.register_blueprint(api)
     
-    # User loader for Flask-Login
-    @login_manager.user_loader
-    def load_user(user_id):
-        from app.app_models import User
-        return User.query.get(int(user_id))
+    # Session events that keep the doctor_patient table in step with appointments
+    from app import app_doctor_patients  # noqa: F401
+    # Hide soft-deleted users, doctors and patients from queries
+    from app import app_soft_delete  # noqa: F401
+    # Keep the report rollups in step with appointment writes
+    from app import app_reports  # noqa: F401
+    # Copy user names onto doctors/patients
+    from app import app_names  # noqa: F401
     
-    # Create tables and seed data
-    with app.app_context():
-        db.create_all()
-        
-        # Create default admin if not exists
-        from app.app_models import User, Department
-        
-        if not User.query.filter_by(role='admin').first():
-            admin = User(name='Admin', email='admin@hospital.com', role='admin')
-            admin.set_password('admin@123')
-            db.session.add(admin)
-            db.session.commit()
-            print("✓ Default admin user created: admin@hospital.com / admin@123")
-        
-        # Create default departments if not exists
-        if Department.query.count() == 0:
-            departments = [
-                Department(name='Cardiology', description='Heart and cardiovascular diseases'),
-                Department(name='Neurology', description='Nervous system disorders'),
-                Department(name='Orthopedics', description='Bones and joints'),
-                Department(name='Pediatrics', description='Child healthcare'),
-                Department(name='Dermatology', description='Skin disorders'),
-                Department(name='General Medicine', description='General medical care'),
-                Department(name='Psychiatry', description='Mental health'),
-            ]
-            db.session.add_all(departments)
-            db.session.commit()
-            print("✓ Default departments created")
+    # User loader for Flask-Login: a cached Identity rather than the User row
+    from app.app_identity import load_identity
+    login_manager.user_loader(load_identity)
+    
+    # Tables, migrations and default data: `manage_users.py bootstrap`, or lazily (app_bootstrap)
+    from app.app_bootstrap import init_bootstrap
+    init_bootstrap(app)
     
     return app
\ No newline at end of file
@@ -0,0 +1,402 @@
+"""Background jobs backed by the job table.
+
+enqueue('delete_doctor', doctor_id=3) stores a row; workers claim queued
+rows whose run_at has passed with a conditional UPDATE, so any number of
+threads and processes can share the table. Workers run inside web
+processes (JOB_WORKERS threads, started from run.py) or standalone via
+`python scripts/jobs.py work`.
+
+A job whose handler raises is retried up to max_attempts times, with
+exponential backoff from JOB_RETRY_DELAY, and then marked failed. Jobs
+left running by a crashed worker are requeued after JOB_STALE_SECONDS.
+A unique_key de-duplicates against queued and running jobs; enqueueing a
+failed job's key again (e.g. retrying a delete) resets it.
+PERIODIC_JOBS (reminder scans, archival, rollup re-aggregation) are enqueued once per interval
+under a per-interval unique_key, so only one process schedules each round.
+job_metrics() reports queue depth, lag, throughput and run times.
+"""
+import json
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from app.app_init import db
+from app.app_models import Doctor, Patient, Appointment, Job
+
+
+HANDLERS = {}
+
+# (job kind, config key holding its interval in seconds; 0 disables)
+PERIODIC_JOBS = [
+    ('schedule_reminders', 'REMINDER_INTERVAL'),
+    ('archive_appointments', 'ARCHIVE_INTERVAL'),
+    ('rebuild_rollups', 'ROLLUP_REBUILD_INTERVAL'),
+]
+
+
+class JobError(Exception):
+    """Raised for unknown job kinds"""
+
+
+def handler(kind):
+    """Register func(**payload) as the handler for jobs of kind"""
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def enqueue(kind, /, run_at=None, unique_key=None, max_attempts=3, once=False, **payload):
+    """Queue a job.
+
+    With unique_key, a queued or running job with that key is returned
+    instead; a failed (or, unless once is set, done) one is reset and
+    queued again with the new arguments. once=True makes a done job count
+    as a duplicate too, for work that must run once per key (periodic rounds).
+    """
+    if kind not in HANDLERS:
+        raise JobError(f'no handler for job kind {kind!r}')
+    if unique_key:
+        existing = Job.query.filter_by(unique_key=unique_key).first()
+        if existing and (existing.status in ('queued', 'running') or (once and existing.status == 'done')):
+            return existing
+        if existing:
+            return _requeue(existing, run_at, max_attempts, payload)
+    job = Job(kind=kind, payload=json.dumps(payload), unique_key=unique_key,
+              max_attempts=max_attempts, run_at=run_at or datetime.utcnow())
+    db.session.add(job)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another process queued the same unique_key first
+        db.session.rollback()
+        return Job.query.filter_by(unique_key=unique_key).first()
+    return job
+
+
+def _requeue(job, run_at, max_attempts, payload):
+    """Reset a finished job to queued; a concurrent reset of the same row wins harmlessly"""
+    db.session.execute(
+        db.update(Job)
+        .where(Job.id == job.id, Job.status == job.status)
+        .values(status='queued', payload=json.dumps(payload), attempts=0, max_attempts=max_attempts,
+                run_at=run_at or datetime.utcnow(), started_at=None, finished_at=None,
+                worker=None, result=None, error=None)
+    )
+    db.session.commit()
+    db.session.refresh(job)
+    return job
+
+
+def job_status(job):
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'payload': json.loads(job.payload or '{}'),
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'run_at': job.run_at.isoformat() if job.run_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'result': json.loads(job.result) if job.result else None,
+        'error': job.error,
+    }
+
+
+# ==================== Worker ====================
+
+
+class JobWorker:
+    """Thread pool that claims and runs queued jobs"""
+
+    def __init__(self):
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self._threads = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._last_buckets = {}
+        self.processed = 0
+        self.failed = 0
+        self.retried = 0
+        self.busy_seconds = 0.0
+
+    def start(self, app, threads=None):
+        """Start worker threads for app (JOB_WORKERS by default)"""
+        threads = app.config.get('JOB_WORKERS', 1) if threads is None else threads
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self._stop.clear()
+        for number in range(threads):
+            thread = threading.Thread(target=self._loop, args=(app,), daemon=True,
+                                      name=f'job-worker-{number}')
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def running(self):
+        return bool(self._threads) and not self._stop.is_set()
+
+    def _loop(self, app):
+        poll = app.config.get('JOB_POLL_SECONDS', 1.0)
+        with app.app_context():
+            while not self._stop.is_set():
+                try:
+                    self.schedule_periodic(app)
+                    requeue_stale(app.config.get('JOB_STALE_SECONDS', 600))
+                    ran = self.run_pending(app)
+                except Exception as exc:  # keep the thread alive, e.g. database restarts
+                    app.logger.exception('job worker loop failed: %s', exc)
+                    db.session.rollback()
+                    ran = 0
+                finally:
+                    db.session.remove()
+                if not ran:
+                    self._stop.wait(poll)
+
+    def schedule_periodic(self, app):
+        """Queue each PERIODIC_JOBS job once per interval across all workers"""
+        for kind, interval_setting in PERIODIC_JOBS:
+            interval = app.config.get(interval_setting)
+            if not interval:
+                continue
+            bucket = int(time.time() // interval)
+            if self._last_buckets.get(kind) == bucket:
+                continue
+            self._last_buckets[kind] = bucket
+            enqueue(kind, unique_key=f'{kind}:{interval}:{bucket}', once=True)
+
+    def run_pending(self, app, limit=10):
+        """Claim and run up to limit due jobs; returns how many ran"""
+        now = datetime.utcnow()
+        due = [job_id for job_id, in db.session.query(Job.id)
+               .filter(Job.status == 'queued', Job.run_at <= now)
+               .order_by(Job.run_at, Job.id).limit(limit)]
+        db.session.commit()
+        ran = 0
+        for job_id in due:
+            if self._stop.is_set():
+                break
+            if self._claim(job_id):
+                self._run(app, job_id)
+                ran += 1
+        return ran
+
+    def _claim(self, job_id):
+        claimed = db.session.execute(
+            db.update(Job)
+            .where(Job.id == job_id, Job.status == 'queued')
+            .values(status='running', attempts=Job.attempts + 1,
+                    started_at=datetime.utcnow(), worker=self.name)
+        ).rowcount
+        db.session.commit()
+        return claimed == 1
+
+    def _run(self, app, job_id):
+        job = db.session.get(Job, job_id)
+        started = time.perf_counter()
+        try:
+            func = HANDLERS.get(job.kind)
+            if func is None:
+                raise JobError(f'no handler for job kind {job.kind!r}')
+            result = func(**json.loads(job.payload or '{}'))
+        except Exception as exc:
+            db.session.rollback()
+            job = db.session.get(Job, job_id)
+            job.error = f'{type(exc).__name__}: {exc}'
+            if job.attempts >= job.max_attempts:
+                job.status = 'failed'
+                job.finished_at = datetime.utcnow()
+                outcome = 'failed'
+            else:
+                delay = app.config.get('JOB_RETRY_DELAY', 30) * 2 ** (job.attempts - 1)
+                job.status = 'queued'
+                job.run_at = datetime.utcnow() + timedelta(seconds=delay)
+                outcome = 'retried'
+            app.logger.warning('job %s (%s) %s: %s', job.id, job.kind, outcome, job.error)
+        else:
+            job = db.session.get(Job, job_id)
+            job.status = 'done'
+            job.result = json.dumps(result) if result is not None else None
+            job.error = None
+            job.finished_at = datetime.utcnow()
+            outcome = 'processed'
+        db.session.commit()
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self.busy_seconds += time.perf_counter() - started
+
+    def stats(self):
+        with self._lock:
+            return {
+                'worker': self.name,
+                'threads': len(self._threads),
+                'processed': self.processed,
+                'failed': self.failed,
+                'retried': self.retried,
+                'busy_seconds': round(self.busy_seconds, 3),
+            }
+
+
+job_worker = JobWorker()
+
+
+def requeue_stale(stale_seconds):
+    """Put jobs whose worker died mid-run back in the queue"""
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_seconds)
+    requeued = db.session.execute(
+        db.update(Job)
+        .where(Job.status == 'running', Job.started_at < cutoff)
+        .values(status='queued', run_at=datetime.utcnow(), error='requeued: worker stopped responding')
+    ).rowcount
+    db.session.commit()
+    return requeued
+
+
+def job_metrics(window_seconds=3600):
+    """Queue depth, lag and throughput over the last window_seconds"""
+    now = datetime.utcnow()
+    since = now - timedelta(seconds=window_seconds)
+    by_status = dict(db.session.query(Job.status, db.func.count(Job.id)).group_by(Job.status).all())
+    oldest_due = db.session.query(db.func.min(Job.run_at)) \
+        .filter(Job.status == 'queued', Job.run_at <= now).scalar()
+    finished = db.session.query(Job.status, Job.started_at, Job.finished_at) \
+        .filter(Job.finished_at >= since).all()
+    durations = sorted((f - s).total_seconds() for status, s, f in finished if status == 'done' and s)
+    done = len(durations)
+    return {
+        'queued': by_status.get('queued', 0),
+        'running': by_status.get('running', 0),
+        'done': by_status.get('done', 0),
+        'failed': by_status.get('failed', 0),
+        'lag_seconds': round((now - oldest_due).total_seconds(), 1) if oldest_due else 0.0,
+        'window_seconds': window_seconds,
+        'done_in_window': done,
+        'failed_in_window': sum(1 for status, _, _ in finished if status == 'failed'),
+        'jobs_per_minute': round(done / (window_seconds / 60), 2),
+        'avg_run_ms': round(sum(durations) / done * 1000, 1) if done else None,
+        'p95_run_ms': round(durations[int(0.95 * (done - 1))] * 1000, 1) if done else None,
+    }
+
+
+# ==================== Handlers ====================
+
+
+@handler('delete_doctor')
+def delete_doctor(doctor_id, chunk_size=500):
+    """Soft-delete a doctor and cancel their upcoming bookings"""
+    from app.app_soft_delete import soft_delete_doctor, cancel_future_bookings
+    doctor = db.session.get(Doctor, doctor_id, execution_options={'include_deleted': True})
+    if doctor is None:
+        return {'deleted': False}
+    soft_delete_doctor(doctor)
+    return {'deleted': True,
+            'cancelled': cancel_future_bookings(Appointment.doctor_id, doctor_id, chunk_size)}
+
+
+@handler('delete_patient')
+def delete_patient(patient_id, chunk_size=500):
+    """Soft-delete a patient and cancel their upcoming bookings"""
+    from app.app_soft_delete import soft_delete_patient, cancel_future_bookings
+    patient = db.session.get(Patient, patient_id, execution_options={'include_deleted': True})
+    if patient is None:
+        return {'deleted': False}
+    soft_delete_patient(patient)
+    return {'deleted': True,
+            'cancelled': cancel_future_bookings(Appointment.patient_id, patient_id, chunk_size)}
+
+
+@handler('bulk_import')
+def bulk_import(kind, path, fmt=None, chunk_size=None):
+    from app.app_bulk import import_file, DEFAULT_CHUNK_SIZE
+    report = import_file(kind, path, fmt=fmt, chunk_size=chunk_size or DEFAULT_CHUNK_SIZE)
+    return {'read': report.read, 'inserted': report.inserted, 'skipped': report.skipped,
+            'errors': report.errors, 'seconds': round(report.elapsed, 2)}
+
+
+@handler('bulk_export')
+def bulk_export(kind, path, fmt=None):
+    from app.app_bulk import export_file
+    return {'written': export_file(kind, path, fmt=fmt)}
+
+
+@handler('archive_appointments')
+def archive_appointments(months=None, chunk_size=None):
+    from flask import current_app
+    from app.app_archive import archive_appointments as archive
+    return archive(months or current_app.config.get('ARCHIVE_AFTER_MONTHS', 12),
+                   chunk_size or current_app.config.get('ARCHIVE_CHUNK_SIZE', 1000))
+
+
+@handler('rebuild_rollups')
+def rebuild_rollups(days=None):
+    """Re-aggregate the report rollups for the last `days` days"""
+    from flask import current_app
+    from app.app_reports import rebuild_rollups as rebuild
+    days = days or current_app.config.get('ROLLUP_REBUILD_DAYS', 90)
+    start = datetime.now().date() - timedelta(days=days)
+    with db.engine.begin() as conn:
+        rows = rebuild(conn, start=start)
+    return {'since': start.isoformat(), 'rows': rows}
+
+
+@handler('schedule_reminders')
+def schedule_reminders(hours_ahead=None):
+    """Queue one reminder per Booked appointment starting within hours_ahead"""
+    from flask import current_app
+    hours_ahead = hours_ahead or current_app.config.get('REMINDER_HOURS_AHEAD', 24)
+    now = datetime.now()
+    until = now + timedelta(hours=hours_ahead)
+    upcoming = db.session.query(Appointment.id, Appointment.date, Appointment.time).filter(
+        Appointment.status == 'Booked',
+        Appointment.date >= now.date(),
+        Appointment.date <= until.date()
+    ).all()
+    # Keyed by slot, so a rescheduled appointment gets a fresh reminder
+    keys = {f'reminder:{id}:{day.isoformat()}T{slot.strftime("%H:%M")}': id
+            for id, day, slot in upcoming if now <= datetime.combine(day, slot) <= until}
+    existing = set()
+    key_list = list(keys)
+    for start in range(0, len(key_list), 500):
+        existing.update(key for key, in db.session.query(Job.unique_key)
+                        .filter(Job.unique_key.in_(key_list[start:start + 500])))
+    fresh = [Job(kind='appointment_reminder', payload=json.dumps({'appointment_id': id}), unique_key=key)
+             for key, id in keys.items() if key not in existing]
+    db.session.add_all(fresh)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent scan queued some of these; the next scan picks up the rest
+        db.session.rollback()
+        return {'queued': 0}
+    return {'queued': len(fresh)}
+
+
+@handler('appointment_reminder')
+def appointment_reminder(appointment_id):
+    """E-mail the patient about an upcoming appointment that is still booked"""
+    from app.app_mail import send_mail
+    appointment = Appointment.query.options(
+        joinedload(Appointment.patient, innerjoin=True).joinedload(Patient.user, innerjoin=True),
+        joinedload(Appointment.doctor, innerjoin=True).joinedload(Doctor.user, innerjoin=True)
+    ).filter(Appointment.id == appointment_id).first()
+    if appointment is None or appointment.status != 'Booked':
+        return {'sent': False}
+    patient, doctor = appointment.patient.user, appointment.doctor.user
+    send_mail(
+        patient.email,
+        f"Reminder: appointment with {doctor.name} on {appointment.date.strftime('%d-%m-%Y')}",
+        f"Dear {patient.name},\n\n"
+        f"This is a reminder of your appointment with {doctor.name} "
+        f"({appointment.doctor.specialization}) on {appointment.date.strftime('%d-%m-%Y')} "
+        f"at {appointment.time.strftime('%H:%M')}.\n\n"
+        f"If you can no longer attend, please cancel it from your dashboard.\n"
+    )
+    return {'sent': True, 'to': patient.email}
@@ -0,0 +1,49 @@
+"""Outgoing notification delivery.
+
+MAIL_SINK picks where messages go:
+
+    file:///path/outbox.jsonl   append one JSON object per message (default,
+                                instance/outbox.jsonl)
+    smtp://host:port            hand off to an SMTP server (e.g. a local
+                                relay or `python -m aiosmtpd -n`)
+    null://                     drop messages
+"""
+import json
+import smtplib
+import threading
+from datetime import datetime
+from email.message import EmailMessage
+from urllib.parse import urlparse
+from flask import current_app
+
+
+_file_lock = threading.Lock()
+
+
+class MailError(Exception):
+    """Raised when MAIL_SINK is not a supported URL"""
+
+
+def send_mail(to, subject, body):
+    """Deliver one plain-text message through the configured sink"""
+    sink = urlparse(current_app.config.get('MAIL_SINK') or 'null://')
+    sender = current_app.config.get('MAIL_FROM', 'no-reply@hospital.local')
+
+    if sink.scheme == 'null':
+        return
+    if sink.scheme == 'file':
+        record = {'sent_at': datetime.utcnow().isoformat(), 'from': sender,
+                  'to': to, 'subject': subject, 'body': body}
+        with _file_lock, open(sink.path, 'a', encoding='utf-8') as outbox:
+            outbox.write(json.dumps(record) + '\n')
+        return
+    if sink.scheme == 'smtp':
+        message = EmailMessage()
+        message['From'] = sender
+        message['To'] = to
+        message['Subject'] = subject
+        message.set_content(body)
+        with smtplib.SMTP(sink.hostname or 'localhost', sink.port or 25, timeout=10) as smtp:
+            smtp.send_message(message)
+        return
+    raise MailError(f'unsupported MAIL_SINK: {sink.scheme}://')
@@ -0,0 +1,149 @@
+"""Minimal, ordered schema migrations for existing databases.
+
+db.create_all() only creates missing tables; it never adds indexes or
+columns to tables that already exist. Each migration below is applied once,
+in order, and recorded in the schema_version table.
+"""
+from datetime import datetime
+from app.app_init import db
+from app.app_models import (
+    User, Doctor, Patient, Appointment, Treatment, DoctorPatient, Job,
+    AppointmentArchive, TreatmentArchive, AppointmentRollup
+)
+
+
+schema_version = db.Table(
+    'schema_version',
+    db.Column('version', db.Integer, primary_key=True),
+    db.Column('description', db.String(200)),
+    db.Column('applied_at', db.DateTime, default=datetime.utcnow),
+)
+
+
+class MigrationError(Exception):
+    """Raised when existing data prevents a migration from being applied"""
+
+
+def _create_indexes(conn, model, *names):
+    for index in model.__table__.indexes:
+        if index.name in names:
+            index.create(bind=conn, checkfirst=True)
+
+
+def _add_hot_query_indexes(conn):
+    _create_indexes(conn, Appointment,
+                    'ix_appointment_doctor_date_status',
+                    'ix_appointment_patient_date_status',
+                    'ix_appointment_doctor_date_time')
+    _create_indexes(conn, Treatment, 'ix_treatment_patient_id')
+
+
+def _add_unique_booking_slot(conn):
+    duplicates = conn.execute(
+        db.select(Appointment.doctor_id, Appointment.date, Appointment.time,
+                  db.func.count(Appointment.id))
+        .where(Appointment.status != 'Cancelled')
+        .group_by(Appointment.doctor_id, Appointment.date, Appointment.time)
+        .having(db.func.count(Appointment.id) > 1)
+    ).all()
+    if duplicates:
+        slots = ', '.join(f'doctor {d} on {day} at {t} ({n}x)' for d, day, t, n in duplicates[:10])
+        raise MigrationError(
+            f'{len(duplicates)} double-booked slot(s) must be cancelled or moved '
+            f'before the unique slot index can be created: {slots}'
+        )
+    _create_indexes(conn, Appointment, 'uq_appointment_doctor_slot')
+
+
+def _add_full_text_search(conn):
+    from app.app_search import install
+    install(conn)
+
+
+def _add_doctor_patient_table(conn):
+    from app.app_doctor_patients import rebuild
+    DoctorPatient.__table__.create(bind=conn, checkfirst=True)
+    rebuild(conn)
+
+
+def _add_job_table(conn):
+    Job.__table__.create(bind=conn, checkfirst=True)
+
+
+def _add_soft_delete_and_archive(conn):
+    from sqlalchemy import inspect
+    inspector = inspect(conn)
+    for model in (User, Doctor, Patient):
+        table = model.__table__
+        if 'deleted_at' not in {c['name'] for c in inspector.get_columns(table.name)}:
+            column = table.c.deleted_at
+            conn.execute(db.text(
+                f'ALTER TABLE {conn.dialect.identifier_preparer.format_table(table)} '
+                f'ADD COLUMN deleted_at {column.type.compile(conn.dialect)}'
+            ))
+    AppointmentArchive.__table__.create(bind=conn, checkfirst=True)
+    TreatmentArchive.__table__.create(bind=conn, checkfirst=True)
+
+
+def _add_appointment_rollups(conn):
+    from app.app_reports import rebuild_rollups
+    AppointmentRollup.__table__.create(bind=conn, checkfirst=True)
+    rebuild_rollups(conn)
+
+
+def _add_denormalized_names(conn):
+    from sqlalchemy import inspect
+    from app.app_names import backfill_names
+    inspector = inspect(conn)
+    for model in (Doctor, Patient):
+        table = model.__table__
+        existing = {c['name'] for c in inspector.get_columns(table.name)}
+        for name in ('display_name', 'name_lower'):
+            if name not in existing:
+                conn.execute(db.text(
+                    f'ALTER TABLE {conn.dialect.identifier_preparer.format_table(table)} '
+                    f'ADD COLUMN {name} {table.c[name].type.compile(conn.dialect)}'
+                ))
+        _create_indexes(conn, model, f'ix_{table.name}_name_lower')
+    backfill_names(conn)
+    if conn.dialect.name == 'postgresql':
+        from app.app_search import POSTGRES_NAME_INDEXES
+        for statement in POSTGRES_NAME_INDEXES:
+            conn.execute(db.text(statement))
+
+
+# (version, description, callable(connection)) - append only, never reorder
+MIGRATIONS = [
+    (1, 'Composite indexes for appointment/treatment hot queries', _add_hot_query_indexes),
+    (2, 'Unique live booking per doctor slot', _add_unique_booking_slot),
+    (3, 'Full-text search tables, triggers and indexes', _add_full_text_search),
+    (4, 'Doctor-patient relationship table, backfilled from appointments', _add_doctor_patient_table),
+    (5, 'Background job queue table', _add_job_table),
+    (6, 'Soft-delete flags on users/doctors/patients; appointment and treatment archive tables',
+     _add_soft_delete_and_archive),
+    (7, 'Daily appointment rollups for reports, aggregated from existing appointments', _add_appointment_rollups),
+    (8, 'Denormalized display_name/name_lower on doctors and patients', _add_denormalized_names),
+]
+
+
+def current_version(conn):
+    """Highest applied migration version, 0 for an unmigrated database"""
+    schema_version.create(bind=conn, checkfirst=True)
+    latest = conn.execute(db.select(db.func.max(schema_version.c.version))).scalar()
+    return latest or 0
+
+
+def upgrade():
+    """Apply pending migrations; returns the list of versions applied"""
+    applied = []
+    with db.engine.begin() as conn:
+        version = current_version(conn)
+        for number, description, migrate in MIGRATIONS:
+            if number <= version:
+                continue
+            migrate(conn)
+            conn.execute(schema_version.insert().values(
+                version=number, description=description, applied_at=datetime.utcnow()
+            ))
+            applied.append(number)
+    return applied
@@ -1,10 +1,34 @@
 from app.app_init import db
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.app_passwords import password_hasher
 from datetime import datetime
 
 
-class User(db.Model, UserMixin):
+class SoftDeleteMixin:
+    """deleted_at flag; app_soft_delete hides flagged rows from queries by default"""
+    deleted_at = db.Column(db.DateTime)
+
+    @property
+    def is_deleted(self):
+        return self.deleted_at is not None
+
+
+def name_columns(name):
+    """display_name/name_lower values for name, for Core inserts"""
+    return {'display_name': name, 'name_lower': name.lower() if name else None}
+
+
+class PersonNameMixin:
+    """Copy of the user's name so listings, sorts and searches skip the user join; kept in sync by app_names"""
+    display_name = db.Column(db.String(100))
+    name_lower = db.Column(db.String(100), index=True)
+
+    def set_display_name(self, name):
+        for key, value in name_columns(name).items():
+            setattr(self, key, value)
+
+
+class User(SoftDeleteMixin, db.Model, UserMixin):
     """User model - base for admin, doctor, patient"""
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -19,11 +43,27 @@ class User(db.Model, UserMixin):
 
     def set_password(self, password):
         """Hash and set password"""
-        self.password = generate_password_hash(password)
+        self.password = password_hasher.hash(password)
 
     def check_password(self, password):
         """Check if provided password matches hashed password"""
-        return check_password_hash(self.password, password)
+        return password_hasher.verify(self.password, password)
+
+    def password_needs_rehash(self):
+        """True when the stored hash predates the configured PASSWORD_HASH_METHOD"""
+        return password_hasher.needs_rehash(self.password)
+
+    # Same interface as app_identity.Identity, which stands in for User on most requests
+    @property
+    def doctor_id(self):
+        return self.doctor.id if self.doctor else None
+
+    @property
+    def patient_id(self):
+        return self.patient.id if self.patient else None
+
+    def load(self):
+        return self
 
     def __repr__(self):
         return f'<User {self.name} ({self.role})>'
@@ -42,7 +82,7 @@ class Department(db.Model):
         return f'<Department {self.name}>'
 
 
-class Doctor(db.Model):
+class Doctor(SoftDeleteMixin, PersonNameMixin, db.Model):
     """Doctor model"""
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -54,14 +94,47 @@ class Doctor(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
-    appointments = db.relationship('Appointment', backref='doctor', lazy=True, cascade='all, delete-orphan')
-    treatments = db.relationship('Treatment', backref='doctor', lazy=True, cascade='all, delete-orphan')
+    # Appointments and treatments are medical records: they outlive a (soft-)deleted doctor
+    appointments = db.relationship('Appointment', backref='doctor', lazy=True)
+    treatments = db.relationship('Treatment', backref='doctor', lazy=True)
+    schedules = db.relationship('DoctorSchedule', backref='doctor', lazy=True, cascade='all, delete-orphan')
+    schedule_exceptions = db.relationship('ScheduleException', backref='doctor', lazy=True, cascade='all, delete-orphan')
 
     def __repr__(self):
         return f'<Doctor {self.user.name} ({self.specialization})>'
 
 
-class Patient(db.Model):
+class DoctorSchedule(db.Model):
+    """Weekly working hours template for a doctor"""
+    id = db.Column(db.Integer, primary_key=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False, index=True)
+    weekday = db.Column(db.Integer, nullable=False)  # 0 = Monday ... 6 = Sunday
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+
+    def __repr__(self):
+        return f'<DoctorSchedule {self.doctor_id} day {self.weekday} {self.start_time}-{self.end_time}>'
+
+
+class ScheduleException(db.Model):
+    """One-off change to a doctor's weekly schedule (leave or extra hours)"""
+    __table_args__ = (
+        db.Index('ix_schedule_exception_doctor_date', 'doctor_id', 'date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    start_time = db.Column(db.Time)  # empty start/end = the whole day
+    end_time = db.Column(db.Time)
+    is_available = db.Column(db.Boolean, default=False)  # False = blocked, True = extra hours
+    reason = db.Column(db.String(200))
+
+    def __repr__(self):
+        return f'<ScheduleException {self.doctor_id} on {self.date}>'
+
+
+class Patient(SoftDeleteMixin, PersonNameMixin, db.Model):
     """Patient model"""
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -73,15 +146,45 @@ class Patient(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
-    appointments = db.relationship('Appointment', backref='patient', lazy=True, cascade='all, delete-orphan')
-    treatments = db.relationship('Treatment', backref='patient', lazy=True, cascade='all, delete-orphan')
+    appointments = db.relationship('Appointment', backref='patient', lazy=True)
+    treatments = db.relationship('Treatment', backref='patient', lazy=True)
 
     def __repr__(self):
         return f'<Patient {self.user.name}>'
 
 
+class DoctorPatient(db.Model):
+    """Doctor-patient pairs with visit stats, maintained from Appointment writes"""
+    __tablename__ = 'doctor_patient'
+    __table_args__ = (
+        db.Index('ix_doctor_patient_doctor_last_visit', 'doctor_id', 'last_visit'),
+        db.Index('ix_doctor_patient_patient_id', 'patient_id'),
+    )
+
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id', ondelete='CASCADE'), primary_key=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id', ondelete='CASCADE'), primary_key=True)
+    first_visit = db.Column(db.Date, nullable=False)
+    last_visit = db.Column(db.Date, nullable=False)
+    visit_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DoctorPatient {self.doctor_id} -> {self.patient_id} ({self.visit_count} visits)>'
+
+
 class Appointment(db.Model):
     """Appointment model"""
+    __table_args__ = (
+        # Dashboards and listings filter on (doctor|patient, date, status);
+        # the double-booking check in book_appointment uses (doctor, date, time)
+        db.Index('ix_appointment_doctor_date_status', 'doctor_id', 'date', 'status'),
+        db.Index('ix_appointment_patient_date_status', 'patient_id', 'date', 'status'),
+        db.Index('ix_appointment_doctor_date_time', 'doctor_id', 'date', 'time'),
+        # A slot can hold at most one live booking; cancelled rows don't count
+        db.Index('uq_appointment_doctor_slot', 'doctor_id', 'date', 'time', unique=True,
+                 sqlite_where=db.text("status != 'Cancelled'"),
+                 postgresql_where=db.text("status != 'Cancelled'")),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
     doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False)
@@ -101,6 +204,10 @@ class Appointment(db.Model):
 
 class Treatment(db.Model):
     """Treatment/Medical record model"""
+    __table_args__ = (
+        db.Index('ix_treatment_patient_id', 'patient_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     appointment_id = db.Column(db.Integer, db.ForeignKey('appointment.id'), nullable=False)
     patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
@@ -111,4 +218,96 @@ class Treatment(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def __repr__(self):
-        return f'<Treatment for Appointment {self.appointment_id}>'
\ No newline at end of file
+        return f'<Treatment for Appointment {self.appointment_id}>'
+
+
+class AppointmentRollup(db.Model):
+    """Appointments per day, doctor and status, maintained by app_reports"""
+    __tablename__ = 'appointment_rollup'
+    __table_args__ = (
+        db.Index('ix_appointment_rollup_department_day', 'department_id', 'day'),
+    )
+
+    day = db.Column(db.Date, primary_key=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    department_id = db.Column(db.Integer, db.ForeignKey('department.id'))  # the doctor's department
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<AppointmentRollup {self.day} doctor {self.doctor_id} {self.status}: {self.count}>'
+
+
+class AppointmentArchive(db.Model):
+    """Closed appointment moved out of the hot appointment table by app_archive"""
+    __tablename__ = 'appointment_archive'
+    __table_args__ = (
+        db.Index('ix_appointment_archive_patient_date', 'patient_id', 'date'),
+        db.Index('ix_appointment_archive_doctor_date', 'doctor_id', 'date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)  # keeps the original appointment id
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    time = db.Column(db.Time, nullable=False)
+    reason = db.Column(db.Text)
+    status = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    patient = db.relationship('Patient')
+    doctor = db.relationship('Doctor')
+
+    def __repr__(self):
+        return f'<AppointmentArchive {self.id} on {self.date}>'
+
+
+class TreatmentArchive(db.Model):
+    """Treatment of an archived appointment; same attributes as Treatment for the history pages"""
+    __tablename__ = 'treatment_archive'
+    __table_args__ = (
+        db.Index('ix_treatment_archive_patient_id', 'patient_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)  # keeps the original treatment id
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointment_archive.id'), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False)
+    diagnosis = db.Column(db.Text, nullable=False)
+    prescription = db.Column(db.Text, nullable=False)
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    appointment = db.relationship('AppointmentArchive')
+    patient = db.relationship('Patient')
+    doctor = db.relationship('Doctor')
+
+    def __repr__(self):
+        return f'<TreatmentArchive for Appointment {self.appointment_id}>'
+
+
+class Job(db.Model):
+    """Background job queued for app_jobs workers"""
+    __table_args__ = (
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON arguments
+    status = db.Column(db.String(10), nullable=False, default='queued')  # queued, running, done, failed
+    unique_key = db.Column(db.String(100), unique=True)  # optional de-duplication key
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    worker = db.Column(db.String(50))
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} ({self.status})>'
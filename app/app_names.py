@@ -0,0 +1,73 @@
+"""Denormalized doctor/patient names.
+
+Doctor and Patient carry display_name and an indexed name_lower copied
+from their user, so appointment lists, name sorts and name searches are
+answered without joining the user table (which mixes every role). A
+before_flush hook fills them in for new doctors/patients and copies a
+user rename (edit_doctor, edit_patient_profile, ...) onto the user's
+doctor/patient row in the same flush. Core bulk inserts pass
+name_columns() themselves; migration 8 backfills existing rows.
+"""
+from sqlalchemy import event, inspect, select, update
+from app.app_init import db
+from app.app_models import User, Doctor, Patient, name_columns
+
+
+def _user_name(session, obj):
+    user = obj.__dict__.get('user')
+    if user is None and obj.user_id is not None:
+        user = session.get(User, obj.user_id)
+    return user.name if user is not None else None
+
+
+@event.listens_for(db.session, 'before_flush')
+def _sync_names(session, flush_context, instances):
+    renamed = {}
+    with session.no_autoflush:
+        for obj in session.new:
+            if isinstance(obj, (Doctor, Patient)) and obj.display_name is None:
+                obj.set_display_name(_user_name(session, obj))
+        for obj in session.dirty:
+            if isinstance(obj, User) and obj.id is not None and inspect(obj).attrs.name.history.deleted:
+                renamed[obj.id] = obj.name
+        if not renamed:
+            return
+        # Rows already in the session are updated in place; the rest with one UPDATE per model
+        for obj in list(session.identity_map.values()):
+            if isinstance(obj, (Doctor, Patient)) and obj.user_id in renamed:
+                obj.set_display_name(renamed[obj.user_id])
+    session.info.setdefault('renamed_users', {}).update(renamed)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _apply_renames(session, flush_context):
+    renamed = session.info.pop('renamed_users', None)
+    if not renamed:
+        return
+    conn = session.connection()
+    for model in (Doctor, Patient):
+        for user_id, name in renamed.items():
+            conn.execute(update(model.__table__).where(model.__table__.c.user_id == user_id)
+                         .values(**name_columns(name)))
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_renames(session):
+    session.info.pop('renamed_users', None)
+
+
+def backfill_names(conn, chunk_size=1000):
+    """Copy user names onto every doctor and patient row; returns rows updated"""
+    updated = 0
+    for model in (Doctor, Patient):
+        table = model.__table__
+        rows = conn.execute(select(table.c.id, User.__table__.c.name)
+                            .join(User.__table__, User.__table__.c.id == table.c.user_id)).all()
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            conn.execute(
+                table.update().where(table.c.id == db.bindparam('row_id')),
+                [dict(row_id=id, **name_columns(name)) for id, name in chunk]
+            )
+            updated += len(chunk)
+    return updated
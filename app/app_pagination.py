@@ -0,0 +1,170 @@
+import base64
+import json
+from datetime import date, time, datetime
+from sqlalchemy import tuple_
+
+
+DEFAULT_PER_PAGE = 25
+MAX_PER_PAGE = 100
+
+
+class KeysetPage:
+    """One page of rows plus the cursors needed to move around it"""
+
+    def __init__(self, items, next_cursor, prev_cursor, sort, order, per_page):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.sort = sort
+        self.order = order
+        self.per_page = per_page
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _encode_value(value):
+    if isinstance(value, (date, time, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _decode_value(column, value):
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if value is None:
+        return None
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is time:
+        return time.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(values):
+    """Encode a row's sort key into an opaque URL-safe token"""
+    raw = json.dumps([_encode_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, columns):
+    """Decode a token produced by encode_cursor, or None if it is invalid"""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            return None
+        return [_decode_value(c, v) for c, v in zip(columns, values)]
+    except (ValueError, TypeError):
+        return None
+
+
+def page_args(args, sort_options, default_sort):
+    """Read sort/order/per_page/after/before from request args with safe fallbacks"""
+    sort = args.get('sort', default_sort)
+    if sort not in sort_options:
+        sort = default_sort
+    order = args.get('order', 'asc')
+    if order not in ('asc', 'desc'):
+        order = 'asc'
+    per_page = args.get('per_page', DEFAULT_PER_PAGE, type=int)
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    return {
+        'sort': sort,
+        'order': order,
+        'per_page': per_page,
+        'after': args.get('after'),
+        'before': args.get('before'),
+    }
+
+
+def _scan(query, columns, descending, backwards, after_values, before_values, limit):
+    """Up to limit (item, key) pairs of query past the cursor, in scan order"""
+    single_entity = len(query.column_descriptions) == 1
+    key = tuple_(*columns)
+    q = query.add_columns(*columns)
+    if after_values is not None:
+        bound = tuple_(*after_values)
+        q = q.filter(key < bound if descending else key > bound)
+    elif before_values is not None:
+        bound = tuple_(*before_values)
+        q = q.filter(key > bound if descending else key < bound)
+
+    # Walk backwards from a "before" cursor; the caller flips the rows into display order
+    reverse_scan = descending != backwards
+    q = q.order_by(None).order_by(*[c.desc() if reverse_scan else c.asc() for c in columns])
+    width = len(columns)
+    return [(row[0] if single_entity else tuple(row[:-width]), tuple(row[-width:]))
+            for row in q.limit(limit).all()]
+
+
+def _sort_key(key):
+    # NULLs first, and comparable with values
+    return tuple((value is not None, value) for value in key)
+
+
+def keyset_paginate(query, sort_options, sort, order='asc', per_page=DEFAULT_PER_PAGE,
+                    after=None, before=None):
+    """Return a KeysetPage for query ordered by sort_options[sort].
+
+    Each sort option is a list of columns ending in a unique column (usually
+    the primary key) so that the row-value comparison is a strict total order.
+    """
+    return keyset_paginate_merged([(query, sort_options)], sort, order, per_page, after, before)
+
+
+def keyset_paginate_merged(sources, sort, order='asc', per_page=DEFAULT_PER_PAGE,
+                           after=None, before=None):
+    """keyset_paginate over several (query, sort_options) sources read as one list.
+
+    The sources' sort columns must have matching types and their unique
+    columns must not overlap (e.g. a table and its archive, which keeps ids).
+    Each source is read up to per_page + 1 rows past the cursor and the
+    rows are merged by key.
+    """
+    descending = order == 'desc'
+    columns = sources[0][1][sort]
+    after_values = decode_cursor(after, columns)
+    before_values = decode_cursor(before, columns)
+    backwards = before_values is not None and after_values is None
+
+    rows = []
+    for query, sort_options in sources:
+        rows += _scan(query, sort_options[sort], descending, backwards,
+                      after_values, before_values, per_page + 1)
+    if len(sources) > 1:
+        rows.sort(key=lambda row: _sort_key(row[1]), reverse=descending != backwards)
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    items = [item for item, _ in rows]
+    keys = [key for _, key in rows]
+
+    if backwards:
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, after_values is not None
+
+    next_cursor = encode_cursor(keys[-1]) if keys and has_next else None
+    prev_cursor = encode_cursor(keys[0]) if keys and has_prev else None
+    return KeysetPage(items, next_cursor, prev_cursor, sort, order, per_page)
@@ -0,0 +1,144 @@
+"""Password hashing off the request thread, plus login throttling.
+
+PBKDF2/scrypt deliberately burn ~100-300 ms of CPU per call. Hashes are
+computed in a small dedicated process pool (PASSWORD_HASH_WORKERS) with
+a bounded number of calls in flight (PASSWORD_HASH_QUEUE). When the pool
+is saturated a login fails fast with HashingBusy instead of tying up
+every web worker. PASSWORD_HASH_WORKERS=0 hashes inline.
+
+PASSWORD_HASH_METHOD selects the Werkzeug method (pbkdf2:sha256:<iters>,
+scrypt, ...). needs_rehash() spots hashes made with older parameters, and
+the login view re-hashes them after a successful check.
+
+The pool is started with forkserver (spawn on Windows) rather than fork:
+the web process already runs request and job threads, and forking it
+copies their locks into the children mid-use.
+
+LoginThrottle counts failed attempts per client IP and per account in
+the shared cache, in fixed windows; successful logins are not counted,
+so a busy ward logging in at shift change is never locked out. The
+client IP is the X-Forwarded-For address set by the trusted proxy
+(PROXY_FIX_X_FOR, see create_app).
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from functools import partial
+from werkzeug.security import generate_password_hash, check_password_hash
+from app.app_init import cache
+
+
+DEFAULT_METHOD = 'pbkdf2:sha256:600000'
+
+
+class HashingBusy(Exception):
+    """Too many password hashes are already queued or running"""
+
+
+def process_pool(max_workers=None):
+    """ProcessPoolExecutor whose children do not inherit this process's threads"""
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(method))
+
+
+class PasswordHasher:
+    """Bounded process pool for password hashing and verification"""
+
+    def __init__(self):
+        self.method = DEFAULT_METHOD
+        self.workers = 0
+        self.timeout = 10.0
+        self._slots = None
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+        self._prefix = None
+
+    def init_app(self, app):
+        self.method = app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 2)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 10.0)
+        queue = app.config.get('PASSWORD_HASH_QUEUE', 16)
+        self._slots = threading.BoundedSemaphore(max(queue, self.workers or 1))
+        self._prefix = None
+
+    def _executor(self):
+        # gunicorn forks after import; each worker process gets its own pool
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = process_pool(self.workers)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _run(self, func, *args):
+        if not self.workers:
+            return func(*args)
+        if self._slots is None or not self._slots.acquire(blocking=False):
+            raise HashingBusy('password hashing capacity exhausted')
+        try:
+            return self._executor().submit(func, *args).result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HashingBusy('password hashing timed out')
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(partial(generate_password_hash, method=self.method), password)
+
+    def verify(self, stored_hash, password):
+        return self._run(check_password_hash, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        """True when stored_hash was made with a different method or cost"""
+        if self._prefix is None:
+            # Normalises shorthand such as 'pbkdf2' to 'pbkdf2:sha256:600000'
+            self._prefix = generate_password_hash('', method=self.method).split('$', 1)[0]
+        return stored_hash.split('$', 1)[0] != self._prefix
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+
+
+password_hasher = PasswordHasher()
+
+
+class LoginThrottle:
+    """Fixed-window limits on failed logins per client IP and per account"""
+
+    def __init__(self, per_ip=30, per_account=5, window=300):
+        self.per_ip = per_ip
+        self.per_account = per_account
+        self.window = window
+
+    def init_app(self, app):
+        self.per_ip = app.config.get('LOGIN_RATE_PER_IP', self.per_ip)
+        self.per_account = app.config.get('LOGIN_FAILURES_PER_ACCOUNT', self.per_account)
+        self.window = app.config.get('LOGIN_RATE_WINDOW', self.window)
+
+    def _keys(self, ip, email):
+        bucket = int(time.time() // self.window)
+        return f'login:ip:{ip}:{bucket}', f'login:acct:{(email or "").lower()}:{bucket}'
+
+    def retry_after(self, ip, email):
+        """Seconds until this IP/account may try again, or 0 if allowed now"""
+        ip_key, account_key = self._keys(ip, email)
+        ip_failures, failures = cache.get_many(ip_key, account_key)
+        if (ip_failures or 0) >= self.per_ip or (failures or 0) >= self.per_account:
+            return int(self.window - time.time() % self.window) + 1
+        return 0
+
+    def record(self, ip, email, success):
+        ip_key, account_key = self._keys(ip, email)
+        if success:
+            cache.delete(account_key)
+            return
+        cache.set(ip_key, (cache.get(ip_key) or 0) + 1, ttl=self.window)
+        cache.set(account_key, (cache.get(account_key) or 0) + 1, ttl=self.window)
+
+
+login_throttle = LoginThrottle()
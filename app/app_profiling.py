@@ -0,0 +1,157 @@
+"""Opt-in per-request SQL and render profiling.
+
+Enable with SQL_PROFILING=1. For every request this records the number of
+queries, total database time, the slowest statements and template render
+time, returns them in a Server-Timing header (plus X-Query-Count) and
+writes one JSON log line to the `hms.profiling` logger; SQL_PROFILE_LOG=0
+keeps the headers but logs only slow queries and budget overruns.
+
+Routes can declare a query budget with @query_budget(n); SQL_QUERY_BUDGET
+sets the default for the rest. Going over budget logs a warning, or raises
+QueryBudgetExceeded when SQL_QUERY_BUDGET_STRICT is on (handy in tests).
+"""
+import json
+import logging
+import time
+from flask import g, request, has_request_context, current_app, before_render_template, template_rendered
+from sqlalchemy import event
+
+
+logger = logging.getLogger('hms.profiling')
+
+
+class QueryBudgetExceeded(Exception):
+    """A request ran more SQL statements than its budget allows"""
+
+
+def query_budget(limit):
+    """Declare the maximum number of SQL statements a view may run"""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+class RequestProfile:
+    """Timings collected for one request"""
+
+    def __init__(self, keep_slowest):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.slowest = []
+        self.keep_slowest = keep_slowest
+
+    def add_query(self, statement, duration):
+        self.queries += 1
+        self.db_time += duration
+        self.slowest.append((duration, statement))
+        self.slowest.sort(key=lambda item: item[0], reverse=True)
+        del self.slowest[self.keep_slowest:]
+
+
+def _profile():
+    if has_request_context():
+        return g.get('sql_profile')
+    return None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the per-statement context, so a statement that raises leaves nothing behind
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_start', None)
+    profile = _profile()
+    if profile is None or started is None:
+        return
+    duration = time.perf_counter() - started
+    profile.add_query(statement, duration)
+    threshold = current_app.config['SLOW_QUERY_MS']
+    if duration * 1000 >= threshold:
+        logger.warning(json.dumps({
+            'event': 'slow_query', 'path': request.path,
+            'ms': round(duration * 1000, 2), 'statement': ' '.join(statement.split())[:500],
+        }))
+
+
+def _start_render(sender, template, context, **extra):
+    profile = _profile()
+    if profile is not None:
+        g.render_started = time.perf_counter()
+
+
+def _end_render(sender, template, context, **extra):
+    profile = _profile()
+    if profile is None:
+        return
+    started = g.pop('render_started', None)
+    if started is not None:
+        profile.render_time += time.perf_counter() - started
+
+
+def _budget_for_request(app):
+    view = app.view_functions.get(request.endpoint)
+    return getattr(view, 'query_budget', app.config.get('SQL_QUERY_BUDGET'))
+
+
+def init_profiling(app, engine):
+    """Hook the profiler into app and engine when SQL_PROFILING is enabled"""
+    app.config.setdefault('SLOW_QUERY_MS', 100)
+    app.config.setdefault('SQL_PROFILE_SLOWEST', 3)
+    app.config.setdefault('SQL_QUERY_BUDGET', None)
+    app.config.setdefault('SQL_QUERY_BUDGET_STRICT', False)
+    app.config.setdefault('SQL_PROFILE_LOG', True)
+    if not app.config.get('SQL_PROFILING'):
+        return
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_start_render, app)
+    template_rendered.connect(_end_render, app)
+
+    @app.before_request
+    def _start_profile():
+        g.sql_profile = RequestProfile(app.config['SQL_PROFILE_SLOWEST'])
+
+    @app.after_request
+    def _finish_profile(response):
+        profile = g.pop('sql_profile', None)
+        if profile is None:
+            return response
+        total = time.perf_counter() - profile.started
+        response.headers['Server-Timing'] = ', '.join([
+            f'db;dur={profile.db_time * 1000:.2f};desc="{profile.queries} queries"',
+            f'render;dur={profile.render_time * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ])
+        response.headers['X-Query-Count'] = str(profile.queries)
+
+        budget = _budget_for_request(app)
+        over_budget = budget is not None and profile.queries > budget
+        record = {
+            'event': 'request', 'method': request.method, 'path': request.path,
+            'endpoint': request.endpoint, 'status': response.status_code,
+            'queries': profile.queries, 'db_ms': round(profile.db_time * 1000, 2),
+            'render_ms': round(profile.render_time * 1000, 2), 'total_ms': round(total * 1000, 2),
+            'slowest': [{'ms': round(d * 1000, 2), 'statement': ' '.join(s.split())[:200]}
+                        for d, s in profile.slowest],
+        }
+        if over_budget:
+            record['query_budget'] = budget
+            logger.warning(json.dumps(record))
+            if app.config['SQL_QUERY_BUDGET_STRICT']:
+                raise QueryBudgetExceeded(
+                    f'{request.endpoint} ran {profile.queries} queries (budget {budget})'
+                )
+        elif app.config['SQL_PROFILE_LOG']:
+            logger.info(json.dumps(record))
+        return response
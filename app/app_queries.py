@@ -0,0 +1,80 @@
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, contains_eager
+from app.app_init import db
+from app.app_models import Doctor, Patient, Appointment, DoctorPatient
+
+
+# Keyset sort options: every list ends in a unique column so cursors are stable.
+# Names sort on the indexed, denormalized name_lower (app_names), not on user.
+DOCTOR_SORTS = {
+    'id': [Doctor.id],
+    'name': [Doctor.name_lower, Doctor.id],
+    'specialization': [Doctor.specialization, Doctor.id],
+}
+
+PATIENT_SORTS = {
+    'id': [Patient.id],
+    'name': [Patient.name_lower, Patient.id],
+}
+
+DOCTOR_PATIENT_SORTS = {
+    'name': [Patient.name_lower, Patient.id],
+    'visits': [DoctorPatient.visit_count, Patient.id],
+    'last_visit': [DoctorPatient.last_visit, Patient.id],
+}
+
+APPOINTMENT_SORTS = {
+    'date': [Appointment.date, Appointment.time, Appointment.id],
+    'status': [Appointment.status, Appointment.date, Appointment.time, Appointment.id],
+}
+
+
+def doctors_with_users():
+    """Doctor query with the related user loaded in the same SELECT"""
+    return Doctor.query.join(Doctor.user).options(contains_eager(Doctor.user))
+
+
+def patients_with_users():
+    """Patient query with the related user loaded in the same SELECT"""
+    return Patient.query.join(Patient.user).options(contains_eager(Patient.user))
+
+
+def appointments_with_people():
+    """Appointment query with patient and doctor eagerly loaded.
+
+    Listings show their display_name, so the user table is not joined.
+    The joins include soft-deleted people: their appointments stay part of
+    the other side's history, as their treatments do.
+    """
+    return Appointment.query.options(
+        joinedload(Appointment.patient, innerjoin=True),
+        joinedload(Appointment.doctor, innerjoin=True)
+    ).execution_options(include_deleted=True)
+
+
+def appointment_counts_subquery():
+    """Aggregate subquery of (patient_id, appointment_count)"""
+    return db.session.query(
+        Appointment.patient_id.label('patient_id'),
+        func.count(Appointment.id).label('appointment_count')
+    ).group_by(Appointment.patient_id).subquery()
+
+
+def patients_with_appointment_counts():
+    """Query yielding (patient, appointment_count) rows in one round-trip"""
+    counts = appointment_counts_subquery()
+    return db.session.query(
+        Patient,
+        func.coalesce(counts.c.appointment_count, 0).label('appointment_count')
+    ).join(Patient.user).outerjoin(
+        counts, counts.c.patient_id == Patient.id
+    ).options(contains_eager(Patient.user))
+
+
+def patients_of_doctor(doctor_id):
+    """(patient, doctor_patient) rows for doctor_id, read from the maintained pair table"""
+    return db.session.query(Patient, DoctorPatient).join(
+        DoctorPatient, DoctorPatient.patient_id == Patient.id
+    ).join(Patient.user).options(contains_eager(Patient.user)).filter(
+        DoctorPatient.doctor_id == doctor_id
+    )
@@ -0,0 +1,129 @@
+"""Streaming export of a patient's complete medical record.
+
+record_treatments() reads archived, then current, treatments with
+yield_per in chunks of chunk_size rows, so an export holds one chunk in
+memory however many years of history a patient has. record_chunks()
+turns the rows into JSON, CSV or printable HTML text, grouped into
+pieces of about BUFFER_SIZE characters for a streamed Response or a file.
+The HTML is a standalone page meant for the browser's print / save as
+PDF.
+"""
+import json
+import os
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select
+from app.app_init import db
+from app.app_models import (
+    User, Doctor, Patient, Appointment, Treatment, AppointmentArchive, TreatmentArchive
+)
+from app.app_bulk import format_value
+from app.app_reports import csv_lines
+
+
+CHUNK_SIZE = 500
+BUFFER_SIZE = 64 * 1024
+
+# format -> mimetype
+FORMATS = {'json': 'application/json', 'csv': 'text/csv', 'html': 'text/html'}
+
+PATIENT_FIELDS = ['id', 'name', 'email', 'age', 'gender', 'phone', 'address', 'medical_history']
+TREATMENT_FIELDS = ['date', 'time', 'doctor', 'specialization', 'diagnosis', 'prescription',
+                    'notes', 'recorded_at', 'archived']
+
+
+def patient_summary(patient_id):
+    """Demographics of patient_id as a dict, or None if there is no such patient"""
+    row = db.session.execute(
+        select(Patient.id, User.name, User.email, Patient.age, Patient.gender, Patient.phone,
+               Patient.address, Patient.medical_history)
+        .join(User, User.id == Patient.user_id).where(Patient.id == patient_id)
+        .execution_options(include_deleted=True)
+    ).first()
+    return dict(zip(PATIENT_FIELDS, row)) if row else None
+
+
+def record_treatments(patient_id, chunk_size=CHUNK_SIZE):
+    """Yield every treatment of patient_id, oldest first, fetching chunk_size rows at a time"""
+    for treatment, appointment, archived in ((TreatmentArchive, AppointmentArchive, True),
+                                             (Treatment, Appointment, False)):
+        statement = select(
+            appointment.date, appointment.time, Doctor.display_name, Doctor.specialization,
+            treatment.diagnosis, treatment.prescription, treatment.notes, treatment.created_at
+        ).join(appointment, appointment.id == treatment.appointment_id) \
+            .join(Doctor, Doctor.id == treatment.doctor_id) \
+            .where(treatment.patient_id == patient_id) \
+            .order_by(appointment.date, appointment.time, treatment.id)
+        # Treatments by since-deleted doctors are still part of the record
+        result = db.session.execute(statement.execution_options(include_deleted=True, yield_per=chunk_size))
+        for row in result:
+            record = {field: format_value(value) for field, value in zip(TREATMENT_FIELDS, row)}
+            record['archived'] = archived
+            yield record
+
+
+def _json_pieces(patient, treatments):
+    yield '{"patient": %s, "exported_at": %s, "treatments": [' % (
+        json.dumps(patient), json.dumps(datetime.utcnow().isoformat()))
+    separator = '\n'
+    for treatment in treatments:
+        yield separator + json.dumps(treatment)
+        separator = ',\n'
+    yield '\n]}\n'
+
+
+def _html_pieces(patient, treatments):
+    template = current_app.jinja_env.get_template('patient_record_print.html')
+    return template.generate(patient=patient, treatments=treatments,
+                             exported_at=datetime.utcnow().strftime('%d-%m-%Y %H:%M'))
+
+
+def _buffered(pieces, size=BUFFER_SIZE):
+    """Join small text pieces into chunks of about size characters"""
+    buffer, length = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def record_chunks(patient, fmt, chunk_size=CHUNK_SIZE):
+    """Yield the record of patient (a patient_summary dict) as fmt text chunks"""
+    treatments = record_treatments(patient['id'], chunk_size)
+    if fmt == 'json':
+        pieces = _json_pieces(patient, treatments)
+    elif fmt == 'csv':
+        pieces = csv_lines(TREATMENT_FIELDS, treatments)
+    elif fmt == 'html':
+        pieces = _html_pieces(patient, treatments)
+    else:
+        raise ValueError(f'unknown record format: {fmt}')
+    return _buffered(pieces)
+
+
+def record_filename(patient, fmt):
+    return f"medical_record_{patient['id']}.{fmt}"
+
+
+def export_records(patient_ids, directory, fmt, chunk_size=CHUNK_SIZE, progress=None):
+    """Write one fmt file per patient into directory; returns the number written"""
+    os.makedirs(directory, exist_ok=True)
+    written = 0
+    for patient_id in patient_ids:
+        patient = patient_summary(patient_id)
+        if patient is None:
+            if progress:
+                progress(patient_id, None)
+            continue
+        path = os.path.join(directory, record_filename(patient, fmt))
+        with open(path, 'w', newline='', encoding='utf-8') as handle:
+            for chunk in record_chunks(patient, fmt, chunk_size):
+                handle.write(chunk)
+        written += 1
+        if progress:
+            progress(patient_id, path)
+    return written
@@ -0,0 +1,256 @@
+"""Appointment reports served from daily rollups.
+
+appointment_rollup holds one row per (day, doctor, status) with the
+number of appointments and the doctor's department. Appointment inserts,
+deletes and status/date/doctor changes adjust the affected rows with an
+upsert in the same flush (complete_appointment, cancel_appointment,
+booking, the delete jobs ...); Core bulk inserts call count_appointments()
+themselves. rebuild_rollups() re-aggregates a date range from the
+appointment and archive tables; the `rebuild_rollups` job does this
+nightly for the last ROLLUP_REBUILD_DAYS days so any drift is repaired.
+
+Reports never touch the raw appointment tables. A no-show is an
+appointment still Booked after its day has passed.
+"""
+import csv
+import io
+from collections import defaultdict
+from datetime import date, timedelta
+from sqlalchemy import event, inspect, select, func, case, and_
+from sqlalchemy.dialects import postgresql, sqlite
+from app.app_init import db
+from app.app_models import Doctor, Department, Appointment, AppointmentArchive, AppointmentRollup
+
+
+table = AppointmentRollup.__table__
+
+
+# ==================== Maintenance ====================
+
+
+def _upsert_statement(dialect, rows):
+    insert = (postgresql if dialect == 'postgresql' else sqlite).insert(table).values(rows)
+    return insert.on_conflict_do_update(
+        index_elements=[table.c.day, table.c.doctor_id, table.c.status],
+        set_={'count': table.c.count + insert.excluded.count,
+              'department_id': insert.excluded.department_id}
+    )
+
+
+def doctor_departments(conn, doctor_ids=None):
+    """doctor_id -> department id, matching the specialization when no department is set"""
+    by_name = {name.lower(): id for id, name in conn.execute(select(Department.id, Department.name))}
+    doctors = select(Doctor.id, Doctor.department_id, Doctor.specialization)
+    if doctor_ids is not None:
+        doctors = doctors.where(Doctor.id.in_(doctor_ids))
+    departments = {}
+    for doctor_id, department_id, specialization in conn.execute(doctors):
+        if department_id is None and specialization:
+            # Specializations are short forms of department names ('general' -> 'General Medicine')
+            wanted = specialization.lower()
+            department_id = by_name.get(wanted) or next(
+                (id for name, id in by_name.items() if name.startswith(wanted)), None)
+        departments[doctor_id] = department_id
+    return departments
+
+
+def apply_deltas(conn, deltas):
+    """Add {(day, doctor_id, status): change} to the rollup rows"""
+    deltas = {key: change for key, change in deltas.items() if change}
+    if not deltas:
+        return
+    departments = doctor_departments(conn, {doctor_id for _, doctor_id, _ in deltas})
+    rows = [{'day': day, 'doctor_id': doctor_id, 'status': status,
+             'department_id': departments.get(doctor_id), 'count': change}
+            for (day, doctor_id, status), change in deltas.items()]
+    if conn.dialect.name in ('sqlite', 'postgresql'):
+        for start in range(0, len(rows), 500):
+            conn.execute(_upsert_statement(conn.dialect.name, rows[start:start + 500]))
+        return
+    for row in rows:
+        updated = conn.execute(table.update().where(
+            table.c.day == row['day'], table.c.doctor_id == row['doctor_id'], table.c.status == row['status']
+        ).values(count=table.c.count + row['count'], department_id=row['department_id'])).rowcount
+        if not updated:
+            conn.execute(table.insert().values(**row))
+
+
+def count_appointments(conn, appointments):
+    """Add (day, doctor_id, status) appointments written with Core inserts"""
+    deltas = defaultdict(int)
+    for day, doctor_id, status in appointments:
+        deltas[(day, doctor_id, status or 'Booked')] += 1
+    apply_deltas(conn, deltas)
+
+
+def _appointment_days(conn):
+    """(day, doctor_id, status) of every appointment, archived ones included"""
+    current = select(Appointment.date.label('day'), Appointment.doctor_id,
+                     func.coalesce(Appointment.status, 'Booked').label('status'))
+    if inspect(conn).has_table(AppointmentArchive.__tablename__):
+        current = current.union_all(
+            select(AppointmentArchive.date, AppointmentArchive.doctor_id, AppointmentArchive.status))
+    return current.subquery()
+
+
+def rebuild_rollups(conn, start=None, end=None):
+    """Re-aggregate rollups for days start..end (all days when omitted); returns rows written"""
+    days = _appointment_days(conn)
+    source = select(days.c.day, days.c.doctor_id, days.c.status, func.count()) \
+        .group_by(days.c.day, days.c.doctor_id, days.c.status)
+    in_range = []
+    if start is not None:
+        source = source.where(days.c.day >= start)
+        in_range.append(table.c.day >= start)
+    if end is not None:
+        source = source.where(days.c.day <= end)
+        in_range.append(table.c.day <= end)
+    conn.execute(table.delete().where(*in_range))
+    written = conn.execute(table.insert().from_select(
+        ['day', 'doctor_id', 'status', 'count'], source)).rowcount
+
+    # One UPDATE per department rather than per doctor
+    doctors_by_department = defaultdict(list)
+    for doctor_id, department_id in doctor_departments(conn).items():
+        if department_id is not None:
+            doctors_by_department[department_id].append(doctor_id)
+    for department_id, doctor_ids in doctors_by_department.items():
+        for chunk in range(0, len(doctor_ids), 500):
+            conn.execute(table.update().where(
+                table.c.doctor_id.in_(doctor_ids[chunk:chunk + 500]), *in_range
+            ).values(department_id=department_id))
+    return written
+
+
+def _key(obj, state=None):
+    if state is None:
+        return (obj.date, obj.doctor_id, obj.status or 'Booked')
+    old = []
+    for name in ('date', 'doctor_id', 'status'):
+        history = state.attrs[name].history
+        old.append(history.deleted[0] if history.deleted else getattr(obj, name))
+    old[2] = old[2] or 'Booked'
+    return tuple(old)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _maintain_rollups(session, flush_context):
+    deltas = defaultdict(int)
+    for obj in session.new:
+        if isinstance(obj, Appointment):
+            deltas[_key(obj)] += 1
+    for obj in session.deleted:
+        if isinstance(obj, Appointment):
+            deltas[_key(obj, inspect(obj))] -= 1
+    for obj in session.dirty:
+        if isinstance(obj, Appointment):
+            old, new = _key(obj, inspect(obj)), _key(obj)
+            if old != new:
+                deltas[old] -= 1
+                deltas[new] += 1
+    if any(deltas.values()):
+        apply_deltas(session.connection(), deltas)
+
+
+# ==================== Reports ====================
+
+
+def _totals():
+    """Aggregate columns shared by the reports"""
+    count, status = AppointmentRollup.count, AppointmentRollup.status
+    return [
+        func.sum(count).label('total'),
+        func.sum(case((status == 'Completed', count), else_=0)).label('completed'),
+        func.sum(case((status == 'Cancelled', count), else_=0)).label('cancelled'),
+        func.sum(case((and_(status == 'Booked', AppointmentRollup.day < date.today()), count),
+                      else_=0)).label('no_show'),
+    ]
+
+
+def _rate(part, total):
+    return round(100.0 * part / total, 1) if total else 0.0
+
+
+def _stream(statement):
+    # Reports name deleted doctors too; rollups are read in batches
+    return db.session.execute(statement.execution_options(include_deleted=True, yield_per=1000))
+
+
+def department_daily(start, end):
+    """Appointments per department per day"""
+    department = func.coalesce(Department.name, 'Unassigned').label('department')
+    statement = select(AppointmentRollup.day, department, *_totals()) \
+        .outerjoin(Department, Department.id == AppointmentRollup.department_id) \
+        .where(AppointmentRollup.day.between(start, end)) \
+        .group_by(AppointmentRollup.day, department) \
+        .order_by(AppointmentRollup.day, department)
+    for day, name, total, completed, cancelled, no_show in _stream(statement):
+        yield {'day': day.isoformat(), 'department': name, 'total': total, 'completed': completed,
+               'cancelled': cancelled, 'no_show': no_show}
+
+
+def doctor_rates(start, end):
+    """Completion, cancellation and no-show rates per doctor"""
+    statement = select(AppointmentRollup.doctor_id, Doctor.display_name, Doctor.specialization, *_totals()) \
+        .join(Doctor, Doctor.id == AppointmentRollup.doctor_id) \
+        .where(AppointmentRollup.day.between(start, end)) \
+        .group_by(AppointmentRollup.doctor_id, Doctor.display_name, Doctor.name_lower, Doctor.specialization) \
+        .order_by(Doctor.name_lower, AppointmentRollup.doctor_id)
+    for doctor_id, name, specialization, total, completed, cancelled, no_show in _stream(statement):
+        yield {'doctor_id': doctor_id, 'doctor': name, 'specialization': specialization,
+               'total': total, 'completed': completed, 'cancelled': cancelled, 'no_show': no_show,
+               'completion_rate': _rate(completed, total), 'cancellation_rate': _rate(cancelled, total),
+               'no_show_rate': _rate(no_show, total)}
+
+
+def no_show_trend(start, end):
+    """No-shows per week (weeks start on Monday)"""
+    statement = select(AppointmentRollup.day, *_totals()) \
+        .where(AppointmentRollup.day.between(start, end)) \
+        .group_by(AppointmentRollup.day).order_by(AppointmentRollup.day)
+    week = None
+    for day, total, _completed, _cancelled, no_show in _stream(statement):
+        monday = day - timedelta(days=day.weekday())
+        if week is not None and week['week'] != monday:
+            yield _finish_week(week)
+            week = None
+        if week is None:
+            week = {'week': monday, 'total': 0, 'no_show': 0}
+        week['total'] += total
+        week['no_show'] += no_show
+    if week is not None:
+        yield _finish_week(week)
+
+
+def _finish_week(week):
+    week['no_show_rate'] = _rate(week['no_show'], week['total'])
+    week['week'] = week['week'].isoformat()
+    return week
+
+
+# name -> (title, columns, row generator)
+REPORTS = {
+    'departments': ('Appointments per department per day',
+                    ['day', 'department', 'total', 'completed', 'cancelled', 'no_show'],
+                    department_daily),
+    'doctors': ('Completion and cancellation rates per doctor',
+                ['doctor', 'specialization', 'total', 'completed', 'cancelled', 'no_show',
+                 'completion_rate', 'cancellation_rate', 'no_show_rate'],
+                doctor_rates),
+    'no-shows': ('Weekly no-show trend',
+                 ['week', 'total', 'no_show', 'no_show_rate'],
+                 no_show_trend),
+}
+
+
+def csv_lines(columns, rows):
+    """Yield a CSV header and rows one line at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    for row in rows:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow([row[column] for column in columns])
+        yield buffer.getvalue()
@@ -1,13 +1,35 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import (
+    abort, Blueprint, render_template, request, redirect, url_for, flash, jsonify, make_response,
+    Response, stream_with_context
+)
 from flask_login import login_user, logout_user, login_required, current_user
 from datetime import datetime, timedelta
-from sqlalchemy import or_
+from sqlalchemy.orm import joinedload
 from app.app_init import db
-from app.app_models import User, Doctor, Patient, Appointment, Treatment, Department
+from app.app_models import User, Doctor, Patient, Appointment, Treatment, Department, Job
 from app.app_forms import (
     LoginForm, RegisterForm, AddDoctorForm, BookAppointmentForm,
-    TreatmentForm, UpdateProfileForm, SearchForm
+    TreatmentForm, UpdateProfileForm, SearchForm, AdminSearchForm
+)
+from app.app_queries import (
+    doctors_with_users, appointments_with_people, patients_with_appointment_counts,
+    patients_of_doctor, DOCTOR_SORTS, PATIENT_SORTS, DOCTOR_PATIENT_SORTS, APPOINTMENT_SORTS
 )
+from app.app_pagination import keyset_paginate, page_args
+from app.app_stats import get_dashboard_stats
+from app.app_dashboard import doctor_dashboard_data
+from app.app_booking import book_slot, SlotUnavailable
+from app.app_availability import availability_index
+from app.app_search import find_doctors, find_patients, find_treatments
+from app.app_profiling import query_budget
+from app.app_http_cache import conditional_get
+from app.app_fragments import fragment_cache
+from app.app_passwords import login_throttle, HashingBusy
+from app.app_jobs import enqueue, job_status, job_metrics, job_worker
+from app.app_soft_delete import soft_delete_doctor, soft_delete_patient
+from app.app_archive import patient_treatments
+from app.app_reports import REPORTS, csv_lines
+from app.app_records import FORMATS, patient_summary, record_chunks, record_filename
 
 
 
@@ -17,6 +39,16 @@ main = Blueprint('main', __name__)
 
 
 
+@main.errorhandler(HashingBusy)
+def hashing_busy(exc):
+    """Password pool saturated: ask the client to retry instead of queueing"""
+    db.session.rollback()
+    flash('The server is busy. Please try again in a moment.', 'warning')
+    return redirect(request.url)
+
+
+
+
 # ==================== Authentication Routes ====================
 
 
@@ -46,9 +78,26 @@ def login():
     
     form = LoginForm()
     if form.validate_on_submit():
-        user = User.query.filter_by(email=form.email.data).first()
+        ip, email = request.remote_addr, form.email.data
+        retry_after = login_throttle.retry_after(ip, email)
+        if retry_after:
+            flash('Too many login attempts. Please wait a few minutes and try again.', 'danger')
+            response = make_response(render_template('login.html', form=form), 429)
+            response.headers['Retry-After'] = str(retry_after)
+            return response
+        
+        user = User.query.filter_by(email=email).first()
+        valid = user is not None and user.check_password(form.password.data)
+        login_throttle.record(ip, email, valid)
         
-        if user and user.check_password(form.password.data):
+        if valid:
+            # Upgrade hashes made with older PASSWORD_HASH_METHOD settings
+            if user.password_needs_rehash():
+                try:
+                    user.set_password(form.password.data)
+                    db.session.commit()
+                except HashingBusy:
+                    pass
             login_user(user)
             next_page = request.args.get('next')
             return redirect(next_page) if next_page else redirect(url_for('main.home'))
@@ -105,20 +154,19 @@ def logout():
 
 @main.route('/admin/dashboard')
 @login_required
+@query_budget(3)
 def admin_dashboard():
     """Admin dashboard with statistics"""
     if current_user.role != 'admin':
         flash('Access denied. Admin only.', 'danger')
         return redirect(url_for('main.home'))
     
-    # Get statistics
-    total_doctors = Doctor.query.count()
-    total_patients = Patient.query.count()
-    total_appointments = Appointment.query.count()
-    upcoming_appointments = Appointment.query.filter(
-        Appointment.date >= datetime.now().date(),
-        Appointment.status == 'Booked'
-    ).count()
+    # Get statistics (one aggregate query, cached between requests)
+    counters = get_dashboard_stats()
+    total_doctors = counters['total_doctors']
+    total_patients = counters['total_patients']
+    total_appointments = counters['total_appointments']
+    upcoming_appointments = counters['upcoming_appointments']
     
     stats = {
         'total_doctors': total_doctors,
@@ -136,16 +184,68 @@ def admin_dashboard():
 
 
 
+@main.route('/admin/cache-stats')
+@login_required
+def cache_stats():
+    """Fragment cache hit ratio and render time saved, for this worker (JSON)"""
+    if current_user.role != 'admin':
+        flash('Access denied. Admin only.', 'danger')
+        return redirect(url_for('main.home'))
+    
+    return jsonify({'fragments': fragment_cache.stats()})
+
+
+
+
+@main.route('/admin/jobs')
+@login_required
+def job_list():
+    """Background job metrics and the most recent jobs (JSON)"""
+    if current_user.role != 'admin':
+        flash('Access denied. Admin only.', 'danger')
+        return redirect(url_for('main.home'))
+    
+    query = Job.query
+    if request.args.get('status'):
+        query = query.filter(Job.status == request.args['status'])
+    if request.args.get('kind'):
+        query = query.filter(Job.kind == request.args['kind'])
+    limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+    jobs = query.order_by(Job.id.desc()).limit(limit).all()
+    return jsonify({
+        'metrics': job_metrics(request.args.get('window', 3600, type=int)),
+        'worker': job_worker.stats(),
+        'jobs': [job_status(job) for job in jobs],
+    })
+
+
+
+
+@main.route('/admin/jobs/<int:job_id>')
+@login_required
+def job_detail(job_id):
+    """Status of one background job (JSON)"""
+    if current_user.role != 'admin':
+        flash('Access denied. Admin only.', 'danger')
+        return redirect(url_for('main.home'))
+    
+    return jsonify(job_status(Job.query.get_or_404(job_id)))
+
+
+
+
 @main.route('/admin/doctors')
 @login_required
+@query_budget(4)
 def manage_doctors():
     """List all doctors"""
     if current_user.role != 'admin':
         flash('Access denied. Admin only.', 'danger')
         return redirect(url_for('main.home'))
     
-    doctors = Doctor.query.all()
-    return render_template('admin_doctors.html', doctors=doctors)
+    page = keyset_paginate(doctors_with_users(), DOCTOR_SORTS,
+                           **page_args(request.args, DOCTOR_SORTS, 'id'))
+    return render_template('admin_doctors.html', doctors=page.items, page=page)
 
 
 
@@ -222,12 +322,11 @@ def delete_doctor(doctor_id):
         return redirect(url_for('main.home'))
     
     doctor = Doctor.query.get_or_404(doctor_id)
-    user = doctor.user
-    db.session.delete(doctor)
-    db.session.delete(user)
-    db.session.commit()
+    # Soft delete keeps the medical records; a job cancels the upcoming bookings in chunks
+    soft_delete_doctor(doctor)
+    enqueue('delete_doctor', unique_key=f'delete_doctor:{doctor_id}', doctor_id=doctor_id)
     
-    flash('Doctor deleted successfully!', 'success')
+    flash('Doctor deleted successfully! Their upcoming appointments are being cancelled.', 'success')
     return redirect(url_for('main.manage_doctors'))
 
 
@@ -235,6 +334,7 @@ def delete_doctor(doctor_id):
 
 @main.route('/admin/doctor/<int:doctor_id>/patients')
 @login_required
+@query_budget(5)
 def doctor_patients(doctor_id):
     """View all patients assigned to a doctor"""
     if current_user.role != 'admin':
@@ -242,25 +342,29 @@ def doctor_patients(doctor_id):
         return redirect(url_for('main.home'))
     
     doctor = Doctor.query.get_or_404(doctor_id)
-    # Get all appointments for this doctor
-    appointments = Appointment.query.filter_by(doctor_id=doctor_id).all()
+    # Patients come from the maintained doctor_patient table, one page at a time
+    page = keyset_paginate(patients_of_doctor(doctor_id), DOCTOR_PATIENT_SORTS,
+                           **page_args(request.args, DOCTOR_PATIENT_SORTS, 'name'))
     
-    return render_template('admin_doctor_patients.html', doctor=doctor, appointments=appointments)
+    return render_template('admin_doctor_patients.html', doctor=doctor,
+                          patients=page.items, page=page)
 
 
 
 
 @main.route('/admin/patients')
 @login_required
+@query_budget(4)
 def manage_patients():
     """List all patients"""
     if current_user.role != 'admin':
         flash('Access denied. Admin only.', 'danger')
         return redirect(url_for('main.home'))
     
-    # Show all patients
-    patients = Patient.query.all()
-    return render_template('admin_patients.html', patients=patients)
+    # Show patients with their appointment counts, one page at a time
+    page = keyset_paginate(patients_with_appointment_counts(), PATIENT_SORTS,
+                           **page_args(request.args, PATIENT_SORTS, 'id'))
+    return render_template('admin_patients.html', patients=page.items, page=page)
 
 
 
@@ -274,12 +378,10 @@ def delete_patient(patient_id):
         return redirect(url_for('main.home'))
     
     patient = Patient.query.get_or_404(patient_id)
-    user = patient.user
-    db.session.delete(patient)
-    db.session.delete(user)
-    db.session.commit()
+    soft_delete_patient(patient)
+    enqueue('delete_patient', unique_key=f'delete_patient:{patient_id}', patient_id=patient_id)
     
-    flash('Patient deleted successfully!', 'success')
+    flash('Patient deleted successfully! Their upcoming appointments are being cancelled.', 'success')
     return redirect(url_for('main.manage_patients'))
 
 
@@ -287,14 +389,71 @@ def delete_patient(patient_id):
 
 @main.route('/admin/appointments')
 @login_required
+@query_budget(4)
 def manage_appointments():
     """View all appointments"""
     if current_user.role != 'admin':
         flash('Access denied. Admin only.', 'danger')
         return redirect(url_for('main.home'))
     
-    appointments = Appointment.query.all()
-    return render_template('admin_appointments.html', appointments=appointments)
+    page = keyset_paginate(appointments_with_people(), APPOINTMENT_SORTS,
+                           **page_args(request.args, APPOINTMENT_SORTS, 'date'))
+    return render_template('admin_appointments.html', appointments=page.items, page=page)
+
+
+
+
+def _report_range(args):
+    """start/end query args as dates (default: the last 30 days); None if malformed"""
+    today = datetime.now().date()
+    try:
+        start = datetime.strptime(args['start'], '%Y-%m-%d').date() if args.get('start') else today - timedelta(days=30)
+        end = datetime.strptime(args['end'], '%Y-%m-%d').date() if args.get('end') else today
+    except ValueError:
+        return None
+    return (start, end) if start <= end else None
+
+
+@main.route('/admin/reports')
+@login_required
+@query_budget(4)
+def admin_reports():
+    """Appointment reports from the daily rollups"""
+    if current_user.role != 'admin':
+        flash('Access denied. Admin only.', 'danger')
+        return redirect(url_for('main.home'))
+    
+    name = request.args.get('report', 'departments')
+    if name not in REPORTS:
+        flash('Unknown report.', 'danger')
+        return redirect(url_for('main.admin_reports'))
+    period = _report_range(request.args)
+    if period is None:
+        flash('Invalid date range. Use YYYY-MM-DD with start before end.', 'danger')
+        return redirect(url_for('main.admin_reports', report=name))
+    
+    title, columns, rows = REPORTS[name]
+    return render_template('admin_reports.html', reports=REPORTS, name=name, title=title,
+                           columns=columns, rows=list(rows(*period)), start=period[0], end=period[1])
+
+
+@main.route('/admin/reports/<name>.csv')
+@login_required
+def admin_report_csv(name):
+    """Stream a report as CSV"""
+    if current_user.role != 'admin':
+        flash('Access denied. Admin only.', 'danger')
+        return redirect(url_for('main.home'))
+    
+    period = _report_range(request.args)
+    if name not in REPORTS or period is None:
+        flash('Unknown report or invalid date range.', 'danger')
+        return redirect(url_for('main.admin_reports'))
+    
+    _title, columns, rows = REPORTS[name]
+    filename = f'{name}_{period[0].isoformat()}_{period[1].isoformat()}.csv'
+    return Response(stream_with_context(csv_lines(columns, rows(*period))), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
 
 
 
@@ -307,7 +466,7 @@ def admin_search():
         flash('Access denied. Admin only.', 'danger')
         return redirect(url_for('main.home'))
     
-    form = SearchForm()
+    form = AdminSearchForm()
     results = []
     
     if form.validate_on_submit():
@@ -315,20 +474,13 @@ def admin_search():
         search_by = form.search_by.data
         
         if search_by == 'doctor_name':
-            doctors = Doctor.query.join(User).filter(
-                User.name.ilike(f'%{search_query}%')
-            ).all()
-            results = doctors
+            results = find_doctors(search_query, field='name')
         elif search_by == 'specialization':
-            doctors = Doctor.query.filter(
-                Doctor.specialization.ilike(f'%{search_query}%')
-            ).all()
-            results = doctors
+            results = find_doctors(search_query, field='specialization')
         elif search_by == 'patient_name':
-            patients = Patient.query.join(User).filter(
-                User.name.ilike(f'%{search_query}%')
-            ).all()
-            results = patients
+            results = find_patients(search_query)
+        elif search_by == 'treatment':
+            results = find_treatments(search_query)
     
     return render_template('admin_search.html', form=form, results=results)
 
@@ -342,13 +494,14 @@ def admin_search():
 
 @main.route('/doctor/dashboard', methods=['GET', 'POST'])
 @login_required
+@query_budget(5)
 def doctor_dashboard():
     """Enhanced Doctor dashboard with all features"""
     if current_user.role != 'doctor':
         flash('Access denied. Doctor only.', 'danger')
         return redirect(url_for('main.home'))
     
-    doctor = current_user.doctor
+    doctor_id = current_user.doctor_id
     
     # Handle patient history update
     if request.method == 'POST':
@@ -365,7 +518,7 @@ def doctor_dashboard():
                 patient = Patient.query.get(patient_id)
                 latest_appointment = Appointment.query.filter_by(
                     patient_id=patient_id,
-                    doctor_id=doctor.id
+                    doctor_id=doctor_id
                 ).order_by(Appointment.date.desc(), Appointment.time.desc()).first()
                 
                 if not latest_appointment:
@@ -375,7 +528,7 @@ def doctor_dashboard():
                     treatment = Treatment(
                         appointment_id=latest_appointment.id,
                         patient_id=patient_id,
-                        doctor_id=doctor.id,
+                        doctor_id=doctor_id,
                         diagnosis=diagnosis,
                         prescription=prescription,
                         notes=notes
@@ -387,50 +540,32 @@ def doctor_dashboard():
                 db.session.rollback()
                 flash(f'Error updating patient history: {str(e)}', 'danger')
     
-    today = datetime.now().date()
-    
-    # Get today's appointments
-    today_appointments = Appointment.query.filter(
-        Appointment.doctor_id == doctor.id,
-        Appointment.date == today,
-        Appointment.status == 'Booked'
-    ).all()
-    
-    # Get assigned patients
-    patients = db.session.query(Patient).join(Appointment).filter(
-        Appointment.doctor_id == doctor.id
-    ).distinct().all()
-    
-    # Get upcoming appointments (next 7 days)
-    upcoming_date = today + timedelta(days=7)
-    upcoming_appointments = Appointment.query.filter(
-        Appointment.doctor_id == doctor.id,
-        Appointment.date >= today,
-        Appointment.date <= upcoming_date,
-        Appointment.status == 'Booked'
-    ).order_by(Appointment.date, Appointment.time).all()
+    # Today's and upcoming bookings share one date-range query
+    dashboard = doctor_dashboard_data(doctor_id)
     
     return render_template('doctor_dashboard.html',
-                          doctor_name=doctor.user.name,
-                          today_appointments=today_appointments,
-                          patients=patients,
-                          upcoming_appointments=upcoming_appointments)
+                          doctor_name=current_user.name,
+                          today_appointments=dashboard.today_appointments,
+                          patients=dashboard.patients,
+                          upcoming_appointments=dashboard.upcoming_appointments)
 
 
 
 
 @main.route('/doctor/appointments')
 @login_required
+@query_budget(5)
 def doctor_appointments():
     """View all doctor's appointments"""
     if current_user.role != 'doctor':
         flash('Access denied. Doctor only.', 'danger')
         return redirect(url_for('main.home'))
     
-    doctor = current_user.doctor
-    appointments = Appointment.query.filter_by(doctor_id=doctor.id).all()
+    query = appointments_with_people().filter(Appointment.doctor_id == current_user.doctor_id)
+    page = keyset_paginate(query, APPOINTMENT_SORTS,
+                           **page_args(request.args, APPOINTMENT_SORTS, 'date'))
     
-    return render_template('doctor_appointments.html', appointments=appointments)
+    return render_template('doctor_appointments.html', appointments=page.items, page=page)
 
 
 
@@ -445,7 +580,7 @@ def complete_appointment(appointment_id):
     
     appointment = Appointment.query.get_or_404(appointment_id)
     
-    if appointment.doctor_id != current_user.doctor.id:
+    if appointment.doctor_id != current_user.doctor_id:
         flash('You cannot access this appointment.', 'danger')
         return redirect(url_for('main.doctor_appointments'))
     
@@ -479,26 +614,26 @@ def complete_appointment(appointment_id):
 
 @main.route('/doctor/patients')
 @login_required
+@query_budget(5)
 def view_doctor_patients():
     """View all patients assigned to doctor"""
     if current_user.role != 'doctor':
         flash('Access denied. Doctor only.', 'danger')
         return redirect(url_for('main.home'))
     
-    doctor = current_user.doctor
-    
-    # Get all patients who have appointments with this doctor
-    patients = db.session.query(Patient).join(Appointment).filter(
-        Appointment.doctor_id == doctor.id
-    ).distinct().all()
+    # Patients come from the maintained doctor_patient table, one page at a time
+    page = keyset_paginate(patients_of_doctor(current_user.doctor_id), DOCTOR_PATIENT_SORTS,
+                           **page_args(request.args, DOCTOR_PATIENT_SORTS, 'name'))
     
-    return render_template('doctor_patients.html', patients=patients)
+    return render_template('doctor_patients.html', patients=page.items, page=page)
 
 
 
 
 @main.route('/doctor/patient/<int:patient_id>/history')
 @login_required
+@conditional_get(lambda patient_id: [f'patient:{patient_id}', 'doctors', 'patients']
+                 if current_user.role in ['doctor', 'admin'] else None)
 def patient_history(patient_id):
     """View patient's medical history"""
     if current_user.role not in ['doctor', 'admin']:
@@ -506,7 +641,7 @@ def patient_history(patient_id):
         return redirect(url_for('main.home'))
     
     patient = Patient.query.get_or_404(patient_id)
-    treatments = Treatment.query.filter_by(patient_id=patient.id).all()
+    treatments = patient_treatments(patient.id)
     
     return render_template('doctor_patient_history.html', 
                           patient=patient, treatments=treatments)
@@ -514,6 +649,29 @@ def patient_history(patient_id):
 
 
 
+def _record_response(patient_id, fmt):
+    """Stream the full medical record of patient_id as fmt"""
+    patient = patient_summary(patient_id) if fmt in FORMATS else None
+    if patient is None:
+        abort(404)
+    disposition = 'inline' if fmt == 'html' else 'attachment'
+    return Response(stream_with_context(record_chunks(patient, fmt)), mimetype=FORMATS[fmt],
+                    headers={'Content-Disposition': f'{disposition}; filename={record_filename(patient, fmt)}'})
+
+
+@main.route('/doctor/patient/<int:patient_id>/record.<fmt>')
+@login_required
+def export_patient_record(patient_id, fmt):
+    """Download a patient's complete medical record (json, csv or html)"""
+    if current_user.role not in ['doctor', 'admin']:
+        flash('Access denied.', 'danger')
+        return redirect(url_for('main.home'))
+    
+    return _record_response(patient_id, fmt)
+
+
+
+
 # ==================== Patient Routes ====================
 
 
@@ -527,18 +685,17 @@ def patient_dashboard():
         flash('Access denied. Patient only.', 'danger')
         return redirect(url_for('main.home'))
     
-    patient = current_user.patient
     today = datetime.now().date()
     
-    # Get upcoming appointments
-    upcoming_appointments = Appointment.query.filter(
-        Appointment.patient_id == patient.id,
+    # Get upcoming appointments (a soft-deleted doctor's stay until the delete job cancels them)
+    upcoming_appointments = Appointment.query.options(joinedload(Appointment.doctor, innerjoin=True)).filter(
+        Appointment.patient_id == current_user.patient_id,
         Appointment.date >= today,
         Appointment.status == 'Booked'
-    ).order_by(Appointment.date).all()
+    ).order_by(Appointment.date).execution_options(include_deleted=True).all()
     
-    # Get departments/specializations
-    departments = Department.query.all()
+    # Departments are only loaded when their cached fragment is cold
+    departments = Department.query.order_by(Department.id)
     
     return render_template('patient_dashboard.html', 
                           appointments=upcoming_appointments,
@@ -563,13 +720,9 @@ def search_doctors():
         search_by = form.search_by.data
         
         if search_by == 'specialization':
-            doctors = Doctor.query.filter(
-                Doctor.specialization.ilike(f'%{search_query}%')
-            ).all()
+            doctors = find_doctors(search_query, field='specialization')
         elif search_by == 'name':
-            doctors = Doctor.query.join(User).filter(
-                User.name.ilike(f'%{search_query}%')
-            ).all()
+            doctors = find_doctors(search_query, field='name')
     
     return render_template('patient_search_doctors.html', form=form, doctors=doctors)
 
@@ -585,33 +738,28 @@ def book_appointment():
         return redirect(url_for('main.home'))
     
     form = BookAppointmentForm()
-    form.doctor_id.choices = [(d.id, f"{d.user.name} - {d.specialization}") 
-                              for d in Doctor.query.all()]
+    form.doctor_id.choices = [(d.id, f"{d.display_name} - {d.specialization}") 
+                              for d in Doctor.query.order_by(Doctor.name_lower, Doctor.id)]
     
     if form.validate_on_submit():
-        # Check for double booking
-        existing = Appointment.query.filter_by(
-            doctor_id=form.doctor_id.data,
-            date=form.date.data,
-            time=form.time.data
-        ).first()
-        
-        if existing:
-            flash('This time slot is already booked. Please choose another.', 'warning')
+        # The unique slot index rejects double bookings atomically
+        try:
+            book_slot(
+                patient_id=current_user.patient_id,
+                doctor_id=form.doctor_id.data,
+                day=form.date.data,
+                slot=form.time.data,
+                reason=form.reason.data
+            )
+        except SlotUnavailable as exc:
+            message = f'{exc} Please choose another.'
+            if exc.suggestions:
+                options = ', '.join(f"{d.strftime('%d-%m-%Y')} {t.strftime('%H:%M')}"
+                                    for d, t in exc.suggestions)
+                message += f' Next free slots: {options}.'
+            flash(message, 'warning')
             return render_template('patient_book_appointment.html', form=form)
         
-        appointment = Appointment(
-            patient_id=current_user.patient.id,
-            doctor_id=form.doctor_id.data,
-            date=form.date.data,
-            time=form.time.data,
-            reason=form.reason.data,
-            status='Booked'
-        )
-        
-        db.session.add(appointment)
-        db.session.commit()
-        
         flash('Appointment booked successfully!', 'success')
         return redirect(url_for('main.patient_appointments'))
     
@@ -620,18 +768,45 @@ def book_appointment():
 
 
 
+@main.route('/doctor/<int:doctor_id>/availability')
+@login_required
+@query_budget(6)
+def doctor_availability(doctor_id):
+    """Free slots for a doctor over the next few days (JSON)"""
+    Doctor.query.get_or_404(doctor_id)
+    
+    days = max(1, min(request.args.get('days', 7, type=int), 31))
+    start = None
+    if request.args.get('start'):
+        try:
+            start = datetime.strptime(request.args['start'], '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'start must be YYYY-MM-DD'}), 400
+    
+    free = availability_index.free_slots(doctor_id, start=start, days=days)
+    return jsonify({
+        'doctor_id': doctor_id,
+        'slots': {day.isoformat(): [t.strftime('%H:%M') for t in times]
+                  for day, times in free.items()}
+    })
+
+
+
+
 @main.route('/patient/appointments')
 @login_required
+@query_budget(5)
 def patient_appointments():
     """View all patient's appointments"""
     if current_user.role != 'patient':
         flash('Access denied. Patient only.', 'danger')
         return redirect(url_for('main.home'))
     
-    patient = current_user.patient
-    appointments = Appointment.query.filter_by(patient_id=patient.id).all()
+    query = appointments_with_people().filter(Appointment.patient_id == current_user.patient_id)
+    page = keyset_paginate(query, APPOINTMENT_SORTS,
+                           **page_args(request.args, APPOINTMENT_SORTS, 'date'))
     
-    return render_template('patient_appointments.html', appointments=appointments)
+    return render_template('patient_appointments.html', appointments=page.items, page=page)
 
 
 
@@ -646,7 +821,7 @@ def cancel_appointment(appointment_id):
     
     appointment = Appointment.query.get_or_404(appointment_id)
     
-    if appointment.patient_id != current_user.patient.id:
+    if appointment.patient_id != current_user.patient_id:
         flash('You cannot access this appointment.', 'danger')
         return redirect(url_for('main.patient_appointments'))
     
@@ -661,20 +836,34 @@ def cancel_appointment(appointment_id):
 
 @main.route('/patient/medical-history')
 @login_required
+@conditional_get(lambda: [f'patient:{current_user.patient_id}', 'doctors', 'patients']
+                 if current_user.role == 'patient' else None)
 def medical_history():
     """View patient's medical history"""
     if current_user.role != 'patient':
         flash('Access denied. Patient only.', 'danger')
         return redirect(url_for('main.home'))
     
-    patient = current_user.patient
-    treatments = Treatment.query.filter_by(patient_id=patient.id).all()
+    treatments = patient_treatments(current_user.patient_id)
     
     return render_template('patient_medical_history.html', treatments=treatments)
 
 
 
 
+@main.route('/patient/medical-history/record.<fmt>')
+@login_required
+def export_medical_record(fmt):
+    """Download your complete medical record (json, csv or html)"""
+    if current_user.role != 'patient':
+        flash('Access denied. Patient only.', 'danger')
+        return redirect(url_for('main.home'))
+    
+    return _record_response(current_user.patient_id, fmt)
+
+
+
+
 @main.route('/patient/profile/edit', methods=['GET', 'POST'])
 @login_required
 def edit_patient_profile():
@@ -685,7 +874,7 @@ def edit_patient_profile():
     
     form = UpdateProfileForm()
     if form.validate_on_submit():
-        current_user.name = form.name.data
+        current_user.load().name = form.name.data
         db.session.commit()
         flash('Profile updated successfully!', 'success')
         return redirect(url_for('main.patient_dashboard'))
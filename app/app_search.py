@@ -0,0 +1,271 @@
+"""Full-text search over doctors, patients and treatments.
+
+On SQLite the data is mirrored into FTS5 tables (doctor_fts, patient_fts,
+treatment_fts) that triggers keep in sync, and queries are ranked with
+bm25(). Every term is matched as a prefix, and when a query finds nothing
+each term is swapped for its closest indexed spelling so that small typos
+still match. On Postgres the same functions use to_tsvector/ts_rank over GIN
+expression indexes. Any other backend, or a SQLite build without FTS5,
+falls back to the old ILIKE scan.
+"""
+import difflib
+import re
+from sqlalchemy import text, func, literal_column, or_
+from sqlalchemy.orm import joinedload
+from app.app_init import db
+from app.app_models import Doctor, Patient, Treatment
+
+
+MAX_RESULTS = 50
+
+# table -> (indexed columns, source SELECT producing rowid + columns)
+FTS_TABLES = {
+    'doctor_fts': (
+        ('name', 'specialization'),
+        'SELECT doctor.id, user.name, doctor.specialization '
+        'FROM doctor JOIN user ON user.id = doctor.user_id',
+    ),
+    'patient_fts': (
+        ('name', 'email'),
+        'SELECT patient.id, user.name, user.email '
+        'FROM patient JOIN user ON user.id = patient.user_id',
+    ),
+    'treatment_fts': (
+        ('diagnosis', 'prescription', 'notes'),
+        'SELECT treatment.id, treatment.diagnosis, treatment.prescription, treatment.notes '
+        'FROM treatment',
+    ),
+}
+
+SQLITE_TRIGGERS = [
+    # doctors: name lives on user, specialization on doctor
+    """CREATE TRIGGER IF NOT EXISTS doctor_fts_ai AFTER INSERT ON doctor BEGIN
+        INSERT INTO doctor_fts(rowid, name, specialization)
+        SELECT NEW.id, user.name, NEW.specialization FROM user WHERE user.id = NEW.user_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS doctor_fts_au AFTER UPDATE OF specialization, user_id ON doctor BEGIN
+        DELETE FROM doctor_fts WHERE rowid = OLD.id;
+        INSERT INTO doctor_fts(rowid, name, specialization)
+        SELECT NEW.id, user.name, NEW.specialization FROM user WHERE user.id = NEW.user_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS doctor_fts_ad AFTER DELETE ON doctor BEGIN
+        DELETE FROM doctor_fts WHERE rowid = OLD.id;
+    END""",
+    # patients
+    """CREATE TRIGGER IF NOT EXISTS patient_fts_ai AFTER INSERT ON patient BEGIN
+        INSERT INTO patient_fts(rowid, name, email)
+        SELECT NEW.id, user.name, user.email FROM user WHERE user.id = NEW.user_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS patient_fts_au AFTER UPDATE OF user_id ON patient BEGIN
+        DELETE FROM patient_fts WHERE rowid = OLD.id;
+        INSERT INTO patient_fts(rowid, name, email)
+        SELECT NEW.id, user.name, user.email FROM user WHERE user.id = NEW.user_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS patient_fts_ad AFTER DELETE ON patient BEGIN
+        DELETE FROM patient_fts WHERE rowid = OLD.id;
+    END""",
+    # renames and email changes propagate from user
+    """CREATE TRIGGER IF NOT EXISTS user_fts_au AFTER UPDATE OF name, email ON user BEGIN
+        UPDATE doctor_fts SET name = NEW.name
+        WHERE rowid IN (SELECT id FROM doctor WHERE user_id = NEW.id);
+        UPDATE patient_fts SET name = NEW.name, email = NEW.email
+        WHERE rowid IN (SELECT id FROM patient WHERE user_id = NEW.id);
+    END""",
+    # treatments
+    """CREATE TRIGGER IF NOT EXISTS treatment_fts_ai AFTER INSERT ON treatment BEGIN
+        INSERT INTO treatment_fts(rowid, diagnosis, prescription, notes)
+        VALUES (NEW.id, NEW.diagnosis, NEW.prescription, NEW.notes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS treatment_fts_au AFTER UPDATE OF diagnosis, prescription, notes ON treatment BEGIN
+        UPDATE treatment_fts SET diagnosis = NEW.diagnosis, prescription = NEW.prescription,
+            notes = NEW.notes WHERE rowid = NEW.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS treatment_fts_ad AFTER DELETE ON treatment BEGIN
+        DELETE FROM treatment_fts WHERE rowid = OLD.id;
+    END""",
+]
+
+POSTGRES_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_user_name_tsv ON \"user\" "
+    "USING gin (to_tsvector('simple', name))",
+    "CREATE INDEX IF NOT EXISTS ix_doctor_specialization_tsv ON doctor "
+    "USING gin (to_tsvector('simple', specialization))",
+    "CREATE INDEX IF NOT EXISTS ix_treatment_tsv ON treatment USING gin "
+    "(to_tsvector('simple', diagnosis || ' ' || prescription || ' ' || coalesce(notes, '')))",
+]
+
+# Name indexes on the denormalized display_name columns (migration 8 adds them)
+POSTGRES_NAME_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_doctor_display_name_tsv ON doctor "
+    "USING gin (to_tsvector('simple', display_name))",
+    "CREATE INDEX IF NOT EXISTS ix_patient_display_name_tsv ON patient "
+    "USING gin (to_tsvector('simple', display_name))",
+]
+
+
+def install(conn):
+    """Create the search structures for conn's dialect and backfill them"""
+    if conn.dialect.name == 'postgresql':
+        for statement in POSTGRES_INDEXES:
+            conn.execute(text(statement))
+        return
+    if conn.dialect.name != 'sqlite' or not fts5_available(conn):
+        return
+    for table, (columns, source) in FTS_TABLES.items():
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+            f"{', '.join(columns)}, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        ))
+        conn.execute(text(f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_vocab "
+                          f"USING fts5vocab({table}, 'row')"))
+        conn.execute(text(f"DELETE FROM {table}"))
+        conn.execute(text(f"INSERT INTO {table}(rowid, {', '.join(columns)}) {source}"))
+    for trigger in SQLITE_TRIGGERS:
+        conn.execute(text(trigger))
+
+
+def fts5_available(conn):
+    """Whether this SQLite build can create FTS5 tables"""
+    try:
+        with conn.begin_nested():
+            conn.execute(text("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x)"))
+            conn.execute(text("DROP TABLE temp._fts5_probe"))
+        return True
+    except Exception:
+        return False
+
+
+def _backend():
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        exists = db.session.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'doctor_fts'"
+        )).first()
+        return 'fts5' if exists else 'like'
+    if dialect == 'postgresql':
+        return 'tsvector'
+    return 'like'
+
+
+def _terms(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def _match_expression(terms, columns=None):
+    phrase = ' '.join(f'"{t}"*' for t in terms)
+    if columns:
+        return f"{{{' '.join(columns)}}} : ({phrase})"
+    return phrase
+
+
+def _correct_terms(table, terms):
+    """Replace each term with its closest indexed spelling, if any"""
+    corrected = []
+    for term in terms:
+        # Only compare against words sharing the first letter to keep this cheap
+        candidates = [row[0] for row in db.session.execute(
+            text(f"SELECT term FROM {table}_vocab WHERE term >= :lo AND term < :hi"),
+            {'lo': term[0], 'hi': chr(ord(term[0]) + 1)}
+        )]
+        match = difflib.get_close_matches(term, candidates, n=1, cutoff=0.75)
+        corrected.append(match[0] if match else term)
+    return corrected
+
+
+def _fts_ids(table, terms, columns, limit, patient_id=None):
+    """Matching rowids in bm25 order, retrying once with corrected spellings"""
+    if patient_id is None:
+        sql = text(f"SELECT rowid FROM {table} WHERE {table} MATCH :q "
+                   f"ORDER BY bm25({table}) LIMIT :limit")
+    else:
+        sql = text(f"SELECT {table}.rowid FROM {table} JOIN treatment ON treatment.id = {table}.rowid "
+                   f"WHERE {table} MATCH :q AND treatment.patient_id = :patient_id "
+                   f"ORDER BY bm25({table}) LIMIT :limit")
+    params = {'limit': limit, 'patient_id': patient_id}
+    ids = [r[0] for r in db.session.execute(sql, dict(params, q=_match_expression(terms, columns)))]
+    if not ids:
+        fixed = _correct_terms(table, terms)
+        if fixed != terms:
+            ids = [r[0] for r in db.session.execute(sql, dict(params, q=_match_expression(fixed, columns)))]
+    return ids
+
+
+def _in_rank_order(model, ids, query):
+    rows = {obj.id: obj for obj in query.filter(model.id.in_(ids))} if ids else {}
+    return [rows[i] for i in ids if i in rows]
+
+
+def _tsquery(terms):
+    return func.to_tsquery('simple', ' & '.join(f'{t}:*' for t in terms))
+
+
+def _ts_search(query, columns, terms, limit):
+    """Match any of columns (each backed by its own GIN index), ranked by ts_rank"""
+    tsq = _tsquery(terms)
+    vectors = [func.to_tsvector('simple', c) for c in columns]
+    rank = sum((func.ts_rank(v, tsq) for v in vectors[1:]), func.ts_rank(vectors[0], tsq))
+    return query.filter(or_(*[v.op('@@')(tsq) for v in vectors])).order_by(
+        rank.desc()).limit(limit).all()
+
+
+def find_doctors(query, field=None, limit=MAX_RESULTS):
+    """Doctors matching query, best first; field is 'name' or 'specialization'"""
+    terms = _terms(query)
+    if not terms:
+        return []
+    # Names are on the doctor row; the user is loaded only for the e-mail shown with each result
+    base = Doctor.query.options(joinedload(Doctor.user, innerjoin=True))
+    backend = _backend()
+    if backend == 'fts5':
+        ids = _fts_ids('doctor_fts', terms, [field] if field else None, limit)
+        return _in_rank_order(Doctor, ids, base)
+    if backend == 'tsvector':
+        columns = {'name': [Doctor.display_name], 'specialization': [Doctor.specialization]}.get(
+            field, [Doctor.display_name, Doctor.specialization])
+        return _ts_search(base, columns, terms, limit)
+    # name_lower is already lowercase, so a plain LIKE on it is case-insensitive
+    pattern = f'%{query.lower()}%'
+    columns = {'name': [Doctor.name_lower.like(pattern)],
+               'specialization': [Doctor.specialization.ilike(pattern)]}.get(
+        field, [Doctor.name_lower.like(pattern), Doctor.specialization.ilike(pattern)])
+    return base.filter(or_(*columns)).limit(limit).all()
+
+
+def find_patients(query, limit=MAX_RESULTS):
+    """Patients whose name or email matches query, best first"""
+    terms = _terms(query)
+    if not terms:
+        return []
+    base = Patient.query.options(joinedload(Patient.user, innerjoin=True))
+    backend = _backend()
+    if backend == 'fts5':
+        return _in_rank_order(Patient, _fts_ids('patient_fts', terms, ['name'], limit), base)
+    if backend == 'tsvector':
+        return _ts_search(base, [Patient.display_name], terms, limit)
+    return base.filter(Patient.name_lower.like(f'%{query.lower()}%')).limit(limit).all()
+
+
+def find_treatments(query, patient_id=None, limit=MAX_RESULTS):
+    """Treatments whose diagnosis, prescription or notes match query"""
+    terms = _terms(query)
+    if not terms:
+        return []
+    # Results name the patient and doctor, who stay on record after a soft delete
+    base = Treatment.query.options(
+        joinedload(Treatment.patient),
+        joinedload(Treatment.doctor)
+    ).execution_options(include_deleted=True)
+    if patient_id is not None:
+        base = base.filter(Treatment.patient_id == patient_id)
+    backend = _backend()
+    if backend == 'fts5':
+        ids = _fts_ids('treatment_fts', terms, None, limit, patient_id=patient_id)
+        return _in_rank_order(Treatment, ids, base)
+    if backend == 'tsvector':
+        # Same expression as the ix_treatment_tsv GIN index
+        document = (Treatment.diagnosis + literal_column("' '") + Treatment.prescription
+                    + literal_column("' '") + func.coalesce(Treatment.notes, ''))
+        return _ts_search(base, [document], terms, limit)
+    like = f'%{query}%'
+    return base.filter(or_(Treatment.diagnosis.ilike(like), Treatment.prescription.ilike(like),
+                           Treatment.notes.ilike(like))).limit(limit).all()
@@ -0,0 +1,72 @@
+"""Soft delete for users, doctors and patients.
+
+soft_delete_doctor()/soft_delete_patient() set deleted_at on the profile
+and its login and free the e-mail address; cancel_future_bookings() (run
+from the delete jobs in app_jobs) releases their upcoming slots.
+Appointments and treatments are kept as medical records.
+
+A do_orm_execute hook adds `deleted_at IS NULL` for User, Doctor and
+Patient to every top-level ORM SELECT, including joins and joined eager
+loads, so flagged rows drop out of listings, counts, logins and
+get_or_404. Lazy loads of a relationship and attribute refreshes are
+left alone, so a treatment still shows the (deleted) doctor who wrote it.
+Pass .execution_options(include_deleted=True) to see everything; the
+appointment listings do, so a deleted doctor's visits stay in each
+patient's history.
+"""
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import with_loader_criteria
+from app.app_init import db
+from app.app_models import SoftDeleteMixin, Appointment
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _hide_deleted_rows(state):
+    if (state.is_select and not state.is_column_load and not state.is_relationship_load
+            and not state.execution_options.get('include_deleted', False)):
+        state.statement = state.statement.options(with_loader_criteria(
+            SoftDeleteMixin, lambda cls: cls.deleted_at.is_(None), include_aliases=True
+        ))
+
+
+def _retire_user(user, now):
+    user.deleted_at = now
+    # The unique e-mail can be registered again; the old one stays readable
+    user.email = f'deleted-{user.id}-{user.email}'[:100]
+
+
+def soft_delete_doctor(doctor):
+    """Flag doctor and their login as deleted (no-op if already flagged)"""
+    if doctor.deleted_at is None:
+        now = datetime.utcnow()
+        doctor.deleted_at = now
+        _retire_user(doctor.user, now)
+        db.session.commit()
+
+
+def soft_delete_patient(patient):
+    """Flag patient and their login as deleted (no-op if already flagged)"""
+    if patient.deleted_at is None:
+        now = datetime.utcnow()
+        patient.deleted_at = now
+        _retire_user(patient.user, now)
+        db.session.commit()
+
+
+def cancel_future_bookings(column, owner_id, chunk_size=500):
+    """Cancel Booked appointments from today on where column == owner_id, committing every chunk_size"""
+    today = datetime.now().date()
+    cancelled = 0
+    while True:
+        rows = Appointment.query.filter(
+            column == owner_id,
+            Appointment.status == 'Booked',
+            Appointment.date >= today
+        ).limit(chunk_size).all()
+        if not rows:
+            return cancelled
+        for appointment in rows:
+            appointment.status = 'Cancelled'
+        db.session.commit()
+        cancelled += len(rows)
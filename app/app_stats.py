@@ -0,0 +1,85 @@
+"""Admin dashboard statistics.
+
+All four counters come from a single aggregate SELECT and are cached per
+counter, so that a write only invalidates the counters it can change.
+"""
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import event, func, inspect, select
+from app.app_init import db, cache
+from app.app_models import Doctor, Patient, Appointment
+
+
+STATS_KEYS = {
+    'total_doctors': 'stats:total_doctors',
+    'total_patients': 'stats:total_patients',
+    'total_appointments': 'stats:total_appointments',
+    'upcoming_appointments': 'stats:upcoming_appointments',
+}
+
+# Which counters a change to each model can affect
+INVALIDATES = {
+    Doctor: ('total_doctors',),
+    Patient: ('total_patients',),
+    Appointment: ('total_appointments', 'upcoming_appointments'),
+}
+
+
+def compute_dashboard_stats():
+    """Run the single aggregate query behind the admin dashboard"""
+    today = datetime.now().date()
+    row = db.session.execute(select(
+        select(func.count(Doctor.id)).scalar_subquery().label('total_doctors'),
+        select(func.count(Patient.id)).scalar_subquery().label('total_patients'),
+        select(func.count(Appointment.id)).scalar_subquery().label('total_appointments'),
+        select(func.count(Appointment.id)).where(
+            Appointment.date >= today,
+            Appointment.status == 'Booked'
+        ).scalar_subquery().label('upcoming_appointments'),
+    )).one()
+    return dict(row._mapping)
+
+
+def get_dashboard_stats():
+    """Cached counters; any missing counter triggers one aggregate query"""
+    names = list(STATS_KEYS)
+    values = cache.get_many(*[STATS_KEYS[n] for n in names])
+    if all(v is not None for v in values):
+        return dict(zip(names, values))
+
+    stats = compute_dashboard_stats()
+    ttl = current_app.config.get('STATS_CACHE_TTL', 60)
+    cache.set_many({STATS_KEYS[n]: stats[n] for n in names}, ttl=ttl)
+    return stats
+
+
+def invalidate_dashboard_stats(*names):
+    """Drop the named counters (all of them when called without names)"""
+    names = names or tuple(STATS_KEYS)
+    cache.delete(*[STATS_KEYS[n] for n in names])
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_stale_counters(session, flush_context):
+    stale = session.info.setdefault('stale_stats', set())
+    for obj in list(session.new) + list(session.deleted):
+        stale.update(INVALIDATES.get(type(obj), ()))
+    # Status or date edits move appointments in and out of "upcoming";
+    # soft deletes (deleted_at set) take doctors/patients out of the totals
+    for obj in session.dirty:
+        if isinstance(obj, Appointment):
+            stale.add('upcoming_appointments')
+        elif isinstance(obj, (Doctor, Patient)) and inspect(obj).attrs.deleted_at.history.has_changes():
+            stale.update(INVALIDATES[type(obj)])
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_stale_counters(session):
+    stale = session.info.pop('stale_stats', None)
+    if stale:
+        invalidate_dashboard_stats(*stale)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_stale_counters(session):
+    session.info.pop('stale_stats', None)
@@ -0,0 +1,204 @@
+"""Seeded synthetic hospital data for benchmarks and load tests.
+
+generate() fills users, doctors, patients, appointments and treatments in
+proportion to the requested number of appointments (1k .. 1M). The same
+seed always produces the same data, so benchmark runs are comparable.
+Rows are written with Core INSERTs in chunks; every synthetic account
+shares one password (SYNTHETIC_PASSWORD) so it is hashed only once.
+"""
+import random
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from app.app_init import db
+from app.app_http_cache import mark_stale
+from app.app_passwords import password_hasher
+from app.app_models import User, Doctor, Patient, Appointment, Treatment, Department, name_columns
+from app.app_doctor_patients import record_visits
+from app.app_reports import count_appointments
+
+
+SYNTHETIC_PASSWORD = 'synthetic123'
+EMAIL_DOMAIN = 'synthetic.example.com'
+CHUNK_SIZE = 5000
+
+# Appointments are spread over this window around today
+HISTORY_DAYS = 365
+FUTURE_DAYS = 30
+SLOTS_PER_DAY = 16  # 09:00 .. 16:30 every 30 minutes
+
+APPOINTMENTS_PER_DOCTOR = 200
+APPOINTMENTS_PER_PATIENT = 10
+
+FIRST_NAMES = ['Aarav', 'Maya', 'Rohan', 'Priya', 'Liam', 'Olivia', 'Noah', 'Emma', 'Arjun', 'Sara',
+               'Vikram', 'Ananya', 'Lucas', 'Mia', 'Kabir', 'Zoe', 'Ethan', 'Isha', 'Omar', 'Chloe']
+LAST_NAMES = ['Sharma', 'Patel', 'Smith', 'Johnson', 'Khan', 'Garcia', 'Brown', 'Singh', 'Lee', 'Wilson',
+              'Gupta', 'Martin', 'Reddy', 'Lopez', 'Iyer', 'Clark', 'Das', 'Walker', 'Nair', 'Young']
+SPECIALIZATIONS = {
+    'Cardiology': 'cardiologist', 'Neurology': 'neurologist', 'Orthopedics': 'orthopedic surgeon',
+    'Pediatrics': 'pediatrician', 'Dermatology': 'dermatologist', 'General Medicine': 'general physician',
+    'Psychiatry': 'psychiatrist',
+}
+REASONS = ['Routine checkup and follow-up', 'Persistent headache for a week', 'Chest pain during exercise',
+           'Skin rash on both arms', 'Knee pain after a fall', 'Fever and sore throat since Monday',
+           'Trouble sleeping and anxiety', 'Child vaccination schedule review']
+DIAGNOSES = ['Hypertension', 'Migraine', 'Hairline fracture', 'Contact dermatitis', 'Influenza',
+             'Asthma', 'Generalised anxiety', 'Seasonal allergy']
+PRESCRIPTIONS = ['Amlodipine 5mg once daily', 'Ibuprofen 400mg as needed', 'Paracetamol 500mg twice daily',
+                 'Cetirizine 10mg at night', 'Salbutamol inhaler as needed', 'Sertraline 50mg once daily']
+
+
+class SyntheticDataError(Exception):
+    """The target database already holds synthetic rows for this seed"""
+
+
+def plan(appointments):
+    """Row counts generate() will produce for a given number of appointments"""
+    doctors = max(5, appointments // APPOINTMENTS_PER_DOCTOR)
+    patients = max(20, appointments // APPOINTMENTS_PER_PATIENT)
+    return {'appointments': appointments, 'doctors': doctors, 'patients': patients}
+
+
+def synthetic_email(role, number, seed):
+    return f'{role}{number}.s{seed}@{EMAIL_DOMAIN}'
+
+
+def _next_id(model):
+    return (db.session.query(db.func.max(model.id)).scalar() or 0) + 1
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), CHUNK_SIZE):
+        db.session.execute(db.insert(model), rows[start:start + CHUNK_SIZE])
+
+
+def _sync_sequences(*models):
+    # Explicit ids leave Postgres serial sequences behind the data
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for model in models:
+        table = model.__tablename__
+        db.session.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 1) FROM \"{table}\"))"
+        ))
+
+
+def _insert_appointments(batch, treatments):
+    _insert(Appointment, batch)
+    _insert(Treatment, treatments)
+    record_visits(db.session.connection(), [(a['doctor_id'], a['patient_id'], a['date']) for a in batch])
+    count_appointments(db.session.connection(), [(a['date'], a['doctor_id'], a['status']) for a in batch])
+    mark_stale(db.session, *{f"patient:{a['patient_id']}" for a in batch})
+
+
+def _slot(index):
+    return dt_time(9 + index // 2, 30 * (index % 2))
+
+
+def _people(rnd, role, count, seed, first_user_id, password, now):
+    users = []
+    for n in range(count):
+        users.append({
+            'id': first_user_id + n, 'name': f'{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}',
+            'email': synthetic_email(role, n, seed), 'password': password, 'role': role, 'created_at': now,
+        })
+    return users
+
+
+def generate(appointments=1000, seed=42, progress=None):
+    """Insert a synthetic hospital sized for the given appointment count; returns row counts"""
+    from app.app_availability import availability_index
+    from app.app_stats import invalidate_dashboard_stats
+
+    if db.session.query(User.id).filter_by(email=synthetic_email('doctor', 0, seed)).first():
+        raise SyntheticDataError(f'synthetic data for seed {seed} is already loaded')
+
+    counts = plan(appointments)
+    rnd = random.Random(seed)
+    now = datetime.utcnow()
+    today = date.today()
+    started = time.perf_counter()
+
+    def report(step):
+        if progress:
+            progress(f'{step} ({time.perf_counter() - started:.1f}s)')
+
+    password = password_hasher.hash(SYNTHETIC_PASSWORD)
+    departments = {name: id for id, name in db.session.query(Department.id, Department.name)}
+    department_names = sorted(SPECIALIZATIONS)
+
+    user_id = _next_id(User)
+    doctor_users = _people(rnd, 'doctor', counts['doctors'], seed, user_id, password, now)
+    patient_users = _people(rnd, 'patient', counts['patients'], seed, user_id + counts['doctors'], password, now)
+    _insert(User, doctor_users + patient_users)
+
+    doctor_id = _next_id(Doctor)
+    doctor_rows = []
+    for n, user in enumerate(doctor_users):
+        department = department_names[n % len(department_names)]
+        doctor_rows.append({
+            'id': doctor_id + n, 'user_id': user['id'], **name_columns(user['name']), 'department_id': departments.get(department),
+            'specialization': SPECIALIZATIONS[department], 'license_number': f'SYN-{seed}-{n:07d}',
+            'phone': f'9{rnd.randrange(10 ** 9):09d}', 'created_at': now,
+        })
+    _insert(Doctor, doctor_rows)
+
+    patient_id = _next_id(Patient)
+    patient_rows = []
+    for n, user in enumerate(patient_users):
+        patient_rows.append({
+            'id': patient_id + n, 'user_id': user['id'], **name_columns(user['name']), 'age': rnd.randint(1, 90),
+            'gender': rnd.choice(['Male', 'Female', 'Other']), 'phone': f'8{rnd.randrange(10 ** 9):09d}',
+            'address': f'{rnd.randint(1, 999)} Synthetic Street', 'created_at': now,
+        })
+    _insert(Patient, patient_rows)
+    mark_stale(db.session, 'doctors', 'patients')
+    db.session.commit()
+    report(f"{counts['doctors']} doctors and {counts['patients']} patients")
+
+    # Each doctor gets distinct (day, slot) pairs so the live-slot index never rejects a row
+    window = HISTORY_DAYS + FUTURE_DAYS
+    per_doctor, extra = divmod(appointments, counts['doctors'])
+    appointment_id = _next_id(Appointment)
+    treatment_id = first_treatment_id = _next_id(Treatment)
+    batch, treatments, inserted = [], [], 0
+    for n, doctor in enumerate(doctor_rows):
+        wanted = per_doctor + (1 if n < extra else 0)
+        for position in rnd.sample(range(window * SLOTS_PER_DAY), min(wanted, window * SLOTS_PER_DAY)):
+            day = today + timedelta(days=position // SLOTS_PER_DAY - HISTORY_DAYS)
+            if day < today:
+                status = rnd.choices(['Completed', 'Cancelled', 'Booked'], weights=[80, 12, 8])[0]
+            else:
+                status = rnd.choices(['Booked', 'Cancelled'], weights=[92, 8])[0]
+            patient = rnd.choice(patient_rows)['id']
+            batch.append({
+                'id': appointment_id, 'patient_id': patient, 'doctor_id': doctor['id'], 'date': day,
+                'time': _slot(position % SLOTS_PER_DAY), 'reason': rnd.choice(REASONS), 'status': status,
+                'created_at': now, 'updated_at': now,
+            })
+            if status == 'Completed':
+                treatments.append({
+                    'id': treatment_id, 'appointment_id': appointment_id, 'patient_id': patient,
+                    'doctor_id': doctor['id'], 'diagnosis': rnd.choice(DIAGNOSES),
+                    'prescription': rnd.choice(PRESCRIPTIONS), 'notes': 'Synthetic record', 'created_at': now,
+                })
+                treatment_id += 1
+            appointment_id += 1
+            if len(batch) >= CHUNK_SIZE:
+                _insert_appointments(batch, treatments)
+                db.session.commit()
+                inserted += len(batch)
+                batch, treatments = [], []
+                report(f'{inserted} appointments')
+    _insert_appointments(batch, treatments)
+    inserted += len(batch)
+    _sync_sequences(User, Doctor, Patient, Appointment, Treatment)
+    db.session.commit()
+    report(f'{inserted} appointments')
+
+    # Core inserts bypass the ORM session events that keep these fresh
+    invalidate_dashboard_stats()
+    availability_index.invalidate()
+    counts['appointments'] = inserted
+    counts['treatments'] = treatment_id - first_treatment_id
+    return counts
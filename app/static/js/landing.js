@@ -0,0 +1,33 @@
+// Smooth scroll to about section
+function scrollToAbout() {
+    const aboutSection = document.getElementById('aboutSection');
+    aboutSection.classList.add('show');
+    window.scrollTo({
+        top: document.body.scrollHeight,
+        behavior: 'smooth'
+    });
+}
+
+// Scroll back to top
+function scrollToTop() {
+    window.scrollTo({
+        top: 0,
+        behavior: 'smooth'
+    });
+    document.getElementById('aboutSection').classList.remove('show');
+}
+
+// Trigger animations on page load
+window.addEventListener('load', () => {
+    const landingContent = document.querySelector('.landing-content');
+    landingContent.style.opacity = '1';
+});
+
+// Auto-play animations
+document.addEventListener('DOMContentLoaded', () => {
+    // Add initial animation triggers
+    const cards = document.querySelectorAll('.feature-card');
+    cards.forEach((card, index) => {
+        card.style.animationDelay = `${0.6 + (index * 0.2)}s`;
+    });
+});
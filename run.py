@@ -3,6 +3,12 @@ from app.app_init import create_app
 
 app = create_app()
 
+# Background job threads (JOB_WORKERS=0 when a separate `scripts/jobs.py work` runs them).
+# Not in the password hashing forkserver, which imports this file as __mp_main__
+if app.config['JOB_WORKERS'] and __name__ != '__mp_main__':
+    from app.app_jobs import job_worker
+    job_worker.start(app)
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port)
@@ -0,0 +1,452 @@
+"""Load-test the main routes against a seeded synthetic hospital
+
+Usage:
+    python scripts/bench_routes.py seed --appointments 100000
+    python scripts/bench_routes.py run --scenario mixed --requests 2000 --concurrency 4
+    python scripts/bench_routes.py run --scenario doctor --save baselines/doctor.json
+    python scripts/bench_routes.py run --scenario doctor --compare baselines/doctor.json
+    python scripts/bench_routes.py run --url http://127.0.0.1:8000 --scenario patient
+
+`run` drives the Flask test client in-process by default. With --url it
+sends real HTTP requests to a server you started yourself, e.g.
+
+    APP_PROFILE=benchmark gunicorn -w 4 run:app
+
+which must use the same DATABASE_URL as this script (both default to the
+instance SQLite file). Without --url and without DATABASE_URL the test
+client runs against a throwaway SQLite database seeded on the fly.
+
+Each virtual user logs in as a synthetic admin/doctor/patient account and
+walks a weighted mix of that role's pages; the patient mix includes
+looking up free slots and booking one. The report gives p50/p95/p99
+latency, requests/sec and SQL queries per request (from the X-Query-Count
+header, so servers need the benchmark profile or SQL_PROFILING=1). --save writes the report as a
+JSON baseline, --compare diffs a run against one and exits non-zero when
+p95 latency or queries per request regress past --tolerance.
+"""
+import argparse
+import http.cookiejar
+import json
+import logging
+import math
+import os
+import platform
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+ADMIN_EMAIL = 'admin@hospital.com'
+ADMIN_PASSWORD = 'admin@123'
+SAMPLE_ACCOUNTS = 200
+MIN_COMPARE_SAMPLES = 20  # fewer samples than this are too noisy to call a regression
+
+# (weight, action name) per role; actions are the methods of Actor below
+SCENARIOS = {
+    'admin': [(40, 'admin_dashboard'), (20, 'admin_doctors'), (15, 'admin_patients'),
+              (15, 'admin_appointments'), (10, 'admin_doctor_patients')],
+    'doctor': [(50, 'doctor_dashboard'), (20, 'doctor_appointments'), (20, 'doctor_patients'),
+               (10, 'doctor_patient_history')],
+    'patient': [(30, 'patient_dashboard'), (20, 'patient_appointments'), (15, 'medical_history'),
+                (20, 'availability'), (15, 'book')],
+}
+MIXED_ROLES = [(10, 'admin'), (30, 'doctor'), (60, 'patient')]
+
+CSRF_TOKEN = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+
+
+class Response:
+    def __init__(self, status, body, headers):
+        self.status = status
+        self.body = body
+        self.headers = headers
+
+
+class ClientTransport:
+    """In-process requests through the Flask test client"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self.client.open(path, method=method, data=data)
+        return Response(response.status_code, response.get_data(as_text=True), response.headers)
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpTransport:
+    """Real HTTP requests against a running server, with a cookie jar per user"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect)
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        req = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with self.opener.open(req, timeout=60) as response:
+                return Response(response.status, response.read().decode('utf-8', 'replace'), response.headers)
+        except urllib.error.HTTPError as exc:
+            return Response(exc.code, exc.read().decode('utf-8', 'replace'), exc.headers)
+
+
+class Recorder:
+    """Thread-safe list of (label, status, ms, queries) samples"""
+
+    def __init__(self):
+        self.samples = []
+        self.lock = threading.Lock()
+        self.enabled = True
+
+    def add(self, label, status, ms, queries):
+        if self.enabled:
+            with self.lock:
+                self.samples.append((label, status, ms, queries))
+
+
+class Actor:
+    """One logged-in virtual user of a given role"""
+
+    def __init__(self, transport, recorder, role, email, password, fixtures, rnd):
+        self.transport = transport
+        self.recorder = recorder
+        self.role = role
+        self.fixtures = fixtures
+        self.rnd = rnd
+        page = self.call('GET', '/login', label='GET /login')
+        response = self.call('POST', '/login', label='POST /login', data={
+            'email': email, 'password': password, 'csrf_token': csrf_token(page.body)})
+        if response.status != 302:
+            raise SystemExit(f'Login as {email} failed (HTTP {response.status})')
+
+    def call(self, method, path, label, data=None):
+        start = time.perf_counter()
+        try:
+            response = self.transport.request(method, path, data)
+        except Exception as exc:  # connection errors count as failures, not crashes
+            response = Response(599, str(exc), {})
+        ms = (time.perf_counter() - start) * 1000
+        queries = response.headers.get('X-Query-Count')
+        self.recorder.add(label, response.status, ms, int(queries) if queries else None)
+        return response
+
+    def get(self, path, label=None):
+        return self.call('GET', path, label or f'GET {path}')
+
+    def act(self, name):
+        getattr(self, name)()
+
+    # Admin
+    def admin_dashboard(self):
+        self.get('/admin/dashboard')
+
+    def admin_doctors(self):
+        self.get('/admin/doctors')
+
+    def admin_patients(self):
+        self.get('/admin/patients')
+
+    def admin_appointments(self):
+        self.get('/admin/appointments')
+
+    def admin_doctor_patients(self):
+        doctor_id = self.rnd.choice(self.fixtures['doctor_ids'])
+        self.get(f'/admin/doctor/{doctor_id}/patients', 'GET /admin/doctor/<id>/patients')
+
+    # Doctor
+    def doctor_dashboard(self):
+        self.get('/doctor/dashboard')
+
+    def doctor_appointments(self):
+        self.get('/doctor/appointments')
+
+    def doctor_patients(self):
+        self.get('/doctor/patients')
+
+    def doctor_patient_history(self):
+        patient_id = self.rnd.choice(self.fixtures['patient_ids'])
+        self.get(f'/doctor/patient/{patient_id}/history', 'GET /doctor/patient/<id>/history')
+
+    # Patient
+    def patient_dashboard(self):
+        self.get('/patient/dashboard')
+
+    def patient_appointments(self):
+        self.get('/patient/appointments')
+
+    def medical_history(self):
+        self.get('/patient/medical-history')
+
+    def availability(self):
+        doctor_id = self.rnd.choice(self.fixtures['doctor_ids'])
+        return self.get(f'/doctor/{doctor_id}/availability', 'GET /doctor/<id>/availability'), doctor_id
+
+    def book(self):
+        response, doctor_id = self.availability()
+        try:
+            slots = json.loads(response.body)['slots']
+        except (ValueError, KeyError):
+            return
+        free = [(day, slot) for day, times in sorted(slots.items()) for slot in times
+                if day > date.today().isoformat()]
+        if not free:
+            return
+        day, slot = self.rnd.choice(free[:10])
+        page = self.get('/patient/book-appointment')
+        self.call('POST', '/patient/book-appointment', 'POST /patient/book-appointment', data={
+            'doctor_id': doctor_id, 'date': day, 'time': slot,
+            'reason': 'Synthetic load test booking', 'csrf_token': csrf_token(page.body)})
+
+
+def csrf_token(html):
+    match = CSRF_TOKEN.search(html or '')
+    return match.group(1) if match else ''
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[rank - 1]
+
+
+def summarize(samples):
+    latencies = sorted(ms for _, _, ms, _ in samples)
+    queries = [q for _, _, _, q in samples if q is not None]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for _, status, _, _ in samples if status >= 500),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'mean_queries': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def build_report(samples, elapsed, meta):
+    labels = sorted({label for label, _, _, _ in samples})
+    overall = summarize(samples)
+    overall['rps'] = round(len(samples) / elapsed, 1) if elapsed else 0.0
+    return {
+        'meta': meta,
+        'overall': overall,
+        'routes': {label: summarize([s for s in samples if s[0] == label]) for label in labels},
+    }
+
+
+def print_report(report):
+    print(f"\n{'route':40s} {'n':>6s} {'err':>4s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'q/req':>6s}")
+    rows = list(report['routes'].items()) + [('TOTAL', report['overall'])]
+    for label, stats in rows:
+        queries = '-' if stats['mean_queries'] is None else f"{stats['mean_queries']:.1f}"
+        print(f"{label:40s} {stats['requests']:6d} {stats['errors']:4d} {stats['p50_ms']:8.2f} "
+              f"{stats['p95_ms']:8.2f} {stats['p99_ms']:8.2f} {queries:>6s}")
+    print(f"\n{report['overall']['rps']:.1f} requests/s over {report['overall']['requests']} requests")
+
+
+def compare(report, baseline, tolerance):
+    """Print deltas against a baseline report; returns the regressed routes"""
+    regressions = []
+    print(f"\n{'route':40s} {'p95 base':>9s} {'p95 now':>9s} {'delta':>7s} {'q base':>7s} {'q now':>7s}")
+    for label, now in report['routes'].items():
+        base = baseline['routes'].get(label)
+        if not base or min(base['requests'], now['requests']) < MIN_COMPARE_SAMPLES:
+            continue
+        delta = (now['p95_ms'] - base['p95_ms']) / base['p95_ms'] if base['p95_ms'] else 0.0
+        more_queries = (now['mean_queries'] is not None and base['mean_queries'] is not None
+                        and now['mean_queries'] > base['mean_queries'] * (1 + tolerance))
+        flag = ''
+        if delta > tolerance or more_queries:
+            regressions.append(label)
+            flag = '  REGRESSION'
+        print(f"{label:40s} {base['p95_ms']:9.2f} {now['p95_ms']:9.2f} {delta:+7.0%} "
+              f"{str(base['mean_queries']):>7s} {str(now['mean_queries']):>7s}{flag}")
+    return regressions
+
+
+def make_app(database_url):
+    # The benchmark profile turns on the profiler's X-Query-Count header
+    profiling_log = logging.getLogger('hms.profiling')
+    profiling_log.addHandler(logging.NullHandler())
+    profiling_log.propagate = False
+
+    from app.app_init import create_app
+    if database_url:
+        return create_app('benchmark', DATABASE_URL=database_url)
+    return create_app('benchmark')
+
+
+def seed(app, appointments, seed_value):
+    from app.app_synthetic import generate, plan, SyntheticDataError
+    from app.app_init import db
+    with app.app_context():
+        try:
+            counts = generate(appointments, seed_value, progress=lambda step: print(f'  {step}', flush=True))
+        except SyntheticDataError as exc:
+            print(f'Reusing existing data: {exc}')
+            return plan(appointments)
+        finally:
+            db.session.remove()
+    print(f"Seeded {counts['doctors']} doctors, {counts['patients']} patients, "
+          f"{counts['appointments']} appointments, {counts['treatments']} treatments")
+    return counts
+
+
+def load_fixtures(app, seed_value):
+    """Sample synthetic accounts and ids the virtual users pick from"""
+    from app.app_synthetic import EMAIL_DOMAIN, SYNTHETIC_PASSWORD
+    from app.app_models import User, Doctor, Patient
+    from app.app_init import db
+    suffix = f'%.s{seed_value}@{EMAIL_DOMAIN}'
+    with app.app_context():
+        doctors = db.session.query(User.email, Doctor.id).join(Doctor.user) \
+            .filter(User.email.like(suffix)).order_by(Doctor.id).limit(SAMPLE_ACCOUNTS).all()
+        patients = db.session.query(User.email, Patient.id).join(Patient.user) \
+            .filter(User.email.like(suffix)).order_by(Patient.id).limit(SAMPLE_ACCOUNTS).all()
+        db.session.remove()
+    if not doctors or not patients:
+        raise SystemExit(f'No synthetic data for seed {seed_value}; run the seed command first.')
+    return {
+        'password': SYNTHETIC_PASSWORD,
+        'doctor_emails': [email for email, _ in doctors], 'doctor_ids': [id for _, id in doctors],
+        'patient_emails': [email for email, _ in patients], 'patient_ids': [id for _, id in patients],
+    }
+
+
+def run_worker(worker, count, args, app, fixtures, recorder):
+    rnd = random.Random(args.seed * 1000 + worker)
+    actors = {}
+
+    def actor_for(role):
+        if role not in actors:
+            transport = HttpTransport(args.url) if args.url else ClientTransport(app)
+            if role == 'admin':
+                email, password = args.admin_email, args.admin_password
+            else:
+                email, password = rnd.choice(fixtures[f'{role}_emails']), fixtures['password']
+            actors[role] = Actor(transport, recorder, role, email, password, fixtures, rnd)
+        return actors[role]
+
+    for _ in range(count):
+        if args.scenario == 'mixed':
+            role = rnd.choices([r for _, r in MIXED_ROLES], weights=[w for w, _ in MIXED_ROLES])[0]
+        else:
+            role = args.scenario
+        weights, actions = zip(*SCENARIOS[role])
+        actor_for(role).act(rnd.choices(actions, weights=weights)[0])
+
+
+def run_load(args, app, fixtures, recorder, total):
+    per_worker, extra = divmod(total, args.concurrency)
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [pool.submit(run_worker, w, per_worker + (1 if w < extra else 0), args, app, fixtures, recorder)
+                   for w in range(args.concurrency)]
+        for future in futures:
+            future.result()
+
+
+def cmd_seed(args):
+    app = make_app(args.database_url)
+    seed(app, args.appointments, args.seed)
+
+
+def cmd_run(args):
+    tmp = None
+    database_url = args.database_url
+    if not args.url and not database_url:
+        tmp = tempfile.TemporaryDirectory()
+        database_url = f"sqlite:///{os.path.join(tmp.name, 'bench.db')}"
+    app = make_app(database_url)
+    if tmp is not None:
+        seed(app, args.appointments, args.seed)
+    fixtures = load_fixtures(app, args.seed)
+
+    recorder = Recorder()
+    if args.warmup:
+        recorder.enabled = False
+        run_load(args, app, fixtures, recorder, args.warmup)
+        recorder.enabled = True
+    start = time.perf_counter()
+    run_load(args, app, fixtures, recorder, args.requests)
+    elapsed = time.perf_counter() - start
+
+    # Logins are setup cost, not part of the measured mix
+    samples = [s for s in recorder.samples if not s[0].endswith(' /login')]
+    report = build_report(samples, elapsed, {
+        'scenario': args.scenario, 'actions': args.requests, 'concurrency': args.concurrency,
+        'target': args.url or 'test-client', 'appointments': args.appointments, 'seed': args.seed,
+        'python': platform.python_version(), 'recorded_at': datetime.utcnow().isoformat(timespec='seconds'),
+    })
+    print_report(report)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as handle:
+            json.dump(report, handle, indent=2)
+        print(f'Baseline written to {args.save}')
+
+    status = 0
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} route(s) regressed by more than {args.tolerance:.0%}")
+            status = 1
+    if tmp is not None:
+        tmp.cleanup()
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest='cmd')
+
+    for name in ('seed', 'run'):
+        p = sub.add_parser(name)
+        p.add_argument('--appointments', type=int, default=10000, help='synthetic data scale')
+        p.add_argument('--seed', type=int, default=42)
+        p.add_argument('--database-url', default=os.environ.get('DATABASE_URL'))
+
+    run = sub.choices['run']
+    run.add_argument('--scenario', choices=sorted(SCENARIOS) + ['mixed'], default='mixed')
+    run.add_argument('--requests', type=int, default=500, help='user actions to perform')
+    run.add_argument('--warmup', type=int, default=20, help='unrecorded actions run first')
+    run.add_argument('--concurrency', type=int, default=1)
+    run.add_argument('--url', help='benchmark a running server instead of the test client')
+    run.add_argument('--admin-email', default=ADMIN_EMAIL)
+    run.add_argument('--admin-password', default=ADMIN_PASSWORD)
+    run.add_argument('--save', help='write the report as a JSON baseline')
+    run.add_argument('--compare', help='baseline JSON to compare against')
+    run.add_argument('--tolerance', type=float, default=0.2, help='allowed regression (0.2 = 20%%)')
+
+    args = parser.parse_args()
+    if args.cmd == 'seed':
+        cmd_seed(args)
+    elif args.cmd == 'run':
+        sys.exit(cmd_run(args))
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Compare FTS5 search latency against the old ILIKE scan
+
+Usage:
+    python scripts/bench_search.py --rows 100000 --runs 50
+
+Builds a throwaway SQLite database with the app schema, fills it with
+synthetic patients and treatments, installs the search tables and times
+the same lookups through both paths.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from sqlalchemy import create_engine, text
+
+from app.app_init import db
+import app.app_models  # noqa: F401  (registers the tables on db.metadata)
+from app.app_search import install
+
+FIRST = ['Aarav', 'Maya', 'Rohan', 'Priya', 'Liam', 'Olivia', 'Noah', 'Emma', 'Arjun', 'Sara']
+LAST = ['Sharma', 'Patel', 'Smith', 'Johnson', 'Khan', 'Garcia', 'Brown', 'Singh', 'Lee', 'Wilson']
+DIAGNOSES = ['hypertension', 'migraine', 'fracture', 'dermatitis', 'influenza', 'asthma', 'anxiety']
+DRUGS = ['amlodipine', 'ibuprofen', 'paracetamol', 'cetirizine', 'salbutamol', 'sertraline']
+
+QUERIES = {
+    'patient name': (
+        "SELECT patient.id FROM patient JOIN user ON user.id = patient.user_id "
+        "WHERE lower(user.name) LIKE lower(:like) LIMIT 50",
+        "SELECT rowid FROM patient_fts WHERE patient_fts MATCH :match "
+        "ORDER BY bm25(patient_fts) LIMIT 50",
+        'Wilson', '{name} : ("wils"*)',
+    ),
+    'rare name': (
+        "SELECT patient.id FROM patient JOIN user ON user.id = patient.user_id "
+        "WHERE lower(user.name) LIKE lower(:like) LIMIT 50",
+        "SELECT rowid FROM patient_fts WHERE patient_fts MATCH :match "
+        "ORDER BY bm25(patient_fts) LIMIT 50",
+        'Lee 7777', '{name} : ("lee"* "7777"*)',
+    ),
+    'diagnosis': (
+        "SELECT id FROM treatment WHERE lower(diagnosis) LIKE lower(:like) "
+        "OR lower(prescription) LIKE lower(:like) LIMIT 50",
+        "SELECT rowid FROM treatment_fts WHERE treatment_fts MATCH :match "
+        "ORDER BY bm25(treatment_fts) LIMIT 50",
+        'migraine', '"migr"*',
+    ),
+}
+
+
+def populate(engine, rows):
+    rnd = random.Random(42)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO user (id, name, email, password, role) VALUES (1, 'Dr Bench', 'dr@b', 'x', 'doctor')"))
+        conn.execute(text("INSERT INTO doctor (id, user_id, specialization) VALUES (1, 1, 'general')"))
+        users, patients, appointments, treatments = [], [], [], []
+        for i in range(rows):
+            uid = i + 2
+            users.append({'id': uid, 'name': f'{rnd.choice(FIRST)} {rnd.choice(LAST)} {i}',
+                          'email': f'p{i}@bench.test', 'password': 'x', 'role': 'patient'})
+            patients.append({'id': i + 1, 'user_id': uid})
+            appointments.append({'id': i + 1, 'patient_id': i + 1, 'doctor_id': 1,
+                                 'date': (date(2020, 1, 1) + timedelta(days=i // 16)).isoformat(),
+                                 'time': f'{9 + i % 16 // 2:02d}:{30 * (i % 2):02d}:00.000000'})
+            treatments.append({'id': i + 1, 'appointment_id': i + 1, 'patient_id': i + 1, 'doctor_id': 1,
+                               'diagnosis': f'{rnd.choice(DIAGNOSES)} follow-up',
+                               'prescription': f'{rnd.choice(DRUGS)} 10mg daily'})
+        conn.execute(text("INSERT INTO user (id, name, email, password, role) "
+                          "VALUES (:id, :name, :email, :password, :role)"), users)
+        conn.execute(text("INSERT INTO patient (id, user_id) VALUES (:id, :user_id)"), patients)
+        conn.execute(text("INSERT INTO appointment (id, patient_id, doctor_id, date, time, status) "
+                          "VALUES (:id, :patient_id, :doctor_id, :date, :time, 'Completed')"), appointments)
+        conn.execute(text("INSERT INTO treatment (id, appointment_id, patient_id, doctor_id, diagnosis, prescription) "
+                          "VALUES (:id, :appointment_id, :patient_id, :doctor_id, :diagnosis, :prescription)"), treatments)
+
+
+def timed(conn, sql, params, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        conn.execute(text(sql), params).fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--runs', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        db.metadata.create_all(engine)
+        start = time.perf_counter()
+        populate(engine, args.rows)
+        with engine.begin() as conn:
+            install(conn)
+        print(f'Loaded {args.rows} patients/treatments and built FTS tables in '
+              f'{time.perf_counter() - start:.1f}s')
+
+        with engine.connect() as conn:
+            for label, (like_sql, fts_sql, term, match) in QUERIES.items():
+                like_med, like_max = timed(conn, like_sql, {'like': f'%{term}%'}, args.runs)
+                fts_med, fts_max = timed(conn, fts_sql, {'match': match}, args.runs)
+                print(f'{label:13s} ilike p50 {like_med:7.2f} ms (max {like_max:7.2f}) | '
+                      f'fts5 p50 {fts_med:6.2f} ms (max {fts_max:6.2f}) | '
+                      f'{like_med / fts_med if fts_med else float("inf"):5.1f}x')
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Measure worker start-up time and check concurrent first-run bootstrap
+
+Usage:
+    python scripts/bench_startup.py --runs 5
+    python scripts/bench_startup.py --runs 5 --max-ms 1500
+    python scripts/bench_startup.py --workers 8
+
+Every run is a fresh Python process, like a new gunicorn worker: it times
+importing the app, create_app(), the first app context (where the lazy
+bootstrap check runs) and the first request. The runs use a throwaway
+SQLite database that is bootstrapped once beforehand, so they measure a
+warm database. --max-ms exits non-zero when the median import +
+create_app time is over the limit, for use in CI.
+
+--workers starts that many processes at the same instant against an
+empty database and checks that the bootstrap lock let exactly one of them
+create the tables and seed data.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+
+CHILD = '''
+import json, sys, time
+start_at = float(sys.argv[1])
+while time.time() < start_at:
+    time.sleep(0.001)
+t0 = time.perf_counter()
+sys.path.insert(0, {root!r})
+from app.app_init import create_app
+t1 = time.perf_counter()
+app = create_app()
+t2 = time.perf_counter()
+with app.app_context():
+    pass
+t3 = time.perf_counter()
+status = app.test_client().get('/').status_code
+t4 = time.perf_counter()
+print(json.dumps({{'import_ms': (t1 - t0) * 1000, 'create_app_ms': (t2 - t1) * 1000,
+                  'first_context_ms': (t3 - t2) * 1000, 'first_request_ms': (t4 - t3) * 1000,
+                  'status': status}}))
+'''
+
+
+def spawn(count, database_path):
+    """Start count child processes together; returns their timing dicts"""
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database_path}', AUTO_BOOTSTRAP='1')
+    code = CHILD.format(root=PROJECT_ROOT)
+    start_at = time.time() + 0.5 + 0.05 * count
+    children = [subprocess.Popen([sys.executable, '-c', code, str(start_at)], env=env,
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                for _ in range(count)]
+    results = []
+    for child in children:
+        out, err = child.communicate()
+        if child.returncode:
+            results.append({'error': err.strip().splitlines()[-1] if err.strip() else f'exit {child.returncode}'})
+            continue
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    return results
+
+
+def check_seeded(database_path):
+    conn = sqlite3.connect(database_path)
+    try:
+        return {
+            'schema_version': conn.execute('SELECT max(version) FROM schema_version').fetchone()[0],
+            'admins': conn.execute("SELECT count(*) FROM user WHERE role = 'admin'").fetchone()[0],
+            'departments': conn.execute('SELECT count(*) FROM department').fetchone()[0],
+        }
+    finally:
+        conn.close()
+
+
+def measure(runs, max_ms):
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, 'hms.db')
+        first = spawn(1, database_path)[0]
+        if 'error' in first:
+            print(f'bootstrap failed: {first["error"]}')
+            return 1
+        print(f"first boot (empty database): {first['first_context_ms']:.0f} ms bootstrap")
+
+        samples = [spawn(1, database_path)[0] for _ in range(runs)]
+        errors = [s['error'] for s in samples if 'error' in s]
+        if errors:
+            print(f'{len(errors)} run(s) failed: {errors[0]}')
+            return 1
+        for key in ('import_ms', 'create_app_ms', 'first_context_ms', 'first_request_ms'):
+            values = [s[key] for s in samples]
+            print(f'{key:18s} median {statistics.median(values):8.1f}  max {max(values):8.1f}')
+        startup = statistics.median(s['import_ms'] + s['create_app_ms'] for s in samples)
+        print(f'{"startup":18s} median {startup:8.1f} ms (import + create_app)')
+        if max_ms is not None and startup > max_ms:
+            print(f'REGRESSION: start-up {startup:.0f} ms is over the {max_ms:.0f} ms limit')
+            return 1
+    return 0
+
+
+def race(workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, 'hms.db')
+        results = spawn(workers, database_path)
+        errors = [r['error'] for r in results if 'error' in r]
+        seeded = check_seeded(database_path)
+        ok = not errors and seeded['admins'] == 1 and seeded['departments'] > 0
+        slowest = max((r['first_context_ms'] for r in results if 'error' not in r), default=0)
+        print(f"{workers} workers on an empty database: {len(errors)} failed, {seeded}; "
+              f"slowest first context {slowest:.0f} ms")
+        for error in errors[:3]:
+            print(f' - {error}')
+        return 0 if ok else 1
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5, help='fresh processes to time')
+    parser.add_argument('--max-ms', type=float, help='fail when median import + create_app exceeds this')
+    parser.add_argument('--workers', type=int, help='concurrent cold starts against an empty database instead')
+    args = parser.parse_args()
+
+    sys.exit(race(args.workers) if args.workers else measure(args.runs, args.max_ms))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Bulk import/export CLI for HMS
+
+Usage:
+    python scripts/bulk_data.py import patients patients.csv
+    python scripts/bulk_data.py import doctors doctors.jsonl --workers 8
+    python scripts/bulk_data.py import appointments appointments.csv --chunk-size 5000
+    python scripts/bulk_data.py export patients patients.jsonl
+
+CSV columns / JSONL keys:
+    patients:     name, email, password, age, gender, phone, address, medical_history
+    doctors:      name, email, password, specialization, department, license_number, phone
+    appointments: patient_email, doctor_email, date (YYYY-MM-DD), time (HH:MM), reason, status
+
+Import patients and doctors before the appointments that reference them.
+Exports never include password hashes.
+"""
+import argparse
+import os
+import sys
+
+# Ensure project root is on sys.path so `from app...` imports work
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.app_init import create_app
+from app.app_bulk import import_file, export_file, DEFAULT_CHUNK_SIZE
+
+KINDS = ['patients', 'doctors', 'appointments']
+
+
+def run_import(kind, path, fmt, chunk_size, workers):
+    app = create_app()
+    with app.app_context():
+        def progress(report):
+            print(f'  {report.read} rows read, {report.inserted} inserted, '
+                  f'{report.skipped} skipped ({report.rate:.0f} rows/s)', flush=True)
+
+        report = import_file(kind, path, fmt=fmt, chunk_size=chunk_size,
+                             workers=workers, progress=progress)
+        print(f'Imported {report.inserted} {kind} from {report.read} rows in '
+              f'{report.elapsed:.1f}s ({report.rate:.0f} rows/s); {report.skipped} skipped.')
+        for line, message in report.errors:
+            print(f' - line {line}: {message}')
+        if report.skipped > len(report.errors):
+            print(f' ... and {report.skipped - len(report.errors)} more')
+
+
+def run_export(kind, path, fmt, chunk_size):
+    app = create_app()
+    with app.app_context():
+        written = export_file(kind, path, fmt=fmt, chunk_size=chunk_size,
+                              progress=lambda n: print(f'  {n} rows written', flush=True))
+        print(f'Exported {written} {kind} to {path}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest='cmd')
+
+    for name in ('import', 'export'):
+        p = sub.add_parser(name)
+        p.add_argument('kind', choices=KINDS)
+        p.add_argument('path')
+        p.add_argument('--format', choices=['csv', 'jsonl'], help='default: from file extension')
+        p.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        if name == 'import':
+            p.add_argument('--workers', type=int, default=None,
+                           help='password hashing processes (default: CPU count)')
+
+    args = parser.parse_args()
+    if args.cmd == 'import':
+        run_import(args.kind, args.path, args.format, args.chunk_size, args.workers)
+    elif args.cmd == 'export':
+        run_export(args.kind, args.path, args.format, args.chunk_size)
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
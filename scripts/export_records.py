@@ -0,0 +1,54 @@
+"""Batch export of patient medical records for HMS
+
+Usage:
+    python scripts/export_records.py records/ --patient-id 3 --patient-id 7
+    python scripts/export_records.py records/ --all --format html
+    python scripts/export_records.py records/ --all --format csv --chunk-size 2000
+
+Writes one medical_record_<id>.<format> file per patient into the output
+directory, streaming each record so memory stays flat for long histories.
+"""
+import argparse
+import os
+import sys
+
+# Ensure project root is on sys.path so `from app...` imports work
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.app_init import create_app, db
+from app.app_models import Patient
+from app.app_records import FORMATS, CHUNK_SIZE, export_records
+
+
+def run_export(directory, patient_ids, fmt, chunk_size):
+    app = create_app()
+    with app.app_context():
+        if patient_ids is None:
+            # Soft-deleted patients are skipped; name them with --patient-id to export anyway
+            patient_ids = db.session.scalars(db.select(Patient.id).order_by(Patient.id)).all()
+
+        def progress(patient_id, path):
+            print(f'  patient {patient_id}: {path or "not found"}', flush=True)
+
+        written = export_records(patient_ids, directory, fmt, chunk_size=chunk_size, progress=progress)
+        print(f'Exported {written} of {len(patient_ids)} record(s) to {directory}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('directory', help='output directory (created if missing)')
+    which = parser.add_mutually_exclusive_group(required=True)
+    which.add_argument('--patient-id', type=int, action='append', dest='patient_ids')
+    which.add_argument('--all', action='store_true', help='every active patient')
+    parser.add_argument('--format', choices=sorted(FORMATS), default='json')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='treatments fetched per round trip')
+
+    args = parser.parse_args()
+    run_export(args.directory, None if args.all else args.patient_ids, args.format, args.chunk_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Background job CLI for HMS
+
+Usage:
+    python scripts/jobs.py work [--threads 2] [--once]
+    python scripts/jobs.py status [--window 3600]
+    python scripts/jobs.py enqueue delete_doctor --arg doctor_id=3
+    python scripts/jobs.py enqueue bulk_import --arg kind=patients --arg path=patients.csv
+    python scripts/jobs.py schedule-reminders
+    python scripts/jobs.py retry --id 42
+
+`work` runs a standalone worker against the same job table the web
+processes use; set JOB_WORKERS=0 for the web app when running it.
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+from datetime import datetime
+
+# Ensure project root is on sys.path so `from app...` imports work
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.app_init import create_app, db
+from app.app_models import Job
+from app.app_jobs import job_worker, enqueue, job_metrics, job_status, requeue_stale
+
+
+def work(threads, once):
+    app = create_app()
+    with app.app_context():
+        if once:
+            requeue_stale(app.config['JOB_STALE_SECONDS'])
+            total = 0
+            while True:
+                ran = job_worker.run_pending(app)
+                if not ran:
+                    break
+                total += ran
+            print(f'Ran {total} job(s). {json.dumps(job_worker.stats())}')
+            return
+
+    job_worker.start(app, threads=threads)
+    print(f'Worker {job_worker.name} running {threads} thread(s); Ctrl+C to stop.')
+    signal.signal(signal.SIGTERM, lambda *_: job_worker.stop(timeout=0))
+    try:
+        while job_worker.running():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        job_worker.stop()
+        print(json.dumps(job_worker.stats()))
+
+
+def status(window):
+    app = create_app()
+    with app.app_context():
+        print(json.dumps(job_metrics(window), indent=2))
+        for job in Job.query.filter(Job.status.in_(['running', 'failed'])).order_by(Job.id.desc()).limit(20):
+            print(f' - #{job.id} {job.kind} {job.status} attempts={job.attempts} {job.error or ""}')
+
+
+def _parse_args(pairs):
+    payload = {}
+    for pair in pairs or []:
+        key, _, value = pair.partition('=')
+        try:
+            payload[key] = json.loads(value)
+        except ValueError:
+            payload[key] = value
+    return payload
+
+
+def enqueue_job(kind, pairs):
+    app = create_app()
+    with app.app_context():
+        job = enqueue(kind, **_parse_args(pairs))
+        print(f'Queued job #{job.id} ({job.kind}).')
+
+
+def schedule_reminders():
+    app = create_app()
+    with app.app_context():
+        from app.app_jobs import schedule_reminders as scan
+        print(f"Queued {scan()['queued']} reminder(s).")
+
+
+def retry(job_id):
+    app = create_app()
+    with app.app_context():
+        job = db.session.get(Job, job_id)
+        if job is None:
+            print(f'No job #{job_id}')
+            return
+        job.status = 'queued'
+        job.attempts = 0
+        job.run_at = datetime.utcnow()
+        db.session.commit()
+        print(json.dumps(job_status(job), indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest='cmd')
+
+    p = sub.add_parser('work')
+    p.add_argument('--threads', type=int, default=2)
+    p.add_argument('--once', action='store_true', help='run due jobs, then exit')
+
+    p = sub.add_parser('status')
+    p.add_argument('--window', type=int, default=3600, help='seconds of history for throughput')
+
+    p = sub.add_parser('enqueue')
+    p.add_argument('kind')
+    p.add_argument('--arg', action='append', help='key=value payload entry (value parsed as JSON if possible)')
+
+    sub.add_parser('schedule-reminders')
+
+    p = sub.add_parser('retry')
+    p.add_argument('--id', type=int, required=True)
+
+    args = parser.parse_args()
+    if args.cmd == 'work':
+        work(args.threads, args.once)
+    elif args.cmd == 'status':
+        status(args.window)
+    elif args.cmd == 'enqueue':
+        enqueue_job(args.kind, args.arg)
+    elif args.cmd == 'schedule-reminders':
+        schedule_reminders()
+    elif args.cmd == 'retry':
+        retry(args.id)
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
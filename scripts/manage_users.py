@@ -1,14 +1,24 @@
 """User management CLI for HMS
 
 Usage:
+    python scripts/manage_users.py bootstrap
     python scripts/manage_users.py create-defaults
     python scripts/manage_users.py list-doctors
     python scripts/manage_users.py delete-doctor --email doctor@example.com
     python scripts/manage_users.py delete-all-doctors
+    python scripts/manage_users.py migrate
+    python scripts/manage_users.py backfill-doctor-patients [--email doctor@example.com]
+    python scripts/manage_users.py archive [--months 12]
+    python scripts/manage_users.py rebuild-rollups [--days 90]
+    python scripts/manage_users.py set-schedule --email doctor@example.com --days mon,tue --start 09:00 --end 13:00
+    python scripts/manage_users.py block-date --email doctor@example.com --date 2025-12-25
 
 This script uses the application factory to get a context and perform DB operations.
+`bootstrap` creates the tables, applies migrations and seeds the default
+admin and departments; run it once per deploy (then AUTO_BOOTSTRAP=0).
 """
 import argparse
+from datetime import datetime
 from getpass import getpass
 import os
 import sys
@@ -20,7 +30,9 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 from app.app_init import create_app, db
-from app.app_models import User, Doctor
+from app.app_models import User, Doctor, DoctorSchedule, ScheduleException
+
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
 
 
 def create_defaults():
@@ -77,13 +89,16 @@ def delete_doctor_by_email(email):
         if not user:
             print(f'No doctor found with email {email}')
             return
-        # delete doctor and related user
+        # soft delete: the doctor's appointments and treatments are kept
+        from app.app_soft_delete import soft_delete_doctor, cancel_future_bookings
+        from app.app_models import Appointment
         doctor = Doctor.query.filter_by(user_id=user.id).first()
-        if doctor:
-            db.session.delete(doctor)
-        db.session.delete(user)
-        db.session.commit()
-        print(f'Deleted doctor {user.name} <{user.email}>')
+        if not doctor:
+            print(f'No doctor profile for {email}')
+            return
+        soft_delete_doctor(doctor)
+        cancelled = cancel_future_bookings(Appointment.doctor_id, doctor.id)
+        print(f'Deleted doctor {user.name} <{email}>; cancelled {cancelled} upcoming appointment(s)')
 
 
 def delete_all_doctors(confirm=False):
@@ -98,20 +113,131 @@ def delete_all_doctors(confirm=False):
             if ans != 'YES':
                 print('Aborted.')
                 return
+        from app.app_soft_delete import soft_delete_doctor, cancel_future_bookings
+        from app.app_models import Appointment
         for d in doctors:
-            user = User.query.get(d.user_id)
-            if d:
-                db.session.delete(d)
-            if user:
-                db.session.delete(user)
-        db.session.commit()
+            soft_delete_doctor(d)
+            cancel_future_bookings(Appointment.doctor_id, d.id)
         print('All doctors deleted.')
 
 
+def _find_doctor(email):
+    user = User.query.filter_by(email=email, role='doctor').first()
+    if not user or not user.doctor:
+        print(f'No doctor found with email {email}')
+        return None
+    return user.doctor
+
+
+def set_schedule(email, days, start, end):
+    app = create_app()
+    with app.app_context():
+        doctor = _find_doctor(email)
+        if not doctor:
+            return
+        weekdays = [WEEKDAYS.index(d.strip().lower()[:3]) for d in days.split(',')]
+        start_time = datetime.strptime(start, '%H:%M').time()
+        end_time = datetime.strptime(end, '%H:%M').time()
+        # Replace the template for the given days
+        DoctorSchedule.query.filter(
+            DoctorSchedule.doctor_id == doctor.id,
+            DoctorSchedule.weekday.in_(weekdays)
+        ).delete(synchronize_session=False)
+        for weekday in weekdays:
+            db.session.add(DoctorSchedule(doctor_id=doctor.id, weekday=weekday,
+                                          start_time=start_time, end_time=end_time))
+        db.session.commit()
+        print(f'Schedule for {email}: {", ".join(WEEKDAYS[w] for w in weekdays)} {start}-{end}')
+
+
+def block_date(email, date, start=None, end=None, reason=None):
+    app = create_app()
+    with app.app_context():
+        doctor = _find_doctor(email)
+        if not doctor:
+            return
+        db.session.add(ScheduleException(
+            doctor_id=doctor.id,
+            date=datetime.strptime(date, '%Y-%m-%d').date(),
+            start_time=datetime.strptime(start, '%H:%M').time() if start else None,
+            end_time=datetime.strptime(end, '%H:%M').time() if end else None,
+            is_available=False,
+            reason=reason
+        ))
+        db.session.commit()
+        print(f'Blocked {date} {start or ""}-{end or ""} for {email}')
+
+
+def bootstrap():
+    app = create_app()
+    with app.app_context():
+        from app.app_bootstrap import bootstrap as run_bootstrap, latest_version
+        summary = run_bootstrap(app)
+        if summary['migrations']:
+            print(f'Applied migrations: {", ".join(map(str, summary["migrations"]))}')
+        for created in summary['created']:
+            print(f'Created default {created}.')
+        print(f'Database is ready (schema version {latest_version()}).')
+
+
+def migrate():
+    app = create_app()
+    with app.app_context():
+        from app.app_migrations import upgrade, current_version
+        from app.app_bootstrap import bootstrap_lock
+        with bootstrap_lock(db.engine, app.instance_path):
+            applied = upgrade()
+        with db.engine.connect() as conn:
+            version = current_version(conn)
+        if applied:
+            print(f'Applied migrations: {", ".join(map(str, applied))}')
+        print(f'Schema is at version {version}.')
+
+
+def backfill_doctor_patients(email=None):
+    app = create_app()
+    with app.app_context():
+        from app.app_doctor_patients import rebuild
+        doctor_ids = None
+        if email:
+            doctor = _find_doctor(email)
+            if not doctor:
+                return
+            doctor_ids = [doctor.id]
+        with db.engine.begin() as conn:
+            pairs = rebuild(conn, doctor_ids)
+        print(f'Rebuilt doctor_patient: {pairs} doctor-patient pair(s).')
+
+
+def archive(months=None):
+    app = create_app()
+    with app.app_context():
+        from app.app_archive import archive_appointments
+        months = months or app.config['ARCHIVE_AFTER_MONTHS']
+        totals = archive_appointments(
+            months, app.config['ARCHIVE_CHUNK_SIZE'],
+            progress=lambda t: print(f"  {t['appointments']} appointment(s) archived...")
+        )
+        print(f"Archived {totals['appointments']} appointment(s) and {totals['treatments']} "
+              f"treatment(s) dated before {totals['cutoff']}.")
+
+
+def rebuild_rollups(days=None):
+    app = create_app()
+    with app.app_context():
+        from datetime import date, timedelta
+        from app.app_reports import rebuild_rollups as rebuild
+        start = date.today() - timedelta(days=days) if days else None
+        with db.engine.begin() as conn:
+            rows = rebuild(conn, start=start)
+        print(f"Rebuilt {rows} rollup row(s) {'since ' + start.isoformat() if start else 'for all days'}.")
+
+
 def main():
     parser = argparse.ArgumentParser()
     sub = parser.add_subparsers(dest='cmd')
 
+    sub.add_parser('bootstrap')
     sub.add_parser('create-defaults')
     sub.add_parser('list-doctors')
 
@@ -119,9 +245,34 @@ def main():
     p.add_argument('--email', '-e', required=True)
 
     sub.add_parser('delete-all-doctors')
+    sub.add_parser('migrate')
+
+    p = sub.add_parser('backfill-doctor-patients')
+    p.add_argument('--email', '-e', help='only this doctor (default: everyone)')
+
+    p = sub.add_parser('archive')
+    p.add_argument('--months', type=int, help='archive closed appointments older than this (default ARCHIVE_AFTER_MONTHS)')
+
+    p = sub.add_parser('rebuild-rollups')
+    p.add_argument('--days', type=int, help='only the last N days (default: everything)')
+
+    p = sub.add_parser('set-schedule')
+    p.add_argument('--email', '-e', required=True)
+    p.add_argument('--days', required=True, help='comma-separated, e.g. mon,tue,wed')
+    p.add_argument('--start', required=True, help='HH:MM')
+    p.add_argument('--end', required=True, help='HH:MM')
+
+    p = sub.add_parser('block-date')
+    p.add_argument('--email', '-e', required=True)
+    p.add_argument('--date', required=True, help='YYYY-MM-DD')
+    p.add_argument('--start', help='HH:MM (omit to block the whole day)')
+    p.add_argument('--end', help='HH:MM')
+    p.add_argument('--reason')
 
     args = parser.parse_args()
-    if args.cmd == 'create-defaults':
+    if args.cmd == 'bootstrap':
+        bootstrap()
+    elif args.cmd == 'create-defaults':
         create_defaults()
     elif args.cmd == 'list-doctors':
         list_doctors()
@@ -129,6 +280,18 @@ def main():
         delete_doctor_by_email(args.email)
     elif args.cmd == 'delete-all-doctors':
         delete_all_doctors()
+    elif args.cmd == 'migrate':
+        migrate()
+    elif args.cmd == 'backfill-doctor-patients':
+        backfill_doctor_patients(args.email)
+    elif args.cmd == 'archive':
+        archive(args.months)
+    elif args.cmd == 'rebuild-rollups':
+        rebuild_rollups(args.days)
+    elif args.cmd == 'set-schedule':
+        set_schedule(args.email, args.days, args.start, args.end)
+    elif args.cmd == 'block-date':
+        block_date(args.email, args.date, args.start, args.end, args.reason)
     else:
         parser.print_help()
 
@@ -0,0 +1,61 @@
+"""Shared fixtures: every test gets its own `testing` app and in-memory database.
+
+The testing profile is hermetic, so tests never touch instance/hospital.db
+and can run in parallel (pytest -n auto with pytest-xdist).
+"""
+import pytest
+from app.app_init import create_app, db, cache
+from app.app_availability import availability_index
+from app.app_fragments import fragment_cache
+from app.app_identity import identity_cache
+from app.app_synthetic import generate, synthetic_email, SYNTHETIC_PASSWORD
+
+
+ADMIN = ('admin@hospital.com', 'admin@123')
+
+
+def _reset_process_state():
+    # Module-level caches outlive an app; drop what the previous test left behind
+    cache.clear()
+    fragment_cache.clear()
+    identity_cache.clear()
+    availability_index.invalidate()
+
+
+def make_app(**overrides):
+    """A bootstrapped testing app (schema, admin and departments created)"""
+    _reset_process_state()
+    app = create_app('testing', **overrides)
+    with app.app_context():
+        pass  # the first app context runs the lazy bootstrap
+    return app
+
+
+@pytest.fixture
+def app():
+    app = make_app()
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def login(client, email, password):
+    response = client.post('/login', data={'email': email, 'password': password})
+    assert response.status_code == 302, f'login failed for {email}'
+    return client
+
+
+def seed(appointments, seed_value=1):
+    """Synthetic doctors, patients and appointments; returns the logins per role"""
+    generate(appointments, seed_value)
+    return {
+        'admin': ADMIN,
+        'doctor': (synthetic_email('doctor', 0, seed_value), SYNTHETIC_PASSWORD),
+        'patient': (synthetic_email('patient', 0, seed_value), SYNTHETIC_PASSWORD),
+    }
@@ -0,0 +1,60 @@
+import pytest
+from app.app_init import db
+from app.app_archive import archive_appointments
+from app.app_models import Appointment, Doctor, Treatment, TreatmentArchive, User
+from app.app_soft_delete import soft_delete_doctor
+from tests.conftest import login, make_app, seed
+
+
+def walk(client, url, **params):
+    """Every id of a listing, following the next cursors"""
+    ids, params = [], {'per_page': 7, **params}
+    while True:
+        response = client.get(url, query_string=params)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        payload = response.get_json()
+        ids += [row['id'] for row in payload['data']]
+        if not payload['next']:
+            return ids
+        params['after'] = payload['next']
+
+
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+def test_treatments_include_archived_rows(app, client, order):
+    logins = seed(400)
+    expected = sorted(db.session.scalars(db.select(Treatment.id)), reverse=order == 'desc')
+    assert archive_appointments(months=1)['treatments']
+    assert db.session.query(TreatmentArchive.id).count()
+
+    login(client, *logins['admin'])
+    assert walk(client, '/api/v1/treatments', order=order) == expected
+
+
+def test_archived_treatment_detail(app, client):
+    logins = seed(400)
+    archive_appointments(months=1)
+    archived_id = db.session.scalars(db.select(TreatmentArchive.id)).first()
+    login(client, *logins['admin'])
+    response = client.get(f'/api/v1/treatments/{archived_id}')
+    assert response.status_code == 200
+    assert response.get_json()['data']['id'] == archived_id
+
+
+def test_soft_deleted_doctor_stays_in_patient_history():
+    app = make_app()
+    with app.app_context():
+        logins = seed(400)
+        patient = User.query.filter_by(email=logins['patient'][0]).one().patient
+        doctor_id = Appointment.query.filter_by(patient_id=patient.id).first().doctor_id
+        db.session.remove()
+    client = login(app.test_client(), *logins['patient'])
+    before = walk(client, '/api/v1/appointments')
+    page = client.get('/patient/appointments').get_data(as_text=True)
+
+    with app.app_context():
+        soft_delete_doctor(db.session.get(Doctor, doctor_id))
+        db.session.remove()
+    assert walk(client, '/api/v1/appointments') == before
+    after = client.get('/patient/appointments')
+    assert after.status_code == 200
+    assert after.get_data(as_text=True).count('<tr') == page.count('<tr')
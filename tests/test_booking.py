@@ -0,0 +1,92 @@
+import threading
+from collections import Counter
+from datetime import date, timedelta, time as clock
+import pytest
+from app.app_init import db
+from app.app_models import Appointment
+from app.app_availability import availability_index
+from app.app_booking import SlotUnavailable, book_slot
+from tests.conftest import make_app, seed
+
+
+THREADS = 8
+ATTEMPTS_PER_SLOT = 4
+
+
+def free_slots(doctor_id, days=2):
+    """(date, time) pairs still open on the doctor's next working days"""
+    free = availability_index.free_slots(doctor_id, start=date.today() + timedelta(days=1), days=14)
+    working = [day for day in sorted(free) if free[day]][:days]
+    return [(day, slot) for day in working for slot in free[day]]
+
+
+def test_concurrent_booking_never_double_books(tmp_path):
+    app = make_app(DATABASE_URL=f"sqlite:///{tmp_path / 'booking.db'}", SQLITE_TUNED=True)
+    with app.app_context():
+        seed(20)
+        slots = free_slots(1, days=4)
+    # Consecutive attempts on a slot go to different threads, so they race
+    contested = [slot for slot in slots for _ in range(ATTEMPTS_PER_SLOT)]
+    requests = [(index % 20 + 1, slot) for index, slot in enumerate(contested)]
+    outcomes, errors = [], []
+    start = threading.Barrier(THREADS)
+
+    def worker(share):
+        with app.app_context():
+            start.wait()
+            for patient_id, (day, slot) in share:
+                try:
+                    book_slot(patient_id, 1, day, slot, 'stress test')
+                    outcomes.append(('booked', day, slot))
+                except SlotUnavailable:
+                    outcomes.append(('refused', day, slot))
+                except Exception as exc:  # noqa: BLE001 - surfaced by the assertion below
+                    errors.append(exc)
+            db.session.remove()
+
+    threads = [threading.Thread(target=worker, args=(requests[n::THREADS],)) for n in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors, errors
+    assert len(outcomes) == len(requests)
+    booked = Counter((day, slot) for outcome, day, slot in outcomes if outcome == 'booked')
+    assert set(booked) == set(slots)
+    assert max(booked.values()) == 1
+    with app.app_context():
+        live = Counter(db.session.query(Appointment.date, Appointment.time).filter(
+            Appointment.doctor_id == 1, Appointment.status != 'Cancelled',
+            Appointment.reason == 'stress test').all())
+        assert len(live) == len(slots) and max(live.values()) == 1
+        db.engine.dispose()
+
+
+def test_taken_slot_offers_alternatives(app):
+    seed(20)
+    day, slot = free_slots(1)[0]
+    book_slot(1, 1, day, slot, 'first')
+    with pytest.raises(SlotUnavailable, match='already booked') as refused:
+        book_slot(2, 1, day, slot, 'second')
+    assert refused.value.suggestions
+    assert all((when, at) > (day, slot) for when, at in refused.value.suggestions)
+
+
+def test_cancelled_slot_can_be_rebooked(app):
+    seed(20)
+    day, slot = free_slots(1)[0]
+    first = book_slot(1, 1, day, slot, 'first')
+    first.status = 'Cancelled'
+    db.session.commit()
+    assert book_slot(2, 1, day, slot, 'second').status == 'Booked'
+
+
+@pytest.mark.parametrize('slot', [clock(3, 0), clock(10, 15), clock(23, 30)])
+def test_off_schedule_slot_is_refused(app, slot):
+    seed(20)
+    day = free_slots(1)[0][0]
+    with pytest.raises(SlotUnavailable, match='not available') as refused:
+        book_slot(1, 1, day, slot, 'off schedule')
+    assert refused.value.suggestions
+    assert Appointment.query.filter_by(reason='off schedule').count() == 0
@@ -0,0 +1,46 @@
+import json
+from app.app_init import db
+from app.app_bulk import export_file, import_file
+from app.app_models import Patient
+from tests.conftest import make_app, seed
+
+
+def test_bad_json_lines_are_reported_not_fatal(app, tmp_path):
+    good = [{'name': f'Bulk Patient {n}', 'email': f'bulk{n}@example.com', 'password': 'pass-1234'}
+            for n in range(2)]
+    lines = [
+        json.dumps(good[0]),
+        '{"name": "Broken',
+        '[]',
+        '1',
+        json.dumps({'name': 'Nested', 'email': 'nested@example.com', 'password': 'x', 'phone': {'home': 1}}),
+        json.dumps(good[1]),
+    ]
+    path = tmp_path / 'patients.jsonl'
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+    report = import_file('patients', str(path), workers=1)
+    assert (report.read, report.inserted, report.skipped) == (6, 2, 4)
+    assert [line for line, _ in report.errors] == [2, 3, 4, 5]
+    assert Patient.query.count() == 2
+
+
+def test_export_needs_a_password_column_to_reimport(tmp_path):
+    path = tmp_path / 'patients.jsonl'
+    app = make_app()
+    with app.app_context():
+        seed(40)
+        exported = export_file('patients', str(path))
+        rows = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+        db.session.remove()
+    assert exported == len(rows) and not any('password' in row for row in rows)
+
+    app = make_app()
+    with app.app_context():
+        report = import_file('patients', str(path), workers=1)
+        assert (report.inserted, report.skipped) == (0, exported)
+        assert 'password' in report.errors[0][1]
+
+        path.write_text(''.join(json.dumps(dict(row, password='temporary-1')) + '\n' for row in rows),
+                        encoding='utf-8')
+        assert import_file('patients', str(path), workers=1).inserted == exported
@@ -0,0 +1,73 @@
+import pytest
+from flask import Flask
+from app.app_config import ConfigError, load_config
+from app.app_init import create_app, db
+from app.app_models import Department
+from tests.conftest import make_app
+
+
+def test_testing_apps_get_private_databases():
+    first, second = make_app(), make_app()
+    assert first.config['SQLALCHEMY_DATABASE_URI'] != second.config['SQLALCHEMY_DATABASE_URI']
+    with first.app_context():
+        db.session.add(Department(name='Only In First'))
+        db.session.commit()
+    with second.app_context():
+        assert Department.query.filter_by(name='Only In First').first() is None
+
+
+def test_testing_profile_ignores_environment(monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'postgresql://nowhere/hms')
+    monkeypatch.setenv('JOB_WORKERS', '4')
+    app = create_app('testing', AUTO_BOOTSTRAP=False)
+    assert 'mode=memory' in app.config['SQLALCHEMY_DATABASE_URI']
+    assert app.config['JOB_WORKERS'] == 0
+
+
+def test_testing_profile_defaults():
+    app = create_app('testing', AUTO_BOOTSTRAP=False)
+    assert app.config['TESTING'] is True
+    assert app.config['WTF_CSRF_ENABLED'] is False
+    assert app.config['PASSWORD_HASH_WORKERS'] == 0
+    assert app.config['SQL_PROFILING'] is True
+    # Budgets are opt-in so unrelated tests do not fail on them
+    assert app.config['SQL_QUERY_BUDGET_STRICT'] is False
+    assert app.config['SQL_PROFILE_LOG'] is False
+
+
+def test_overrides_beat_the_profile(tmp_path):
+    url = f"sqlite:///{tmp_path / 'worker.db'}"
+    app = create_app('testing', DATABASE_URL=url, SQL_QUERY_BUDGET_STRICT=True, AUTO_BOOTSTRAP=False)
+    assert app.config['SQLALCHEMY_DATABASE_URI'] == url
+    assert app.config['SQL_QUERY_BUDGET_STRICT'] is True
+
+
+def test_production_profile_reads_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv('DATABASE_URL', 'postgres://db.example.com/hms')
+    monkeypatch.setenv('JOB_WORKERS', '3')
+    app = Flask(__name__, instance_path=str(tmp_path))
+    assert load_config(app, 'production') == 'production'
+    assert app.config['SQLALCHEMY_DATABASE_URI'] == 'postgresql://db.example.com/hms'
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS']['pool_pre_ping'] is True
+    assert app.config['JOB_WORKERS'] == 3
+
+
+def test_single_worker_deploy_trusts_the_memory_cache(monkeypatch, tmp_path):
+    # render.yaml runs one gunicorn worker with SINGLE_PROCESS=1
+    monkeypatch.setenv('SINGLE_PROCESS', '1')
+    app = Flask(__name__, instance_path=str(tmp_path))
+    load_config(app, 'production')
+    assert app.config['CACHE_URL'] == 'memory://'
+    assert app.config['SINGLE_PROCESS'] is True
+
+
+def test_profile_from_app_profile(monkeypatch, tmp_path):
+    monkeypatch.setenv('APP_PROFILE', 'benchmark')
+    app = Flask(__name__, instance_path=str(tmp_path))
+    assert load_config(app) == 'benchmark'
+    assert app.config['JOB_WORKERS'] == 0
+
+
+def test_unknown_profile():
+    with pytest.raises(ConfigError):
+        create_app('staging')
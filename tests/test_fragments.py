@@ -0,0 +1,15 @@
+import pytest
+from app.app_fragments import fragment_cache
+from tests.conftest import login, make_app, seed
+
+
+@pytest.mark.parametrize('single_process,hits', [(True, 1), (False, 0)])
+def test_departments_block_is_cached_only_with_shared_stamps(single_process, hits):
+    app = make_app(SINGLE_PROCESS=single_process)
+    with app.app_context():
+        logins = seed(100)
+    client = login(app.test_client(), *logins['patient'])
+    fragment_cache.reset_stats()
+    for _ in range(2):
+        assert client.get('/patient/dashboard').status_code == 200
+    assert fragment_cache.stats()['hits'] == hits
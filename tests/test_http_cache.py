@@ -0,0 +1,38 @@
+from app.app_init import db
+from app.app_http_cache import mark_stale, stamps_reliable
+from app.app_models import Patient, User
+from tests.conftest import login, make_app, seed
+
+
+HISTORY = '/patient/medical-history'
+
+
+def test_history_revalidates_until_a_write(app, client):
+    logins = seed(100)
+    patient = User.query.filter_by(email=logins['patient'][0]).one().patient
+    login(client, *logins['patient'])
+
+    first = client.get(HISTORY)
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and etag
+    assert client.get(HISTORY, headers={'If-None-Match': etag}).status_code == 304
+
+    # Core writes are invisible to the flush hooks; mark_stale bumps the scope on commit
+    db.session.execute(db.update(Patient).where(Patient.id == patient.id).values(address='Moved'))
+    mark_stale(db.session, f'patient:{patient.id}')
+    db.session.commit()
+    changed = client.get(HISTORY, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_no_etags_when_stamps_are_per_process():
+    # Like production's memory:// cache under several workers
+    app = make_app(SINGLE_PROCESS=False)
+    with app.app_context():
+        assert not stamps_reliable(app)
+        logins = seed(100)
+    client = login(app.test_client(), *logins['patient'])
+    response = client.get(HISTORY)
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
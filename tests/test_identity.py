@@ -0,0 +1,28 @@
+import pytest
+from app.app_init import db
+from app.app_identity import identity_cache
+from app.app_models import User
+from app.app_soft_delete import soft_delete_doctor
+from tests.conftest import login, make_app, seed
+
+
+@pytest.mark.parametrize('single_process', [True, False])
+def test_identity_cache_needs_shared_stamps(single_process):
+    make_app(SINGLE_PROCESS=single_process)
+    assert identity_cache.enabled is single_process
+
+
+@pytest.mark.parametrize('single_process', [True, False])
+def test_soft_deleted_doctor_is_rejected_on_the_next_request(single_process):
+    app = make_app(SINGLE_PROCESS=single_process)
+    with app.app_context():
+        logins = seed(100)
+    client = login(app.test_client(), *logins['doctor'])
+    assert client.get('/doctor/dashboard').status_code == 200
+
+    with app.app_context():
+        soft_delete_doctor(User.query.filter_by(email=logins['doctor'][0]).one().doctor)
+        db.session.remove()
+    response = client.get('/doctor/dashboard')
+    assert response.status_code == 302
+    assert '/login' in response.location
@@ -0,0 +1,56 @@
+from datetime import date, time
+import pytest
+from app.app_init import db
+from app.app_models import Appointment, Treatment
+from tests.conftest import make_app
+
+
+DAY = date(2026, 1, 5)
+
+HOT_QUERIES = {
+    'ix_appointment_doctor_date_status': db.select(Appointment.id).where(
+        Appointment.doctor_id == 1, Appointment.date >= DAY, Appointment.status == 'Booked'),
+    'ix_appointment_patient_date_status': db.select(Appointment.id).where(
+        Appointment.patient_id == 1, Appointment.date >= DAY, Appointment.status == 'Booked'),
+    'ix_appointment_doctor_date_time': db.select(Appointment.id).where(
+        Appointment.doctor_id == 1, Appointment.date == DAY, Appointment.time == time(9)),
+    'uq_appointment_doctor_slot': db.select(Appointment.id).where(
+        Appointment.doctor_id == 1, Appointment.date == DAY, Appointment.time == time(9),
+        Appointment.status != 'Cancelled'),
+    'ix_treatment_patient_id': db.select(Treatment.id).where(Treatment.patient_id == 1),
+}
+
+
+def query_plan(statement):
+    compiled = statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})
+    rows = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}').all()
+    return ' | '.join(row[-1] for row in rows)
+
+
+def index_names():
+    return set(db.session.execute(db.text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+
+
+@pytest.mark.parametrize('index', sorted(HOT_QUERIES))
+def test_hot_query_uses_index(app, index):
+    plan = query_plan(HOT_QUERIES[index])
+    assert plan.startswith('SEARCH'), plan
+    assert f'INDEX {index} ' in plan, plan
+
+
+def test_migrations_add_indexes_to_an_existing_database(tmp_path):
+    url = f"sqlite:///{tmp_path / 'existing.db'}"
+    app = make_app(DATABASE_URL=url)
+    with app.app_context():
+        # Roll back to a database created before the indexes existed
+        for name in HOT_QUERIES:
+            db.session.execute(db.text(f'DROP INDEX {name}'))
+        db.session.execute(db.text('DELETE FROM schema_version'))
+        db.session.commit()
+        assert not set(HOT_QUERIES) & index_names()
+        db.engine.dispose()
+
+    app = make_app(DATABASE_URL=url)
+    with app.app_context():
+        assert set(HOT_QUERIES) <= index_names()
+        db.engine.dispose()
@@ -0,0 +1,37 @@
+import pytest
+from app.app_init import db
+from app.app_jobs import enqueue
+from app.app_models import Job
+
+
+def finish(job, status):
+    job.status, job.attempts = status, job.max_attempts
+    db.session.commit()
+
+
+@pytest.mark.parametrize('status', ['queued', 'running'])
+def test_pending_job_is_a_duplicate(app, status):
+    job = enqueue('delete_doctor', unique_key='delete_doctor:1', doctor_id=1)
+    job.status = status
+    db.session.commit()
+    assert enqueue('delete_doctor', unique_key='delete_doctor:1', doctor_id=1).id == job.id
+    assert Job.query.count() == 1
+    assert job.status == status
+
+
+@pytest.mark.parametrize('status', ['failed', 'done'])
+def test_finished_job_is_queued_again(app, status):
+    job = enqueue('delete_doctor', unique_key='delete_doctor:1', doctor_id=1)
+    finish(job, status)
+    again = enqueue('delete_doctor', unique_key='delete_doctor:1', doctor_id=2)
+    assert again.id == job.id
+    assert (again.status, again.attempts) == ('queued', 0)
+    assert again.payload == '{"doctor_id": 2}'
+
+
+def test_once_keeps_a_done_job(app):
+    job = enqueue('rebuild_rollups', unique_key='rebuild_rollups:60:1', once=True)
+    finish(job, 'done')
+    assert enqueue('rebuild_rollups', unique_key='rebuild_rollups:60:1', once=True).status == 'done'
+    finish(job, 'failed')
+    assert enqueue('rebuild_rollups', unique_key='rebuild_rollups:60:1', once=True).status == 'queued'
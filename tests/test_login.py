@@ -0,0 +1,43 @@
+from app.app_passwords import password_hasher, process_pool
+from tests.conftest import ADMIN, make_app
+
+
+def post_login(client, email, password, ip):
+    return client.post('/login', data={'email': email, 'password': password},
+                       headers={'X-Forwarded-For': ip})
+
+
+def test_successful_logins_are_not_throttled():
+    app = make_app(LOGIN_RATE_PER_IP=3)
+    for _ in range(6):
+        assert post_login(app.test_client(), *ADMIN, ip='10.0.0.1').status_code == 302
+
+
+def test_failures_throttle_only_the_client_behind_the_proxy():
+    app = make_app(LOGIN_RATE_PER_IP=3)
+    for number in range(3):
+        response = post_login(app.test_client(), f'nobody{number}@example.com', 'wrong', ip='10.0.0.1')
+        assert response.status_code == 200
+    blocked = post_login(app.test_client(), *ADMIN, ip='10.0.0.1')
+    assert blocked.status_code == 429
+    assert int(blocked.headers['Retry-After']) > 0
+    # Another client arriving through the same proxy is unaffected
+    assert post_login(app.test_client(), *ADMIN, ip='10.0.0.2').status_code == 302
+
+
+def test_hash_pool_does_not_fork():
+    pool = process_pool(1)
+    try:
+        assert pool._mp_context.get_start_method() in ('forkserver', 'spawn')
+    finally:
+        pool.shutdown()
+
+
+def test_hashing_in_worker_processes():
+    make_app(PASSWORD_HASH_WORKERS=1)
+    try:
+        stored = password_hasher.hash('s3cret-pass')
+        assert password_hasher.verify(stored, 's3cret-pass')
+        assert not password_hasher.verify(stored, 'wrong')
+    finally:
+        password_hasher.shutdown()
@@ -0,0 +1,16 @@
+import copy
+import pytest
+from sqlalchemy.exc import OperationalError
+from app.app_init import db
+
+
+def test_failed_statements_leave_nothing_on_the_connection(app):
+    with db.engine.connect() as conn:
+        conn.execute(db.text('SELECT 1'))
+        before = copy.deepcopy(conn.info)
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(db.text('SELECT * FROM no_such_table'))
+            conn.rollback()
+        conn.execute(db.text('SELECT 1'))
+        assert conn.info == before
@@ -0,0 +1,106 @@
+from collections import Counter
+import pytest
+from app.app_init import db
+from app.app_models import Appointment, Doctor, Patient
+from tests.conftest import ADMIN, login, make_app, seed
+
+
+LIST_PAGES = [
+    ('admin', '/admin/dashboard'),
+    ('admin', '/admin/doctors'),
+    ('admin', '/admin/patients'),
+    ('admin', '/admin/appointments'),
+    ('admin', '/admin/doctor/1/patients'),
+    ('admin', '/admin/reports'),
+    ('doctor', '/doctor/dashboard'),
+    ('doctor', '/doctor/appointments'),
+    ('doctor', '/doctor/patients'),
+    ('doctor', '/doctor/1/availability'),
+    ('patient', '/patient/appointments'),
+]
+
+
+def query_counts(appointments):
+    """X-Query-Count and query_budget of each list page over a freshly seeded database"""
+    app = make_app(SQL_QUERY_BUDGET_STRICT=True)
+    with app.app_context():
+        logins = seed(appointments)
+        rows = Appointment.query.count()
+        db.session.remove()
+    # Requests run outside that context so g (and the logged-in user) is per request
+    counts, budgets = {}, {}
+    for role, url in LIST_PAGES:
+        client = login(app.test_client(), *logins[role])
+        response = client.get(url)
+        assert response.status_code == 200, url
+        counts[url] = int(response.headers['X-Query-Count'])
+        budgets[url] = app.view_functions[app.url_map.bind('').match(url)[0]].query_budget
+    with app.app_context():
+        db.engine.dispose()
+    return rows, counts, budgets
+
+
+@pytest.fixture(scope='module')
+def small_and_large():
+    return query_counts(60), query_counts(1500)
+
+
+@pytest.mark.parametrize('role,url', LIST_PAGES)
+def test_query_count_does_not_grow_with_rows(small_and_large, role, url):
+    (small_rows, small, _), (large_rows, large, _) = small_and_large
+    assert large_rows > small_rows * 10
+    assert small[url] == large[url]
+
+
+@pytest.mark.parametrize('role,url', LIST_PAGES)
+def test_list_pages_stay_within_budget(small_and_large, role, url):
+    # Strict budgets would have raised QueryBudgetExceeded; check the header too
+    _, counts, budgets = small_and_large[1]
+    assert counts[url] <= budgets[url]
+
+
+SEARCHES = [
+    ('admin', '/admin/search', 'doctor_name', Doctor),
+    ('admin', '/admin/search', 'patient_name', Patient),
+    ('patient', '/patient/search-doctors', 'name', Doctor),
+]
+
+
+@pytest.mark.parametrize('role,url,search_by,model', SEARCHES)
+def test_search_query_count_does_not_grow_with_results(role, url, search_by, model):
+    app = make_app()
+    with app.app_context():
+        logins = seed(1500)
+        names = [name for (name,) in db.session.query(model.display_name)]
+        db.session.remove()
+    # One exact name against its surname, which several rows share
+    surname = Counter(name.split()[-1] for name in names).most_common(1)[0][0]
+    exact = next(name for name in names if name.endswith(surname))
+    client = login(app.test_client(), *logins[role])
+    client.get(url)  # the first request warms per-process caches
+    counts = {}
+    for search_query in (exact, surname):
+        response = client.post(url, data={'search_query': search_query, 'search_by': search_by})
+        assert response.status_code == 200
+        counts[search_query] = int(response.headers['X-Query-Count'])
+    assert names.count(exact) < sum(name.endswith(surname) for name in names)
+    assert counts[exact] == counts[surname], counts
+
+
+def treatment_search(appointments):
+    """(results shown, X-Query-Count) of an admin treatment search"""
+    app = make_app()
+    with app.app_context():
+        seed(appointments)
+        db.session.remove()
+    client = login(app.test_client(), *ADMIN)
+    client.get('/admin/search')  # the first request warms per-process caches
+    response = client.post('/admin/search', data={'search_query': 'Hypertension', 'search_by': 'treatment'})
+    assert response.status_code == 200
+    return response.get_data(as_text=True).count('Diagnosis:'), int(response.headers['X-Query-Count'])
+
+
+def test_treatment_search_query_count_does_not_grow_with_results():
+    (few, small), (many, large) = treatment_search(40), treatment_search(1500)
+    assert 0 < few < many
+    assert small == large
@@ -0,0 +1,40 @@
+import pytest
+from app.app_init import db
+from app.app_models import DoctorPatient
+from tests.conftest import login, seed
+
+
+PAGES = {
+    'admin': ['/admin/dashboard', '/admin/doctors', '/admin/patients', '/admin/appointments',
+              '/admin/doctor/1/patients', '/admin/reports', '/admin/search', '/admin/jobs',
+              '/admin/cache-stats', '/admin/doctor/add', '/admin/doctor/edit/1',
+              '/admin/doctors?sort=name&order=desc', '/admin/patients?sort=name'],
+    'doctor': ['/doctor/dashboard', '/doctor/appointments', '/doctor/patients',
+               '/doctor/patient/{patient_id}/history', '/doctor/patient/{patient_id}/record.json',
+               '/doctor/1/availability'],
+    'patient': ['/patient/dashboard', '/patient/appointments', '/patient/medical-history',
+                '/patient/medical-history/record.html', '/patient/book-appointment',
+                '/patient/search-doctors', '/patient/profile/edit'],
+}
+
+
+@pytest.mark.parametrize('role,url', [(role, url) for role, urls in PAGES.items() for url in urls])
+def test_page_renders(app, client, role, url):
+    logins = seed(400)
+    patient_id = db.session.query(DoctorPatient.patient_id).filter_by(doctor_id=1).first()[0]
+    login(client, *logins[role])
+    response = client.get(url.format(patient_id=patient_id))
+    assert response.status_code == 200, url
+
+
+@pytest.mark.parametrize('url', ['/', '/login', '/register'])
+def test_public_pages(client, url):
+    assert client.get(url).status_code == 200
+
+
+@pytest.mark.parametrize('role,url', [('patient', '/admin/doctors'), ('doctor', '/admin/patients'),
+                                      ('patient', '/doctor/appointments'), ('doctor', '/patient/dashboard')])
+def test_other_roles_are_redirected(app, client, role, url):
+    logins = seed(100)
+    login(client, *logins[role])
+    assert client.get(url).status_code == 302
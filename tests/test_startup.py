@@ -0,0 +1,69 @@
+import statistics
+import threading
+import time
+from app.app_init import create_app, db
+from app.app_bootstrap import bootstrap, schema_is_current, latest_version
+from app.app_models import Department, User
+
+
+# create_app builds no schema and runs no queries; anything near this is a regression
+STARTUP_BUDGET_SECONDS = 0.25
+
+
+def test_create_app_is_fast():
+    create_app('testing', AUTO_BOOTSTRAP=False)  # imports
+    timings = []
+    for _ in range(5):
+        started = time.perf_counter()
+        create_app('testing', AUTO_BOOTSTRAP=False)
+        timings.append(time.perf_counter() - started)
+    assert statistics.median(timings) < STARTUP_BUDGET_SECONDS, timings
+
+
+def test_create_app_touches_no_tables_without_auto_bootstrap():
+    app = create_app('testing', AUTO_BOOTSTRAP=False)
+    with app.app_context():
+        assert db.inspect(db.engine).get_table_names() == []
+        assert not schema_is_current()
+
+
+def test_first_app_context_bootstraps(app):
+    assert schema_is_current()
+    assert User.query.filter_by(role='admin').count() == 1
+
+
+def test_bootstrap_is_idempotent(app):
+    assert bootstrap(app) == {'migrations': [], 'created': []}
+    assert User.query.filter_by(role='admin').count() == 1
+
+
+def test_concurrent_workers_bootstrap_once(tmp_path):
+    # Each app stands in for a worker process booting against the same fresh file
+    url = f"sqlite:///{tmp_path / 'fresh.db'}"
+    apps = [create_app('testing', DATABASE_URL=url) for _ in range(4)]
+    start = threading.Barrier(len(apps))
+    errors = []
+
+    def boot(app):
+        start.wait()
+        try:
+            with app.app_context():
+                db.session.remove()
+        except Exception as exc:  # noqa: BLE001 - surfaced by the assertion below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=boot, args=(app,)) for app in apps]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors, errors
+    with apps[0].app_context():
+        assert User.query.filter_by(role='admin').count() == 1
+        assert Department.query.count() == 7
+        versions = db.session.execute(db.text('SELECT version FROM schema_version')).scalars().all()
+        assert sorted(versions) == list(range(1, latest_version() + 1))
+    for app in apps:
+        with app.app_context():
+            db.engine.dispose()